@@ -0,0 +1,395 @@
+"""
+    Skrypt porównujący czasy wykonania wybranych elementów algorytmu na mapach z katalogu maps.
+    Uruchomienie: python benchmark.py
+"""
+import contextlib
+import os
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+
+import src.AllowedMoveTable as AllowedMoveTable
+import src.ConditionTester as ConditionTester
+import src.CostFunction as CostFunction
+import src.DockRoutingTable as DockRoutingTable
+import src.MapGenerator as MapGenerator
+import src.NeighborhoodGenerator as NeighborhoodGenerator
+import src.ProblemGenerator as ProblemGenerator
+import src.DataCollectorPlotter  # ładowany przed SolutionUtilization ze względu na import cykliczny z PlotSaver
+import src.SolutionGrader as SolutionGrader
+import src.SolutionUtilization as SolutionUtilization
+import src.Solver as Solver
+import src.StartingSolutionGenerator as StartingSolutionGenerator
+import src.TrajectoryRecorder as TrajectoryRecorder
+import src.ZobristHash as ZobristHash
+from src.SettingMenager import setting_menager
+
+
+def load_case(case: str, seed: int = 0):
+    """
+    Wczytuje mapę barier i początkowe rozmieszczenie stacji dokujących danego przypadku oraz losuje mapę klientów
+    (klienci tylko na polach, po których mogą poruszać się roboty).
+
+    :param case: nazwa przypadku, np. 'case2'
+    :param seed: ziarno generatora liczb losowych
+    :return: mapa barier, mapa klientów, mapa stacji dokujących
+    """
+    rng = np.random.default_rng(seed)
+    barriers = np.load('maps/{}/barriers.npy'.format(case))
+    docks = (np.load('maps/{}/init_docking_stations.npy'.format(case)) > 0).astype('int32')
+    clients = rng.integers(0, 10, barriers.shape) * (barriers != 1)
+    return barriers, clients, docks
+
+
+def measure(fun, repeat: int = 3) -> float:
+    """
+    :return: najkrótszy czas wykonania funkcji fun w sekundach
+    """
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fun()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_cost(case: str, d_max: int = 2):
+    _, clients, docks = load_case(case)
+    diamond = CostFunction.DiamondCost(d_max, clients)
+    transform = CostFunction.DistanceTransformCost(d_max, clients)
+
+    t_diamond = measure(lambda: diamond.cost(docks), repeat=1)
+    t_transform = measure(lambda: transform.cost(docks))
+    assert np.isclose(diamond.cost(docks), transform.cost(docks))
+    print('{:<8} koszt rozwiązania  diamond: {:8.4f} s  distance_transform: {:8.4f} s  przyspieszenie: {:8.1f}x'
+          .format(case, t_diamond, t_transform, t_diamond / t_transform))
+
+
+def bench_delta(case: str, d_max: int = 2, r: int = 1):
+    _, clients, docks = load_case(case)
+    transform = CostFunction.DistanceTransformCost(d_max, clients)
+    incremental = CostFunction.IncrementalCost(d_max, clients, r)
+
+    def full_scan():
+        return [transform.cost(neighbor) for neighbor in NeighborhoodGenerator.neighborhood_generator(docks, r)]
+
+    def delta_scan():
+        incremental.reset(docks)
+        costs = []
+        for station, (x, y) in enumerate(np.argwhere(docks)):
+            for _x in range(max(x - r, 0), min(x + r + 1, docks.shape[0])):
+                for _y in range(max(y - r, 0), min(y + r + 1, docks.shape[1])):
+                    if docks[_x, _y] == 0:
+                        costs.append(incremental.get_base_cost() + incremental.move_delta(station, (_x, _y)))
+        return costs
+
+    assert np.allclose(full_scan(), delta_scan())
+    t_full = measure(full_scan, repeat=1)
+    t_delta = measure(delta_scan)
+    print('{:<8} przegląd sąsiedztwa  pełny koszt: {:8.4f} s  delta: {:8.4f} s  przyspieszenie: {:8.1f}x'
+          .format(case, t_full, t_delta, t_full / t_delta))
+
+
+def bench_neighborhood_mode(case: str, d_max: int = 2, r: int = 2, iterations: int = 5):
+    _, clients, docks = load_case(case)
+    times = {}
+    for mode in ['matrix', 'moves', 'batched']:
+        solver = Solver.Solver(n_max=int(np.sum(docks)), p_max=10 ** 6, d_max=d_max, r=r,
+                               min_time_in_tl=10, min_time_in_lt_tl=2, client_map=clients,
+                               iteration_lim=iterations, starting_solution=docks, dynamic_neighborhood=False,
+                               frame=0, neighborhood_mode=mode)
+        times[mode] = measure(solver._Solver__solve, repeat=1)
+    print('{:<8} {} iteracji solvera  macierze: {:8.4f} s  ruchy: {:8.4f} s  wektorowo: {:8.4f} s  '
+          'przyspieszenie: {:8.1f}x / {:8.1f}x'
+          .format(case, iterations, times['matrix'], times['moves'], times['batched'],
+                  times['matrix'] / times['moves'], times['matrix'] / times['batched']))
+
+
+def bench_workers(case: str, d_max: int = 2, r: int = 2, iterations: int = 5, workers=(1, 2, 4)):
+    _, clients, docks = load_case(case)
+    for n in workers:
+        solver = Solver.Solver(n_max=int(np.sum(docks)), p_max=10 ** 6, d_max=d_max, r=r,
+                               min_time_in_tl=10, min_time_in_lt_tl=2, client_map=clients,
+                               iteration_lim=iterations, starting_solution=docks, dynamic_neighborhood=False,
+                               frame=0, neighborhood_mode='batched', workers=n)
+        print('{:<8} {} iteracji solvera  procesy: {:2}  czas: {:8.4f} s'
+              .format(case, iterations, n, measure(solver._Solver__solve, repeat=1)))
+
+
+def bench_solution_hash(case: str, moves: int = 10000):
+    _, _, docks = load_case(case)
+    zobrist = ZobristHash.ZobristHash(docks.shape)
+    solution_hash = zobrist.hash(docks)
+    source = tuple(int(i) for i in np.argwhere(docks)[0])
+    destination = tuple(int(i) for i in np.argwhere(docks == 0)[0])
+
+    def full_keys():
+        for _ in range(moves):
+            np.argwhere(docks > 0).astype('int32').tobytes()
+
+    def zobrist_keys():
+        for _ in range(moves):
+            zobrist.move(solution_hash, source, destination)
+
+    t_full = measure(full_keys, repeat=1)
+    t_zobrist = measure(zobrist_keys)
+    print('{:<8} {} kluczy rozwiązań  współrzędne stacji: {:8.4f} s  Zobrist: {:8.4f} s  przyspieszenie: {:8.1f}x'
+          .format(case, moves, t_full, t_zobrist, t_full / t_zobrist))
+
+
+def bench_ban_matrix(case: str, d_max: int = 5, p_max: int = 200):
+    _, clients, _ = load_case(case)
+    tester = ConditionTester.OneConditionTester(p_max, d_max, clients, None, 0)
+    shape = clients.shape
+
+    def per_cell_loop():
+        return np.array([[tester._OneConditionTester__are_to_many_clients_in_area((x, y)) for y in range(shape[1])]
+                         for x in range(shape[0])])
+
+    assert np.array_equal(per_cell_loop(), tester._OneConditionTester__create_ban_matrix())
+    t_loop = measure(per_cell_loop, repeat=1)
+    t_convolution = measure(tester._OneConditionTester__create_ban_matrix)
+    print('{:<8} macierz zabronień  pętla: {:8.4f} s  splot: {:8.4f} s  przyspieszenie: {:8.1f}x'
+          .format(case, t_loop, t_convolution, t_loop / t_convolution))
+
+
+def bench_move_feasibility(case: str, d_max: int = 2, p_max: int = 200):
+    barriers, clients, docks = load_case(case)
+    tester = ConditionTester.OneConditionTester(p_max, d_max, clients, barriers, 1)
+    moves = list(NeighborhoodGenerator.move_generator(docks, 1))
+    neighbors = [NeighborhoodGenerator.apply_move(docks, move) for move in moves]
+
+    t_full = measure(lambda: [tester.is_solution_allowed(neighbor) for neighbor in neighbors], repeat=1)
+    t_move = measure(lambda: [tester.is_move_allowed(source, destination) for _, source, destination in moves])
+    print('{:<8} {} sprawdzeń ograniczeń  całe rozwiązanie: {:8.4f} s  ruch: {:8.4f} s  przyspieszenie: {:8.1f}x'
+          .format(case, len(moves), t_full, t_move, t_full / t_move))
+
+
+def bench_grader(case: str):
+    _, clients, docks = load_case(case)
+    grader = SolutionGrader.SolutionGrader(clients, docks)
+
+    def diamond_search():
+        nearest_clients_no = np.zeros(clients.shape)
+        for x, y in np.argwhere(clients > 0):
+            nearest_clients_no[grader._SolutionGrader__find_nearest_pl((x, y))] += clients[x, y]
+        return nearest_clients_no
+
+    assert np.array_equal(diamond_search(), grader._SolutionGrader__map_clients_to_nearest_pl())
+    t_search = measure(diamond_search, repeat=1)
+    t_labels = measure(grader._SolutionGrader__map_clients_to_nearest_pl)
+    print('{:<8} przypisanie klientów do stacji  diamenty: {:8.4f} s  etykiety: {:8.4f} s  przyspieszenie: {:8.1f}x'
+          .format(case, t_search, t_labels, t_search / t_labels))
+
+
+def bench_geodesic(case: str, d_max: int = 2):
+    barriers, clients, docks = load_case(case)
+    manhattan = CostFunction.DistanceTransformCost(d_max, clients)
+    geodesic = CostFunction.GeodesicCost(d_max, clients, barriers)
+
+    t_cold = measure(lambda: geodesic.cost(docks), repeat=1)
+    t_warm = measure(lambda: geodesic.cost(docks))
+    t_manhattan = measure(lambda: manhattan.cost(docks))
+    print('{:<8} koszt geodezyjny  pierwsza ocena: {:8.4f} s  kolejne: {:8.4f} s  (Manhattan: {:8.4f} s)  '
+          'koszt: {:10.1f} vs {:10.1f}'
+          .format(case, t_cold, t_warm, t_manhattan, geodesic.cost(docks), manhattan.cost(docks)))
+
+
+def bench_field_cache(case: str, d_max: int = 2, r: int = 1):
+    _, clients, docks = load_case(case)
+    transform = CostFunction.DistanceTransformCost(d_max, clients)
+    field_cost = CostFunction.FieldCacheCost(d_max, clients)
+    neighbors = list(NeighborhoodGenerator.neighborhood_generator(docks, r))
+
+    assert np.allclose([transform.cost(neighbor) for neighbor in neighbors],
+                       [field_cost.cost(neighbor) for neighbor in neighbors])
+    t_transform = measure(lambda: [transform.cost(neighbor) for neighbor in neighbors])
+    t_fields = measure(lambda: [field_cost.cost(neighbor) for neighbor in neighbors])
+    statistics = field_cost.get_field_cache().get_statistics()
+    print('{:<8} {} sąsiadów  transformata: {:8.4f} s  pola stacji: {:8.4f} s  przyspieszenie: {:8.1f}x  '
+          'pola: {} ({:.1f} MB)'
+          .format(case, len(neighbors), t_transform, t_fields, t_transform / t_fields, statistics['size'],
+                  statistics['memory_mb']))
+
+
+def bench_utilization(case: str, p_max: int = 200, d_max: int = 2):
+    _, clients, docks = load_case(case)
+    t_utilization = measure(lambda: SolutionUtilization.SolutionUtilization(clients, docks, p_max, d_max))
+    print('{:<8} analiza wykorzystania stacji (SolutionUtilization): {:8.4f} s'.format(case, t_utilization))
+
+
+def bench_starting_solution(case: str, n_max: int = 300, p_max: int = 200, d_max: int = 2):
+    _, clients, _ = load_case(case)
+    generator = StartingSolutionGenerator.StartingSolutionGen(n_max, p_max, d_max, clients)
+    print('{:<8} rozwiązanie początkowe dla {} stacji: {:8.4f} s'.format(case, n_max, measure(generator.generate)))
+
+
+def bench_problem_generator(case: str, max_clients_number_in_cell: int = 10):
+    barriers, _, _ = load_case(case)
+    for clients_number in [np.prod(barriers.shape), np.prod(barriers.shape) * 8]:
+        generator = ProblemGenerator.RandomProblemGen(barriers.shape, int(clients_number), max_clients_number_in_cell,
+                                                      np.random.default_rng(0))
+        print('{:<8} mapa {} klientów: {:8.4f} s'
+              .format(case, clients_number, measure(generator.generate_problem)))
+
+
+def bench_problem_batch(case: str, n: int = 20, max_clients_number_in_cell: int = 10):
+    barriers, _, _ = load_case(case)
+    generator = ProblemGenerator.RandomProblemGen(barriers.shape, int(np.prod(barriers.shape)) * 4,
+                                                  max_clients_number_in_cell)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'batch.npy')
+        t_generate = measure(lambda: sum(1 for _ in generator.generate_batch(n, seed=0, path=path)), repeat=1)
+        t_load = measure(lambda: np.sum(ProblemGenerator.load_batch(path)[n - 1]))
+        size_mb = os.path.getsize(path) / 2 ** 20
+    print('{:<8} {} map klientów  generowanie z zapisem: {:8.4f} s  odczyt mapy: {:8.4f} s  plik: {:.1f} MB'
+          .format(case, n, t_generate, t_load, size_mb))
+
+
+def bench_traffic_simulation(case: str, robots_number: int = 1000, sim_len: int = 10000):
+    barriers = np.load('maps/{}/barriers.npy'.format(case))
+    docks = np.load('maps/{}/init_docking_stations.npy'.format(case))
+    times = {}
+    # pętla po obiektach trwa ok. 100 s, więc mierzona jest raz; symulacja wektorowa - najlepszy z 3 pomiarów
+    for engine, repeat in (('objects', 1), ('vectorized', 3)):
+        def simulate():
+            np.random.seed(0)
+            generator = MapGenerator.TrafficMapGenerator(barriers, docks, robots_number, engine=engine,
+                                                         rng=np.random.default_rng(0))
+            # pętla po obiektach wypisuje komunikat po każdym powrocie robota do pracy
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                generator.generate_map(sim_len)
+
+        times[engine] = measure(simulate, repeat=repeat)
+    robot_steps = robots_number * sim_len
+    print('{:<8} {} robotów, {} kroków  obiekty: {:8.3f} s ({:5.2f} mln kroków robotów/s)  wektorowo: {:8.3f} s '
+          '({:5.2f} mln kroków robotów/s)  przyspieszenie: {:6.1f}x'
+          .format(case, robots_number, sim_len, times['objects'], robot_steps / times['objects'] / 1e6,
+                  times['vectorized'], robot_steps / times['vectorized'] / 1e6,
+                  times['objects'] / times['vectorized']))
+
+
+def bench_dock_routing(case: str, routes_number: int = 200):
+    barriers = np.load('maps/{}/barriers.npy'.format(case))
+    docks = np.load('maps/{}/init_docking_stations.npy'.format(case))
+    rng = np.random.default_rng(0)
+    free = np.argwhere(barriers != 1)
+    starts = free[rng.choice(len(free), routes_number)]
+    generator = MapGenerator.TrafficMapGenerator(barriers, docks, 0, engine='objects', routing='bfs')
+
+    def routes_with_table():
+        table = DockRoutingTable.DockRoutingTable(barriers, docks)
+        return [table.route(tuple(start)) for start in starts]
+
+    t_bfs = measure(lambda: [generator._TrafficMapGenerator__bfs((start[1], start[0])) for start in starts], repeat=1)
+    t_table = measure(routes_with_table)
+    print('{:<8} {} tras do stacji  BFS: {:8.4f} s  tablica (z wyznaczeniem): {:8.4f} s'
+          .format(case, routes_number, t_bfs, t_table))
+
+
+def bench_route_memory(case: str, robots_number: int = 1000):
+    barriers = np.load('maps/{}/barriers.npy'.format(case))
+    docks = np.load('maps/{}/init_docking_stations.npy'.format(case))
+    np.random.seed(0)
+    generator = MapGenerator.TrafficMapGenerator(barriers, docks, robots_number, engine='objects')
+    starts = [robot.get_actual_position() for robot in generator._TrafficMapGenerator__robots_swarm]
+    table = generator.get_routing_table()
+    for routing, find_route in (('bfs', generator._TrafficMapGenerator__bfs), ('table', table.route)):
+        # trasy przechowywane tak jak w symulacji 'objects': trasa do stacji i jej odwrócenie - trasa do pracy
+        tracemalloc.start()
+        start = time.perf_counter()
+        routes = [(route, route[::-1]) for route in map(find_route, starts)]
+        elapsed = time.perf_counter() - start
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print('{:<8} {} tras, {:<5}  czas (z tracemalloc): {:8.3f} s  pamięć tras: {:6.2f} MB  szczyt: {:6.2f} MB'
+              .format(case, len(routes), routing, elapsed, current / 2 ** 20, peak / 2 ** 20))
+
+
+def bench_allowed_moves(case: str, moves_number: int = 100000):
+    barriers = np.load('maps/{}/barriers.npy'.format(case))
+    rng = np.random.default_rng(0)
+    free = np.argwhere(barriers != 1)
+    positions = free[rng.choice(len(free), moves_number)]
+
+    def rejection_sampling(position):
+        # losowanie ruchu do skutku, tak jak przed wprowadzeniem tablicy dozwolonych ruchów
+        move = np.random.randint(-1, 2, 2)
+        while not (0 <= position[0] + move[0] < barriers.shape[0] and 0 <= position[1] + move[1] < barriers.shape[1]) \
+                or barriers[position[0] + move[0], position[1] + move[1]] == 1:
+            move = np.random.randint(-1, 2, 2)
+        return move
+
+    table = AllowedMoveTable.AllowedMoveTable(barriers)
+    draws = table.draw(moves_number, rng)
+    t_rejection = measure(lambda: [rejection_sampling(position) for position in positions], repeat=1)
+    t_table = measure(lambda: [table.move(position, draw) for position, draw in zip(positions, draws)])
+    t_vectorized = measure(lambda: table.sample(positions, table.draw(moves_number, rng)))
+    print('{:<8} {} losowań ruchu  odrzucanie: {:8.4f} s  tablica: {:8.4f} s  tablica wektorowo: {:8.4f} s'
+          .format(case, moves_number, t_rejection, t_table, t_vectorized))
+
+
+def bench_replications(case: str, replications: int = 8, robots_number: int = 500, sim_len: int = 2000,
+                       workers=(1, 2, 4)):
+    barriers = np.load('maps/{}/barriers.npy'.format(case))
+    docks = np.load('maps/{}/init_docking_stations.npy'.format(case))
+    np.random.seed(0)
+    generator = MapGenerator.TrafficMapGenerator(barriers, docks, robots_number, engine='vectorized')
+    for n in workers:
+        t = measure(lambda: generator.simulate_replications(replications, sim_len, seeds=0, workers=n), repeat=1)
+        print('{:<8} {} replikacji, {} robotów, {} kroków  procesy: {:2}  czas: {:8.4f} s'
+              .format(case, replications, robots_number, sim_len, n, t))
+
+
+def bench_trajectory_memory(case: str, robots_number: int = 1000, sim_len: int = 5000):
+    barriers = np.load('maps/{}/barriers.npy'.format(case))
+    docks = np.load('maps/{}/init_docking_stations.npy'.format(case))
+    with tempfile.TemporaryDirectory() as directory:
+        recorders = {'float64': None,
+                     'int16': TrajectoryRecorder.TrajectoryRecorder(),
+                     'co 10': TrajectoryRecorder.TrajectoryRecorder(every=10),
+                     'różnicowo': TrajectoryRecorder.TrajectoryRecorder(delta=True),
+                     'plik': TrajectoryRecorder.TrajectoryRecorder(path=os.path.join(directory, 'trajectories.npy'))}
+        for name, recorder in recorders.items():
+            np.random.seed(0)
+            generator = MapGenerator.TrafficMapGenerator(barriers, docks, robots_number, engine='vectorized',
+                                                         rng=np.random.default_rng(0))
+            tracemalloc.start()
+            start = time.perf_counter()
+            if recorder is None:
+                # macierz pozycji w postaci zwracanej przed wprowadzeniem TrajectoryRecorder
+                trajectories = generator.generate_map(sim_len)[3].astype('float64')
+            else:
+                trajectories = generator.generate_map(sim_len, recorder)[3]
+            elapsed = time.perf_counter() - start
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print('{:<8} {} robotów, {} kroków, pozycje: {:<10} czas: {:7.3f} s  pamięć: {:7.2f} MB  szczyt: {:7.2f} MB'
+                  .format(case, robots_number, sim_len, name, elapsed, current / 2 ** 20, peak / 2 ** 20))
+            del trajectories
+
+
+if __name__ == '__main__':
+    setting_menager.change_path_to_settings_file('settings/test_cases/case1.json')
+    for case_name in ['case2', 'case3']:
+        bench_cost(case_name)
+        bench_delta(case_name)
+        bench_neighborhood_mode(case_name)
+        bench_workers(case_name)
+        bench_solution_hash(case_name)
+        bench_ban_matrix(case_name)
+        bench_move_feasibility(case_name)
+        bench_grader(case_name)
+        bench_geodesic(case_name)
+        bench_field_cache(case_name)
+        bench_utilization(case_name)
+        bench_starting_solution(case_name)
+        bench_problem_generator(case_name)
+        bench_problem_batch(case_name)
+        bench_traffic_simulation(case_name)
+        bench_dock_routing(case_name)
+        bench_route_memory(case_name)
+        bench_allowed_moves(case_name)
+        bench_replications(case_name)
+        bench_trajectory_memory(case_name)
@@ -139,10 +139,11 @@ def run_algorithm(path_to_settings=None):
             logging.info("Rozpoczynam rozwiązywanie problemu")
             solution = solver.solve(record_and_plot_data=True, telemetry_on=True)
             # Sprawdzanie wariancji uzyskanych wyników
-            solution_grader = SolutionGrader.SolutionGrader(traffic_map, solution)
-            solution_res = solution_grader.grade_solution(traffic_map, solution)
+            solution_grader = SolutionGrader.SolutionGrader(traffic_map, solution, cost_cache=solver.get_cost_cache())
+            solution_res = solution_grader.grade_solution(solution, traffic_map)
             # Wyznacz mapę wykorzystania stacji dokujących
-            solution_util = SolutionUtilization.SolutionUtilization(traffic_map.astype('int32'), solution.astype('int32'), p_max, d_max)
+            solution_util = SolutionUtilization.SolutionUtilization(traffic_map.astype('int32'), solution.astype('int32'), p_max, d_max,
+                                                                    solver.get_distance_field_cache())
             # Wyznacz mape przemieszczen symulacyjnych robotow z optymalna pozycja stacji dokujacych
             DataCollectorPlotter.plot_robots_movements_with_doc_station(robot_pos_sim, barriers_map, solution)
             rootLogger.info("Tworzę animację optymalizacji pozycji stacji dokujących")
@@ -0,0 +1,93 @@
+import numpy as np
+from typing import Tuple
+
+
+class AllowedMoveTable:
+    """
+    Tablica dozwolonych ruchów robota dla każdej komórki mapy.
+
+    Robot w jednym kroku przesuwa się o (dx, dy), dx, dy z {-1, 0, 1}, do komórki wewnątrz mapy i bez bariery, a ruch
+    wybierany jest z jednakowym prawdopodobieństwem spośród dozwolonych. Dozwolone przesunięcia każdej komórki
+    wyznaczane są raz, na początku wiersza tablicy, więc losowanie ruchu to odczyt z tablicy na podstawie liczby
+    losowej z przedziału [0, CHOICES) - bez ponownego losowania przesunięć prowadzących poza mapę lub na barierę.
+    """
+    # najmniejsza wspólna wielokrotność liczb 1..9 - liczba możliwych ruchów jest jej dzielnikiem, więc każdy ruch
+    # dozwolony w komórce jest jednakowo prawdopodobny
+    CHOICES = 2520
+    # wszystkie przesunięcia robota (kombinacje -1, 0, 1 w obu osiach)
+    __MOVES = np.array([(dx, dy) for dx in range(-1, 2) for dy in range(-1, 2)])
+
+    def __init__(self, allowed_positions_map: np.array):
+        """
+        :param allowed_positions_map: mapa pozycji dozwolonych --- 0 oznacza brak bariery, 1 oznacza barierę
+        """
+        shape = allowed_positions_map.shape
+        rows, columns = np.indices(shape).reshape(2, -1)
+        target_rows = rows[:, None] + self.__MOVES[:, 0]
+        target_columns = columns[:, None] + self.__MOVES[:, 1]
+        inside = (target_rows >= 0) & (target_rows < shape[0]) & (target_columns >= 0) & (target_columns < shape[1])
+        allowed = np.zeros(inside.shape, dtype=bool)
+        allowed[inside] = allowed_positions_map[target_rows[inside], target_columns[inside]] != 1
+        # komórki bez dozwolonego ruchu (np. otoczone barierami) - robot stoi w miejscu
+        allowed[~np.any(allowed, axis=1), len(self.__MOVES) // 2] = True
+
+        self.__width = shape[1]
+        # dozwolone przesunięcia na początku wiersza każdej komórki (jako współrzędne i jako różnice spłaszczonych
+        # indeksów komórek) oraz ich liczba
+        moves = np.argsort(~allowed, axis=1, kind='stable').ravel()
+        self.__offsets = self.__MOVES[moves]
+        self.__flat_offsets = (self.__MOVES[:, 0] * shape[1] + self.__MOVES[:, 1])[moves]
+        self.__count = np.count_nonzero(allowed, axis=1)
+
+    def get_moves_count(self) -> np.array:
+        """
+        :return: macierz liczby dozwolonych ruchów w każdej komórce
+        """
+        count = self.__count.reshape(-1, self.__width)
+        count.setflags(write=False)
+        return count
+
+    def draw(self, size, rng: np.random.Generator = None) -> np.array:
+        """
+        :param size: rozmiar bloku liczb losowych
+        :param rng: generator liczb losowych (None - globalny generator numpy.random)
+        :return: blok liczb losowych z przedziału [0, CHOICES) do losowania ruchów
+        """
+        if rng is None:
+            return np.random.randint(0, self.CHOICES, size)
+        return rng.integers(0, self.CHOICES, size)
+
+    def sample(self, position: np.array, draw: np.array) -> np.array:
+        """
+        :param position: macierz (... x 2) współrzędnych robotów
+        :param draw: liczby losowe z przedziału [0, CHOICES) (po jednej dla każdego robota)
+        :return: macierz (... x 2) przesunięć robotów
+        """
+        position = np.asarray(position)
+        return self.__offsets[self.__table_index(position[..., 0] * self.__width + position[..., 1], draw)]
+
+    def sample_flat(self, position: np.array, draw: np.array) -> np.array:
+        """
+        :param position: spłaszczone pozycje robotów (wiersz * szerokość mapy + kolumna)
+        :param draw: liczby losowe z przedziału [0, CHOICES) (po jednej dla każdego robota)
+        :return: przesunięcia robotów jako różnice spłaszczonych indeksów komórek
+        """
+        return self.__flat_offsets[self.__table_index(position, draw)]
+
+    def move(self, position: Tuple[int, int], draw: int) -> np.array:
+        """
+        :param position: współrzędne robota
+        :param draw: liczba losowa z przedziału [0, CHOICES)
+        :return: przesunięcie robota
+        """
+        cell = int(position[0]) * self.__width + int(position[1])
+        choice = int(draw) * int(self.__count[cell]) // self.CHOICES
+        return np.copy(self.__offsets[cell * len(self.__MOVES) + choice])
+
+    def __table_index(self, cell: np.array, draw: np.array) -> np.array:
+        """
+        :param cell: spłaszczone pozycje robotów
+        :param draw: liczby losowe z przedziału [0, CHOICES)
+        :return: indeksy wylosowanych przesunięć w tablicach przesunięć
+        """
+        return cell * len(self.__MOVES) + draw * self.__count[cell] // self.CHOICES
@@ -25,6 +25,14 @@ class ConditionTesterInterface(ABC):
         raise NotImplementedError
         pass
 
+    @abstractmethod
+    def is_move_allowed(self, source: Tuple[int, int], destination: Tuple[int, int]) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    def allowed_cells(self) -> np.array:
+        raise NotImplementedError
+
 
 class OneConditionTester(ConditionTesterInterface):
     """
@@ -47,14 +55,18 @@ class OneConditionTester(ConditionTesterInterface):
         self.__p_max = p_max
         self.__d_max = d_max
         self.__clients_map = clients_map
-        self.__banned_positions = banned_positions == 1
-
         self.__map_shape = self.__clients_map.shape
+
+        if banned_positions is None:
+            self.__banned_positions = np.zeros(self.__map_shape, dtype=bool)
+        else:
+            self.__banned_positions = banned_positions == 1
         self.frame = frame
 
         self.__mask = Helpers.diamond(self.__d_max)
 
         self.__ban_matrix = self.__create_ban_matrix()
+        self.__allowed_cells = self.__create_allowed_cells()
 
     def is_solution_allowed(self, solution: np.array) -> bool:
         """
@@ -66,15 +78,57 @@ class OneConditionTester(ConditionTesterInterface):
 
         return (not np.any(solution[self.__ban_matrix])) and (not np.any(solution[self.__banned_positions])) and (not np.any(solution[self.frame:-self.frame, self.frame:-self.frame]))
 
+    def is_move_allowed(self, source: Tuple[int, int], destination: Tuple[int, int]) -> bool:
+        """
+        Metoda sprawdzająca, czy przesunięcie stacji z source do destination prowadzi do rozwiązania spełniającego
+        ograniczenia. Zakłada, że pozostałe stacje rozwiązania stoją na dozwolonych pozycjach - ograniczenia
+        dotyczą pojedynczych komórek, więc wystarczy jeden odczyt z macierzy dozwolonych komórek dla komórki
+        docelowej. Pełne sprawdzenie (is_solution_allowed) potrzebne jest tylko dla rozwiązań z zewnątrz,
+        np. rozwiązania startowego.
+
+        :param source: stara pozycja stacji
+        :param destination: nowa pozycja stacji
+        :return [bool]: odpowiedź na pytanie, czy ruch spełnia ograniczenia
+        """
+        return self.is_position_allowed(destination)
+
+    def is_position_allowed(self, position: Tuple[int, int]) -> bool:
+        """
+        :param position: współrzędne komórki
+        :return [bool]: czy w danej komórce można postawić stację dokującą
+        """
+        return bool(self.__allowed_cells[position])
+
+    def allowed_cells(self) -> np.array:
+        """
+        :return: macierz logiczna (tylko do odczytu), gdzie True oznacza komórki, w których można postawić stację
+                 dokującą
+        """
+        return self.__allowed_cells
+
+    def __create_allowed_cells(self) -> np.array:
+        """
+        Łączy macierz zabronień, mapę pozycji zabronionych (np. poszerzonych barier) i ramkę w jedną macierz
+        dozwolonych komórek, liczoną raz przy tworzeniu obiektu.
+
+        :return allowed: macierz logiczna, gdzie True oznacza komórki, w których można postawić stację dokującą
+        """
+        allowed = ~(self.__ban_matrix | self.__banned_positions)
+        if self.frame > 0:
+            allowed[self.frame:-self.frame, self.frame:-self.frame] = False
+        allowed.setflags(write=False)
+        return allowed
+
     def __create_ban_matrix(self) -> np.array:
         """
-        Tworzy macierz logiczną, gdzie True oznacza miejsca, gdzie nie można postawić stacji dokujących
+        Tworzy macierz logiczną, gdzie True oznacza miejsca, gdzie nie można postawić stacji dokujących.
+        Liczba klientów w zasięgu stacji w każdej komórce to splot mapy klientów z maską diamentu, liczony naraz
+        dla całej mapy (Helpers.diamond_convolution); wynik jest taki sam jak __are_to_many_clients_in_area
+        wywołane dla każdej komórki.
+
         :return ban_matrix: macierz wskazująca gdzie nie można postawić stacji dokujących
         """
-        ban_matrix = np.zeros(self.__map_shape, dtype=bool)
-        for index, value in np.ndenumerate(ban_matrix):
-            ban_matrix[index] = self.__are_to_many_clients_in_area(index)
-        return ban_matrix
+        return Helpers.diamond_convolution(self.__clients_map, self.__d_max) > self.__p_max
 
     def __are_to_many_clients_in_area(self, pl_coords: Tuple[int, int]) -> bool:
         """
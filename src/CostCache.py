@@ -0,0 +1,107 @@
+import hashlib
+import numpy as np
+from collections import OrderedDict
+from typing import Callable, Hashable, Tuple
+
+
+class CostCache:
+    """
+    Pamięć podręczna kosztów rozwiązań z ograniczoną pojemnością i usuwaniem najdawniej używanych wpisów (LRU).
+
+    Kluczem jest hasz Zobrista układu stacji dokujących (ZobristHash), który solwer aktualizuje w czasie O(1) przy
+    każdym ruchu, więc ten sam układ stacji ma ten sam klucz niezależnie od drogi, którą do niego dotarto (kolizje
+    64-bitowych haszy są pomijalnie rzadkie). Wpisy rozdzielone są przestrzeniami
+    nazw. Przestrzeń station_loads_namespace (liczba klientów przypisanych do każdej stacji układu) jest wspólna dla
+    klas Solver i SolutionGrader: solwer zapisuje w niej wartości policzone przy przygotowaniu sąsiedztwa, a
+    SolutionGrader odczytuje je przy ocenie rozwiązania ostatecznego zamiast ponownie przypisywać klientów do stacji.
+    """
+
+    def __init__(self, capacity: int = 100000):
+        """
+        :param capacity: maksymalna liczba przechowywanych wpisów
+        """
+        if capacity < 1:
+            raise ValueError("Pojemność pamięci podręcznej musi być dodatnia")
+        self.__capacity = capacity
+        self.__entries = OrderedDict()
+        self.__hits = 0
+        self.__misses = 0
+
+    @staticmethod
+    def fingerprint(array: np.array) -> str:
+        """
+        :param array: tablica opisująca problem (np. mapa klientów)
+        :return: skrót tablicy do budowy przestrzeni nazw
+        """
+        array = np.ascontiguousarray(array)
+        description = '{}{}'.format(array.shape, array.dtype).encode()
+        return hashlib.sha1(description + array.tobytes()).hexdigest()
+
+    @staticmethod
+    def station_loads_namespace(client_map: np.array) -> Tuple[str, str]:
+        """
+        :param client_map: mapa klientów
+        :return: przestrzeń nazw wektorów liczby klientów przypisanych do stacji układu (do najbliższej stacji
+                 w metryce Manhattan, przy remisie do pierwszej w kolejności np.argwhere), w kolejności np.argwhere
+        """
+        return 'station_loads', CostCache.fingerprint(client_map)
+
+    def get(self, namespace: Hashable, key: int):
+        """
+        :param namespace: przestrzeń nazw
+        :param key: hasz układu stacji
+        :return: zapamiętana wartość lub None, gdy jej brak
+        """
+        entry = (namespace, key)
+        if entry in self.__entries:
+            self.__entries.move_to_end(entry)
+            self.__hits += 1
+            return self.__entries[entry]
+        self.__misses += 1
+        return None
+
+    def put(self, namespace: Hashable, key: int, value):
+        """
+        Zapamiętuje wartość; po przekroczeniu pojemności usuwa najdawniej używany wpis.
+
+        :param namespace: przestrzeń nazw
+        :param key: hasz układu stacji
+        :param value: wartość do zapamiętania
+        """
+        entry = (namespace, key)
+        self.__entries[entry] = value
+        self.__entries.move_to_end(entry)
+        if len(self.__entries) > self.__capacity:
+            self.__entries.popitem(last=False)
+
+    def get_or_compute(self, namespace: Hashable, key: int, compute: Callable[[], float]) -> Tuple[float, bool]:
+        """
+        :param namespace: przestrzeń nazw
+        :param key: hasz układu stacji
+        :param compute: funkcja licząca wartość, gdy nie ma jej w pamięci
+        :return: wartość oraz informacja, czy pochodziła z pamięci podręcznej
+        """
+        value = self.get(namespace, key)
+        if value is not None:
+            return value, True
+        value = compute()
+        self.put(namespace, key, value)
+        return value, False
+
+    def clear(self):
+        """
+        Usuwa wszystkie wpisy i zeruje liczniki.
+        """
+        self.__entries.clear()
+        self.__hits = 0
+        self.__misses = 0
+
+    def get_statistics(self) -> dict:
+        """
+        :return: słownik z liczbą trafień, chybień, aktualnym rozmiarem i pojemnością
+        """
+        return {'hits': self.__hits, 'misses': self.__misses, 'size': len(self.__entries),
+                'capacity': self.__capacity}
+
+    def __len__(self):
+        return len(self.__entries)
@@ -0,0 +1,402 @@
+import numpy as np
+from abc import ABC, abstractmethod
+from typing import Tuple
+
+import src.DistanceFieldCache as DistanceFieldCache
+import src.Helpers as Helpers
+
+
+def distance_penalty(distance: np.array, d_max: int) -> np.array:
+    """
+    Wektorowa postać krzywej kary za odległość klienta od stacji dokującej.
+    Do d_max kosztem jest sama odległość, powyżej koszt rośnie wykładniczo i nasyca się na poziomie 2 * d_max.
+
+    :param distance: odległości (skalar lub macierz)
+    :param d_max: zasięg działania stacji dokujących
+    :return penalty: koszt odpowiadający danym odległościom
+    """
+    distance = np.asarray(distance, dtype='float64')
+    return np.where(distance <= d_max, distance, d_max * (2 - np.exp(-(distance - d_max) / d_max)))
+
+
+class CostFunctionInterface(ABC):
+    """
+    Interfejs klas liczących funkcję kosztu rozwiązania
+    """
+
+    @abstractmethod
+    def __init__(self,
+                 d_max: int,
+                 client_map: np.array):
+        pass
+
+    @abstractmethod
+    def cost(self, solution: np.array) -> float:
+        raise NotImplementedError
+
+
+class DiamondCost(CostFunctionInterface):
+    """
+    Pierwotna implementacja funkcji kosztu.
+    Dla każdej komórki z klientami przeszukuje kolejne pierścienie (diamenty) aż do znalezienia stacji dokującej.
+    Złożoność O(komórki x promień^2) dla każdego rozwiązania.
+    """
+
+    def __init__(self,
+                 d_max: int,
+                 client_map: np.array):
+        """
+        :param d_max: zasięg (promień) działania stacji dokujących
+        :param client_map: mapa z klientami
+        """
+        self.__d_max = d_max
+        self.__client_map = client_map
+        self.__map_shape = client_map.shape
+
+        self.__diamond_list = [Helpers.diamond_edge(r) for r in range(self.__map_shape[0] + self.__map_shape[1])]
+
+    def cost(self, solution: np.array) -> float:
+        """
+        Funkcja licząca koszt danego rozwiązania. Korzysta ze wzoru zamieszczonego w dokumentacji.
+
+        :param solution: rozwiązanie, dla którego liczona jest funkcja celu
+        :return cost: koszt dla tego rozwiązania
+        """
+        cost = 0
+        for index, value in np.ndenumerate(self.__client_map):
+            if value > 0:
+                cost += value * self.dist_to_nearest_pl(index, solution)
+
+        return cost
+
+    def dist_to_nearest_pl(self, actual_point: Tuple[int, int], pl_map: np.array) -> float:
+        """
+        Funkcja zwracająca odległość pomiędzy punktem [actual_point] a najbliższą stacją dokującą, jeśli ta odległość
+        jest mniejsza od D_max. W przeciwnym wypadku zwraca powiększoną wartość tej najmniejszej odległości.
+
+        :param actual_point: współrzędne komórki z klientami
+        :param pl_map: macierz stacji dokujących
+        :return: odległość (lub kara za odległość) do najbliższej stacji dokującej
+        """
+        y, x = actual_point
+        if pl_map[y, x]:
+            return 0
+        for r in range(self.__map_shape[0] + self.__map_shape[1]):
+            x_min = x - r if x - r > 0 else 0
+            x_max = x + r + 1 if x + r + 1 < self.__map_shape[1] else self.__map_shape[1]
+            y_min = y - r if y - r > 0 else 0
+            y_max = y + r + 1 if y + r + 1 < self.__map_shape[0] else self.__map_shape[0]
+
+            mx_min = r - (x - x_min)
+            mx_max = r + (x_max - 1 - x) + 1
+            my_min = r - (y - y_min)
+            my_max = r + (y_max - 1 - y) + 1
+
+            cut = pl_map[y_min:y_max, x_min:x_max]
+            mask = self.__diamond_list[r][my_min:my_max, mx_min:mx_max]
+            values = cut[mask]
+            if np.any(values):
+                return r if r <= self.__d_max else self.__d_max*(2 - np.exp(-(r - self.__d_max)/self.__d_max))
+
+
+class DistanceTransformCost(CostFunctionInterface):
+    """
+    Funkcja kosztu liczona na podstawie jednego pola odległości na rozwiązanie.
+    Pole odległości Manhattan od wszystkich stacji naraz wyznaczane jest transformatą odległościową
+    (Helpers.manhattan_distance_transform), a krzywa kary nakładana jest w jednym, wektorowym kroku.
+    Zwraca te same wartości co DiamondCost.
+    """
+
+    def __init__(self,
+                 d_max: int,
+                 client_map: np.array):
+        """
+        :param d_max: zasięg (promień) działania stacji dokujących
+        :param client_map: mapa z klientami
+        """
+        self.__d_max = d_max
+        self.__clients_mask = client_map > 0
+        self.__clients = client_map[self.__clients_mask].astype('float64')
+
+    def cost(self, solution: np.array) -> float:
+        """
+        Funkcja licząca koszt danego rozwiązania.
+
+        :param solution: rozwiązanie, dla którego liczona jest funkcja celu
+        :return cost: koszt dla tego rozwiązania
+        """
+        distance = self.distance_field(solution)[self.__clients_mask]
+        return float(np.sum(self.__clients * distance_penalty(distance, self.__d_max)))
+
+    def distance_field(self, solution: np.array) -> np.array:
+        """
+        :param solution: rozwiązanie (macierz stacji dokujących)
+        :return: macierz odległości Manhattan każdej komórki od najbliższej stacji dokującej
+        """
+        return Helpers.manhattan_distance_transform(solution)
+
+
+class FieldCacheCost(CostFunctionInterface):
+    """
+    Funkcja kosztu korzystająca z pamięci podręcznej pól odległości pojedynczych stacji (DistanceFieldCache).
+    Pole odległości rozwiązania to element po elemencie minimum z zapamiętanych pól jego stacji, więc pola
+    liczone są tylko dla pozycji stacji, które pojawiają się po raz pierwszy (lub zostały usunięte z pamięci).
+    """
+
+    def __init__(self,
+                 d_max: int,
+                 client_map: np.array,
+                 field_cache: DistanceFieldCache.DistanceFieldCache = None):
+        """
+        :param d_max: zasięg (promień) działania stacji dokujących
+        :param client_map: mapa z klientami
+        :param field_cache: pamięć podręczna pól odległości (None - nowa pamięć z metryką Manhattan)
+        """
+        self.__d_max = d_max
+        self.__clients_mask = client_map > 0
+        self.__clients = client_map[self.__clients_mask].astype('float64')
+        if field_cache is None:
+            field_cache = DistanceFieldCache.DistanceFieldCache(client_map.shape)
+        elif field_cache.get_map_shape() != client_map.shape:
+            raise ValueError("Rozmiar pól odległości nie zgadza się z rozmiarem mapy klientów")
+        self.__field_cache = field_cache
+
+    def cost(self, solution: np.array) -> float:
+        """
+        Funkcja licząca koszt danego rozwiązania.
+
+        :param solution: rozwiązanie, dla którego liczona jest funkcja celu
+        :return cost: koszt dla tego rozwiązania
+        """
+        distance = self.distance_field(solution)[self.__clients_mask]
+        return float(np.sum(self.__clients * distance_penalty(distance, self.__d_max)))
+
+    def distance_field(self, solution: np.array) -> np.array:
+        """
+        :param solution: rozwiązanie (macierz stacji dokujących)
+        :return: macierz odległości każdej komórki od najbliższej stacji dokującej
+        """
+        return self.__field_cache.distance_field(solution)
+
+    def station_field(self, position: Tuple[int, int]) -> np.array:
+        """
+        :param position: współrzędne stacji dokującej
+        :return: macierz odległości każdej komórki od stacji w danej pozycji
+        """
+        return self.__field_cache.field(position)
+
+    def client_distances(self, position: Tuple[int, int]) -> np.array:
+        """
+        :param position: współrzędne stacji dokującej
+        :return: odległości komórek z klientami (wierszami) od stacji w danej pozycji
+        """
+        return self.__field_cache.field(position)[self.__clients_mask]
+
+    def get_field_cache(self) -> DistanceFieldCache.DistanceFieldCache:
+        """
+        :return: pamięć podręczna pól odległości
+        """
+        return self.__field_cache
+
+
+class GeodesicCost(FieldCacheCost):
+    """
+    Funkcja kosztu z odległością geodezyjną - długością najkrótszej drogi omijającej bariery, po której
+    robot może faktycznie dojechać do stacji (Helpers.geodesic_distance_transform).
+
+    Pola odległości pozycji stacji zapamiętywane są w DistanceFieldCache, więc kolejne oceny rozwiązań
+    w przebiegu tabu search korzystają z gotowych pól, a przeszukiwanie wszerz wykonywane jest tylko dla pozycji
+    stacji, które pojawiają się po raz pierwszy.
+    """
+
+    def __init__(self,
+                 d_max: int,
+                 client_map: np.array,
+                 barrier_map: np.array = None,
+                 max_memory_mb: float = 64):
+        """
+        :param d_max: zasięg (promień) działania stacji dokujących
+        :param client_map: mapa z klientami
+        :param barrier_map: mapa barier, wartości niezerowe oznaczają komórki nieprzejezdne (None - brak barier)
+        :param max_memory_mb: maksymalna zajętość pamięci przez pola odległości w MB
+        """
+        super().__init__(d_max, client_map,
+                         DistanceFieldCache.DistanceFieldCache(client_map.shape, 'geodesic', barrier_map,
+                                                               max_memory_mb))
+
+
+class IncrementalCost(CostFunctionInterface):
+    """
+    Funkcja kosztu z przyrostowym (delta) liczeniem kosztu sąsiadów.
+
+    Dla rozwiązania bazowego (x_a) przechowuje odległość każdej komórki z klientami do wszystkich stacji, a także
+    odległość do najbliższej i drugiej najbliższej stacji oraz numer najbliższej stacji. Ruch jednej stacji
+    o co najwyżej r komórek w każdej osi (czyli co najwyżej 2r w metryce Manhattan) może zmienić przypisanie tylko
+    tych komórek, dla których odległość do przesuwanej stacji różni się od odległości do najbliższej stacji o mniej
+    niż 2r. Zbiory takich komórek liczone są raz na iterację, a koszt ruchu liczony jest wyłącznie na nich.
+    Przy zmianie rozwiązania bazowego odległości liczone są tylko dla stacji, które zmieniły pozycję.
+
+    Stacje numerowane są w kolejności np.argwhere (wierszami), tak samo jak przechodzi je generator sąsiedztwa.
+
+    Gdy podano field_cost, odległości komórek od stacji pochodzą z zapamiętanych pól odległości stacji
+    (DistanceFieldCache). Przy metryce geodezyjnej przesunięcie stacji o jedną komórkę może zmienić odległość
+    dowolnie (np. przejście na drugą stronę barier), więc pasma obejmują wtedy wszystkie komórki z klientami.
+    """
+
+    def __init__(self,
+                 d_max: int,
+                 client_map: np.array,
+                 r: int = None,
+                 field_cost: FieldCacheCost = None):
+        """
+        :param d_max: zasięg (promień) działania stacji dokujących
+        :param client_map: mapa z klientami
+        :param r: wielkość (promień) sąsiedztwa; gdy None, pasma komórek obejmują wszystkie komórki z klientami
+        :param field_cost: funkcja kosztu z pamięcią pól odległości, z której brane są odległości od stacji
+                           (None - odległość Manhattan liczona bezpośrednio)
+        """
+        self.__d_max = d_max
+        self.__r = r
+        self.__field_cost = field_cost
+        self.__is_geodesic = field_cost is not None and field_cost.get_field_cache().get_metric() == 'geodesic'
+        self.__map_shape = client_map.shape
+        self.__clients_pos = np.argwhere(client_map > 0)
+        self.__clients = client_map[client_map > 0].astype('float64')
+
+        self.__stations = None
+        self.__station_index = None
+        self.__base_cost = np.inf
+        self.__dist = None
+        self.__d1 = None
+        self.__d2 = None
+        self.__nearest = None
+        self.__penalty = None
+        self.__bands = None
+
+    def cost(self, solution: np.array) -> float:
+        """
+        Ustawia dane rozwiązanie jako bazowe i zwraca jego koszt.
+
+        :param solution: rozwiązanie, dla którego liczona jest funkcja celu
+        :return cost: koszt dla tego rozwiązania
+        """
+        self.reset(solution)
+        return self.__base_cost
+
+    def reset(self, solution: np.array):
+        """
+        Wyznacza stan potrzebny do liczenia kosztu ruchów względem rozwiązania bazowego.
+
+        :param solution: rozwiązanie bazowe (macierz stacji dokujących)
+        """
+        stations = np.argwhere(solution > 0)
+        self.__dist = self.__reuse_distances(stations)
+        self.__stations = stations
+        self.__station_index = np.full(self.__map_shape, -1, dtype='int32')
+        self.__station_index[tuple(self.__stations.T)] = np.arange(len(self.__stations))
+
+        if len(self.__stations) > 1:
+            two_nearest = np.partition(self.__dist, 1, axis=0)[:2]
+            self.__d1, self.__d2 = two_nearest[0], two_nearest[1]
+        else:
+            self.__d1 = self.__dist[0]
+            self.__d2 = np.full(self.__d1.shape, np.inf)
+        self.__nearest = np.argmin(self.__dist, axis=0)
+
+        self.__penalty = self.__clients * distance_penalty(self.__d1, self.__d_max)
+        self.__base_cost = float(np.sum(self.__penalty))
+
+        if self.__r is None or self.__is_geodesic:
+            self.__bands = [np.arange(len(self.__clients))] * len(self.__stations)
+        else:
+            self.__bands = [np.flatnonzero(dist - self.__d1 < 2 * self.__r) for dist in self.__dist]
+
+    def get_base_cost(self) -> float:
+        """
+        :return: koszt rozwiązania bazowego
+        """
+        return self.__base_cost
+
+    def get_station_loads(self) -> np.array:
+        """
+        :return: liczba klientów przypisanych do każdej stacji rozwiązania bazowego (do najbliższej stacji, przy remisie
+                 do pierwszej w kolejności np.argwhere)
+        """
+        return np.bincount(self.__nearest, weights=self.__clients, minlength=len(self.__stations))
+
+    def station_index(self, position: Tuple[int, int]) -> int:
+        """
+        :param position: współrzędne komórki
+        :return: numer stacji stojącej w danej komórce rozwiązania bazowego (-1, gdy nie ma tam stacji)
+        """
+        return int(self.__station_index[position])
+
+    def move_delta(self, station: int, destination: Tuple[int, int]) -> float:
+        """
+        Zmiana kosztu po przesunięciu jednej stacji rozwiązania bazowego do komórki destination.
+
+        :param station: numer przesuwanej stacji
+        :param destination: współrzędne komórki docelowej
+        :return: koszt sąsiada pomniejszony o koszt rozwiązania bazowego
+        """
+        return float(self.moves_delta(station, np.asarray([destination]))[0])
+
+    def moves_delta(self, station: int, destinations: np.array) -> np.array:
+        """
+        Wektorowa wersja move_delta - zmiany kosztu dla wielu komórek docelowych tej samej stacji naraz.
+
+        :param station: numer przesuwanej stacji
+        :param destinations: współrzędne komórek docelowych (tablica n x 2)
+        :return: tablica n zmian kosztu względem rozwiązania bazowego
+        """
+        band = self.__bands[station]
+        if self.__r is not None and np.any(np.abs(destinations - self.__stations[station]) > self.__r):
+            raise ValueError("Ruch stacji dłuższy niż promień sąsiedztwa r={}".format(self.__r))
+
+        if self.__field_cost is None:
+            pos = self.__clients_pos[band]
+            new_dist = (np.abs(pos[None, :, 0] - destinations[:, 0, None]) +
+                        np.abs(pos[None, :, 1] - destinations[:, 1, None]))
+        else:
+            new_dist = self.__distance_to(destinations)
+            if len(band) < len(self.__clients):
+                new_dist = np.take(new_dist, band, axis=1)
+        old_dist = np.where(self.__nearest[band] == station, self.__d2[band], self.__d1[band])
+        new_penalty = self.__clients[band] * distance_penalty(np.minimum(old_dist, new_dist), self.__d_max)
+
+        return np.sum(new_penalty, axis=1) - np.sum(self.__penalty[band])
+
+    def __reuse_distances(self, stations: np.array) -> np.array:
+        """
+        Odległości komórek z klientami od stacji nowego rozwiązania bazowego. Wiersze stacji, które stały już
+        w poprzednim rozwiązaniu bazowym, są przepisywane, więc po przyjęciu ruchu jednej stacji liczony jest tylko
+        wiersz przesuniętej stacji (przy polach odległości - jedno odczytanie pola zamiast k).
+
+        :param stations: współrzędne stacji nowego rozwiązania bazowego (tablica k x 2)
+        :return: macierz k x liczba komórek z klientami z odległościami
+        """
+        if self.__stations is None:
+            return self.__distance_to(stations)
+        previous = {tuple(position): row for position, row in zip(self.__stations.tolist(), self.__dist)}
+        dist = np.empty((len(stations), len(self.__clients)), dtype='int64')
+        new = []
+        for i, position in enumerate(stations.tolist()):
+            row = previous.get(tuple(position))
+            if row is None:
+                new.append(i)
+            else:
+                dist[i] = row
+        if new:
+            dist[new] = self.__distance_to(stations[new])
+        return dist
+
+    def __distance_to(self, stations: np.array) -> np.array:
+        """
+        :param stations: współrzędne stacji dokujących (tablica k x 2)
+        :return: macierz k x liczba komórek z klientami z odległościami (Manhattan lub geodezyjnymi)
+        """
+        if self.__field_cost is not None:
+            return np.array([self.__field_cost.client_distances(station) for station in stations],
+                            dtype='int64').reshape(len(stations), len(self.__clients))
+        return (np.abs(self.__clients_pos[None, :, 0] - stations[:, 0, None]) +
+                np.abs(self.__clients_pos[None, :, 1] - stations[:, 1, None]))
@@ -5,6 +5,7 @@ from matplotlib import animation
 from typing import Dict
 from src.SettingMenager import setting_menager
 from src.PlotSaver import save_plot_to_file, save_anim_to_file
+import src.TrajectoryRecorder as TrajectoryRecorder
 from copy import copy
 """
     Funkcja służaca do reprezentacji graficznej macierzy klientów 
@@ -99,6 +100,7 @@ class DataCollectorPlotter:
         self.__generate_3D_plots = False
         self.__iteration_count = 0
         self.__x_a_list = []
+        self.__x_a_hash_list = []
         self.__Q_a_list = []
         self.__Tabu_list = []
         self.__long_term_Tabu_list = []
@@ -144,7 +146,8 @@ class DataCollectorPlotter:
     def collect_data(self, x_a_itr: np.array, Q_a_itr: float, tabu_list: np.array,
                      long_term_tabu_list: np.array, elems_in_nei: int,
                      av_cadence: float, av_long_cadence: float,
-                     elems_in_short_tabu: float, elems_in_long_tabu: float
+                     elems_in_short_tabu: float, elems_in_long_tabu: float,
+                     x_a_hash: int = None
                      ):
         """
         Funkcja zbierająca odpowiednie dane do reprezentacji przebiegu algorytmu.
@@ -158,9 +161,11 @@ class DataCollectorPlotter:
         :param av_long_cadence: "Średni wiek" zabronienia z listy długoterminowej tabu search
         :param elems_in_short_tabu: Ilość zabronień wynikająca z listy krótkoterminowej
         :param elems_in_long_tabu: Ilość zabronień wynikająca z listy długoterminowej
+        :param x_a_hash: Hasz Zobrista bieżącego rozmieszczenia stacji dokujących
         :return:
         """
         self.__x_a_list.append(np.copy(x_a_itr.T))
+        self.__x_a_hash_list.append(x_a_hash)
         self.__Q_a_list.append(Q_a_itr)
         self.__Tabu_list.append(np.copy(tabu_list).T)
         self.__long_term_Tabu_list.append(np.copy(long_term_tabu_list).T)
@@ -173,6 +178,18 @@ class DataCollectorPlotter:
             self.__min_Q_a_pos = self.__iteration_count
         self.__iteration_count = self.__iteration_count + 1
 
+    def get_x_a_hash_list(self) -> list:
+        """
+        :return: hasze Zobrista bieżących rozwiązań w kolejnych iteracjach
+        """
+        return self.__x_a_hash_list
+
+    def get_number_of_distinct_solutions(self) -> int:
+        """
+        :return: liczba różnych rozwiązań odwiedzonych przez algorytm (rozpoznawanych po haszu)
+        """
+        return len(set(self.__x_a_hash_list))
+
     def plot_data(self):
         """
         Funkcja rysująca odpowiednie wykresy.
@@ -502,13 +519,26 @@ def plot_map_barriers(_barrier_map:np.array):
     plt.show()
 
 
+def _load_robot_moves(_robot_moves):
+    """
+    :param _robot_moves: macierz pozycji robotów, pozycje zapisane przez TrajectoryRecorder lub ścieżka do pliku .npy
+                         z pozycjami zapisanymi przez TrajectoryRecorder
+    :return: pozycje robotów indeksowane klatkami (plik odczytywany jest leniwie, klatka po klatce)
+    """
+    if isinstance(_robot_moves, str):
+        return TrajectoryRecorder.load_trajectories(_robot_moves)
+    return _robot_moves
+
+
 def _plot_robots_movements(_robot_mov_list: np.array, _barrier_map: np.array, doc_station_map: np.array = None, plot_name:str = 'przemieszczenie_robotow'):
     """
     Funkcja służąca do wygenerowania mapy wszystkich ruchów jakie miały miejsce podczas przeprowadzania symulacji
     Istnieje opcjoinalny parametr do naniesienia pozycji stacji dokujących
+    Pozycje robotów mogą być podane także jako pozycje zapisane przez TrajectoryRecorder lub ścieżka do ich pliku
     :return:
     """
     barrier_map = copy(_barrier_map)
+    _robot_mov_list = _load_robot_moves(_robot_mov_list)
 
     x_size = _barrier_map.shape[1]
     y_size = _barrier_map.shape[0]
@@ -517,15 +547,17 @@ def _plot_robots_movements(_robot_mov_list: np.array, _barrier_map: np.array, do
     im = plt.imshow(_barrier_map, origin='lower', interpolation='None', cmap='plasma')
 
     (__iteration_count, robot_count, _) = _robot_mov_list.shape
-    # Petla iterujaca po poszczegolnych etapach symulacji
+    # Petla iterujaca po poszczegolnych etapach symulacji - odczytywana jest tylko jedna klatka na iteracje
+    next_mov = _robot_mov_list[0] if __iteration_count > 0 else None
     for itr in range(1, __iteration_count):
+        prev_mov, next_mov = next_mov, _robot_mov_list[itr]
         # petla po poszczegolnych robotach
         for robot_id in range(robot_count):
-            pos_arrow_head = _robot_mov_list[itr, robot_id, :]
+            pos_arrow_head = next_mov[robot_id, :]
             x_arrow_head = pos_arrow_head[1]
             y_arrow_head = pos_arrow_head[0]
             # Znajdz poorzednia pozycje danego robota
-            pos_arrow_begin = _robot_mov_list[itr-1, robot_id, :]
+            pos_arrow_begin = prev_mov[robot_id, :]
             x_arrow_begin = pos_arrow_begin[1]
             y_arrow_begin = pos_arrow_begin[0]
             dx = x_arrow_head - x_arrow_begin
@@ -575,7 +607,8 @@ class RobotAnimationPlot:
         self.doc_station_map = _doc_station_map
         self.barrier_map = _barrier_map
         self.file_name = plot_name
-        self.robot_moves = _robot_moves
+        # pozycje zapisane przez TrajectoryRecorder odczytywane są leniwie, klatka po klatce
+        self.robot_moves = _load_robot_moves(_robot_moves)
         x_size = _barrier_map.shape[1]
         y_size = _barrier_map.shape[0]
         frame_offset = 3
@@ -601,11 +634,12 @@ class RobotAnimationPlot:
 
             # Utwórz macierz ruchu i na jej podstawie narysuj strzałki
             if frame > 0:
+                # poprzednia klatka odczytywana jest przed bieżącą, żeby zapisane różnicowo pozycje odtwarzać
+                # po kolei
+                prev_mov = self.robot_moves[frame - 1, :, :]
                 curr_mov = self.robot_moves[frame, :, :]
                 if self.robot_anim_itr == 0:
                     prev_mov = curr_mov
-                else:
-                    prev_mov = self.robot_moves[frame - 1, :, :]
                 # petla po poszczegolnych robotach
                 for robot_id in range(robot_count):
                     pos_arrow_head = curr_mov[robot_id, :]
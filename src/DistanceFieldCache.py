@@ -0,0 +1,128 @@
+import numpy as np
+from collections import OrderedDict
+from typing import Tuple
+
+import src.Helpers as Helpers
+
+
+class DistanceFieldCache:
+    """
+    Pamięć podręczna pól odległości pojedynczych stacji dokujących.
+
+    Dla każdej pozycji stacji przechowywane jest pole odległości (Manhattan lub geodezyjnej) wszystkich komórek mapy
+    od tej pozycji, zapisane jako uint16. Stacje przesuwają się w jednej iteracji tylko o kilka komórek, więc te same
+    pozycje oceniane są wielokrotnie, a pole odległości całego rozwiązania to element po elemencie minimum z pól
+    jego stacji. Zajętość pamięci ograniczona jest zadaną wartością w MB - po jej przekroczeniu usuwane są
+    najdawniej używane pola (LRU).
+    """
+
+    def __init__(self,
+                 map_shape: Tuple[int, int],
+                 metric: str = 'manhattan',
+                 barrier_map: np.array = None,
+                 max_memory_mb: float = 64):
+        """
+        :param map_shape: rozmiar mapy
+        :param metric: metryka odległości: 'manhattan' lub 'geodesic'
+        :param barrier_map: mapa barier dla metryki 'geodesic', wartości niezerowe oznaczają komórki nieprzejezdne
+                            (None - brak barier)
+        :param max_memory_mb: maksymalna zajętość pamięci przez pola odległości w MB
+        """
+        if metric not in ('manhattan', 'geodesic'):
+            raise ValueError("Nieznana metryka odległości: {}".format(metric))
+        if max_memory_mb <= 0:
+            raise ValueError("Limit pamięci pól odległości musi być dodatni")
+
+        self.__map_shape = tuple(map_shape)
+        self.__metric = metric
+        self.__passable = np.ones(self.__map_shape, dtype=bool) if barrier_map is None else barrier_map == 0
+        self.__max_memory_mb = max_memory_mb
+        # odległości większe od zakresu uint16 (np. komórki nieosiągalne) zapisywane są jako maksimum zakresu
+        self.__unreachable = np.iinfo(np.uint16).max
+        field_bytes = np.prod(self.__map_shape) * np.dtype(np.uint16).itemsize
+        self.__capacity = max(1, int(max_memory_mb * 2 ** 20 // field_bytes))
+
+        self.__fields = OrderedDict()
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+
+    def field(self, position: Tuple[int, int]) -> np.array:
+        """
+        :param position: współrzędne stacji dokującej
+        :return: pole odległości (uint16, tylko do odczytu) każdej komórki mapy od stacji w danej pozycji
+        """
+        position = (int(position[0]), int(position[1]))
+        if position in self.__fields:
+            self.__fields.move_to_end(position)
+            self.__hits += 1
+            return self.__fields[position]
+
+        self.__misses += 1
+        field = self.__compute_field(position)
+        self.__fields[position] = field
+        if len(self.__fields) > self.__capacity:
+            self.__fields.popitem(last=False)
+            self.__evictions += 1
+        return field
+
+    def distance_field(self, solution: np.array) -> np.array:
+        """
+        :param solution: rozwiązanie (macierz stacji dokujących)
+        :return: pole odległości (uint16) każdej komórki od najbliższej stacji dokującej; gdy nie ma stacji,
+                 wszystkie komórki mają maksymalną wartość uint16
+        """
+        fields = [self.field(position) for position in np.argwhere(solution > 0)]
+        if not fields:
+            return np.full(self.__map_shape, self.__unreachable, dtype=np.uint16)
+        return np.minimum.reduce(fields)
+
+    def get_metric(self) -> str:
+        """
+        :return: metryka odległości
+        """
+        return self.__metric
+
+    def get_map_shape(self) -> Tuple[int, int]:
+        """
+        :return: rozmiar mapy
+        """
+        return self.__map_shape
+
+    def clear(self):
+        """
+        Usuwa wszystkie pola i zeruje liczniki.
+        """
+        self.__fields.clear()
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+
+    def get_statistics(self) -> dict:
+        """
+        :return: słownik z liczbą trafień, chybień, usuniętych pól, aktualnym rozmiarem, pojemnością (w polach)
+                 oraz zajętością i limitem pamięci w MB
+        """
+        memory_mb = len(self.__fields) * np.prod(self.__map_shape) * np.dtype(np.uint16).itemsize / 2 ** 20
+        return {'hits': self.__hits, 'misses': self.__misses, 'evictions': self.__evictions,
+                'size': len(self.__fields), 'capacity': self.__capacity, 'memory_mb': float(memory_mb),
+                'max_memory_mb': self.__max_memory_mb}
+
+    def __len__(self):
+        return len(self.__fields)
+
+    def __compute_field(self, position: Tuple[int, int]) -> np.array:
+        """
+        :param position: współrzędne stacji dokującej
+        :return: pole odległości od stacji w danej pozycji zapisane jako uint16
+        """
+        if self.__metric == 'manhattan':
+            distance = np.add.outer(np.abs(np.arange(self.__map_shape[0]) - position[0]),
+                                    np.abs(np.arange(self.__map_shape[1]) - position[1]))
+        else:
+            sources = np.zeros(self.__map_shape, dtype=bool)
+            sources[position] = True
+            distance = Helpers.geodesic_distance_transform(sources, self.__passable)
+        field = np.minimum(distance, self.__unreachable).astype(np.uint16)
+        field.setflags(write=False)
+        return field
@@ -0,0 +1,142 @@
+import numpy as np
+from typing import Tuple
+
+import src.Helpers as Helpers
+
+
+class DockRoutingTable:
+    """
+    Tablica tras do najbliższych stacji dokujących.
+
+    Jedno wielkoźródłowe przeszukiwanie wszerz od wszystkich stacji (w odwrotnym kierunku niż jadą roboty) wyznacza
+    mapę odległości do najbliższej stacji oraz dla każdej komórki następny krok trasy - pierwszego (w kolejności
+    sąsiadów z TrafficMapGenerator.__bfs) przejezdnego sąsiada bliższego stacji o 1. Wyznaczenie kolejnego kroku
+    robota to odczyt z tablicy, a trasy mają tę samą długość co trasy z __bfs (przy kilku najkrótszych trasach
+    może zostać wybrana inna z nich). Tablice wyznaczane są ponownie tylko po zmianie rozmieszczenia stacji.
+    """
+    # kolejność sąsiadów jak w TrafficMapGenerator.__bfs (przesunięcia wiersza i kolumny)
+    __NEIGHBORS = ((0, 1), (0, -1), (1, 0), (-1, 0))
+
+    def __init__(self, allowed_positions_map: np.array, docking_stations_map: np.array = None):
+        """
+        :param allowed_positions_map: mapa pozycji dozwolonych --- 0 oznacza brak bariery, 1 oznacza barierę
+        :param docking_stations_map: mapa stacji dokujących, wartości co najmniej 1 oznaczają stacje (None - tablice
+                                     wyznaczane są przy pierwszym wywołaniu update)
+        """
+        self.__passable = allowed_positions_map != 1
+        self.__unreachable = self.__passable.size
+        self.__docks = None
+        self.__distance = None
+        self.__next_hop = None
+        self.__rebuilds = 0
+        if docking_stations_map is not None:
+            self.update(docking_stations_map)
+
+    def update(self, docking_stations_map: np.array) -> bool:
+        """
+        Wyznacza tablice ponownie, jeśli zmieniło się rozmieszczenie stacji dokujących (prędkości ładowania nie mają
+        wpływu na trasy).
+
+        :param docking_stations_map: mapa stacji dokujących
+        :return: True, jeśli tablice zostały wyznaczone ponownie
+        """
+        docks = (docking_stations_map >= 1) & self.__passable
+        if self.__docks is not None and np.array_equal(docks, self.__docks):
+            return False
+        self.__docks = docks
+        self.__build()
+        self.__rebuilds += 1
+        return True
+
+    def get_distance_map(self) -> np.array:
+        """
+        :return: macierz odległości (tylko do odczytu) do najbliższej stacji dokującej; komórki nieprzejezdne
+                 i nieosiągalne mają wartość H * W
+        """
+        return self.__distance
+
+    def get_next_hop_map(self) -> np.array:
+        """
+        :return: macierz (tylko do odczytu) spłaszczonych indeksów komórek, do których prowadzi następny krok trasy;
+                 stacje oraz komórki nieosiągalne wskazują same na siebie
+        """
+        return self.__next_hop
+
+    def get_direction_map(self) -> np.array:
+        """
+        :return: macierz (H x W x 2) przesunięć robota w następnym kroku trasy do najbliższej stacji
+        """
+        rows, columns = np.divmod(self.__next_hop, self.__distance.shape[1])
+        current_rows, current_columns = np.indices(self.__distance.shape)
+        return np.stack((rows - current_rows, columns - current_columns), axis=2)
+
+    def get_unreachable_distance(self) -> int:
+        """
+        :return: wartość odległości oznaczająca brak trasy do stacji
+        """
+        return self.__unreachable
+
+    def get_rebuild_count(self) -> int:
+        """
+        :return: liczba wyznaczeń tablic
+        """
+        return self.__rebuilds
+
+    def distance(self, position: Tuple[int, int]) -> int:
+        """
+        :param position: współrzędne komórki
+        :return: odległość komórki od najbliższej stacji dokującej
+        """
+        return int(self.__distance[position[0], position[1]])
+
+    def direction(self, position: Tuple[int, int]) -> np.array:
+        """
+        :param position: współrzędne komórki
+        :return: przesunięcie robota w następnym kroku trasy do najbliższej stacji (na stacji - [0, 0])
+        """
+        row, column = divmod(int(self.__next_hop[position[0], position[1]]), self.__distance.shape[1])
+        return np.array([row - position[0], column - position[1]])
+
+    def route(self, start: Tuple[int, int]) -> np.array:
+        """
+        :param start: współrzędne punktu startowego
+        :return: macierz int32 (długość trasy x 2) współrzędnych (wiersz, kolumna) kolejnych komórek trasy
+                 do najbliższej stacji, włącznie z punktem startowym i stacją
+        """
+        distance = self.distance(start)
+        if distance >= self.__unreachable:
+            raise RuntimeError("Nie można odnaleźć najbliższej stacji dokującej")
+        width = self.__distance.shape[1]
+        next_hop = self.__next_hop.ravel()
+        cells = np.empty(distance + 1, dtype='int32')
+        cells[0] = int(start[0]) * width + int(start[1])
+        for i in range(distance):
+            cells[i + 1] = next_hop[cells[i]]
+        return np.stack(np.divmod(cells, width), axis=1)
+
+    def __build(self):
+        """
+        Wyznacza mapę odległości i tablicę następnych kroków dla aktualnego rozmieszczenia stacji.
+        """
+        shape = self.__passable.shape
+        distance = Helpers.geodesic_distance_transform(self.__docks, self.__passable)
+        distance[~self.__passable] = self.__unreachable
+
+        index = np.arange(distance.size).reshape(shape)
+        next_hop = np.copy(index)
+        found = self.__docks | (distance == self.__unreachable)
+        for dx, dy in self.__NEIGHBORS:
+            neighbor_distance = np.full(shape, self.__unreachable)
+            neighbor_index = np.zeros(shape, dtype='int64')
+            target = (slice(max(dx, 0), shape[0] + min(dx, 0)), slice(max(dy, 0), shape[1] + min(dy, 0)))
+            source = (slice(max(-dx, 0), shape[0] + min(-dx, 0)), slice(max(-dy, 0), shape[1] + min(-dy, 0)))
+            neighbor_distance[source] = distance[target]
+            neighbor_index[source] = index[target]
+            closer = ~found & (neighbor_distance == distance - 1)
+            next_hop[closer] = neighbor_index[closer]
+            found |= closer
+
+        distance.setflags(write=False)
+        next_hop.setflags(write=False)
+        self.__distance = distance
+        self.__next_hop = next_hop
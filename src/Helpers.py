@@ -12,6 +12,106 @@ def diamond(r: int) -> np.array:
 def diamond_edge(r: int) -> np.array:
     return np.add.outer(*[np.r_[:r, r:-1:-1]]*2) == r
 
+
+def diamond_convolution(values: np.array, r: int) -> np.array:
+    """
+    Suma wartości macierzy values w diamencie (kuli w metryce Manhattan) o promieniu r wokół każdej komórki.
+    Macierz uzupełniana jest zerami na brzegach, więc przy krawędziach sumowana jest tylko część diamentu leżąca
+    wewnątrz mapy - tak jak przy wycinaniu fragmentu maski diamentu dla pojedynczej komórki. Diament jest symetryczny,
+    więc splot jest równy korelacji i liczony jest jednym wywołaniem np.einsum na oknach przesuwnych (bez kopii).
+
+    :param values: macierz wartości (np. mapa klientów)
+    :param r: promień diamentu
+    :return: macierz sum o rozmiarze values
+    """
+    padded = np.pad(values, r).astype(np.result_type(values.dtype, np.int64))
+    windows = np.lib.stride_tricks.sliding_window_view(padded, (2 * r + 1, 2 * r + 1))
+    return np.einsum('ijkl,kl->ij', windows, diamond(r).astype(padded.dtype))
+
+
+def manhattan_distance_transform(sources: np.array) -> np.array:
+    """
+    Transformata odległościowa w metryce Manhattan (L1).
+    Dla każdej komórki wyznacza odległość do najbliższej niezerowej komórki macierzy sources.
+    Metryka L1 jest separowalna, więc wystarczą dwa przejścia (w przód i wstecz) wzdłuż każdej z osi,
+    zamiast przeszukiwania kolejnych pierścieni wokół każdej komórki.
+
+    :param sources: macierz, w której wartości niezerowe oznaczają źródła (np. stacje dokujące)
+    :return distance: macierz odległości; gdy nie ma żadnego źródła, wszystkie komórki mają wartość H + W
+    """
+    inf = sources.shape[0] + sources.shape[1]
+    distance = np.where(sources != 0, 0, inf).astype('int64')
+    for axis in (0, 1):
+        distance = _l1_sweep(distance, axis)
+    return np.minimum(distance, inf)
+
+
+def nearest_source_transform(sources: np.array) -> Tuple[np.array, np.array]:
+    """
+    Etykietowana transformata odległościowa w metryce Manhattan (podział Woronoja).
+    Dla każdej komórki wyznacza odległość do najbliższego źródła oraz numer tego źródła (indeks komórki źródła
+    w spłaszczonej macierzy). Przejścia są takie same jak w manhattan_distance_transform, ale na kluczach
+    odległość * H * W + numer źródła, więc przy równych odległościach wygrywa źródło o najmniejszym numerze wiersza,
+    a potem kolumny.
+
+    :param sources: macierz, w której wartości niezerowe oznaczają źródła (np. stacje dokujące)
+    :return distance, nearest: macierz odległości oraz macierz numerów najbliższych źródeł (-1, gdy nie ma żadnego
+                               źródła; wtedy odległość wynosi H + W)
+    """
+    size = sources.size
+    inf = sources.shape[0] + sources.shape[1]
+    key = np.where(sources != 0, np.arange(size).reshape(sources.shape), inf * size).astype('int64')
+    for axis in (0, 1):
+        key = _l1_sweep(key, axis, size)
+    key = np.minimum(key, inf * size)
+    distance, nearest = np.divmod(key, size)
+    return distance, np.where(distance < inf, nearest, -1)
+
+
+def geodesic_distance_transform(sources: np.array, passable: np.array) -> np.array:
+    """
+    Transformata odległościowa z uwzględnieniem przeszkód (odległość geodezyjna, ruchy w 4 kierunkach).
+    Wielkoźródłowe przeszukiwanie wszerz prowadzone jest naraz dla całego frontu: w każdym kroku front jest
+    przesuwany w 4 kierunkach operacjami na macierzach logicznych. Przez komórki nieprzejezdne nie można
+    przejechać, ale same otrzymują odległość (można do nich dojechać z sąsiedniej komórki przejezdnej).
+
+    :param sources: macierz, w której wartości niezerowe oznaczają źródła (np. stacje dokujące)
+    :param passable: macierz logiczna komórek przejezdnych
+    :return distance: macierz odległości; komórki nieosiągalne mają wartość H * W
+    """
+    unreachable = sources.size
+    distance = np.full(sources.shape, unreachable, dtype='int64')
+    reached = sources != 0
+    distance[reached] = 0
+    frontier = np.copy(reached)
+
+    step = 0
+    while np.any(frontier):
+        step += 1
+        neighbors = np.zeros(sources.shape, dtype=bool)
+        neighbors[1:, :] |= frontier[:-1, :]
+        neighbors[:-1, :] |= frontier[1:, :]
+        neighbors[:, 1:] |= frontier[:, :-1]
+        neighbors[:, :-1] |= frontier[:, 1:]
+        neighbors &= ~reached
+        distance[neighbors] = step
+        reached |= neighbors
+        frontier = neighbors & passable
+    return distance
+
+
+def _l1_sweep(values: np.array, axis: int, step: int = 1) -> np.array:
+    """
+    Jednowymiarowa transformata odległościowa L1 wzdłuż zadanej osi:
+    out[k] = min_m(values[m] + step * |k - m|), liczona dwoma kumulacyjnymi minimami (w przód i wstecz).
+    """
+    idx = np.arange(values.shape[axis]) * step
+    idx = idx[:, None] if axis == 0 else idx[None, :]
+    forward = np.minimum.accumulate(values - idx, axis=axis) + idx
+    backward = np.flip(np.minimum.accumulate(np.flip(values + idx, axis=axis), axis=axis), axis=axis) - idx
+    return np.minimum(forward, backward)
+
+
 def make_robot_setting_from_dict(dct):
     return RobotModel.RobotSettings(
                  battery_size=dct['battery_size'],
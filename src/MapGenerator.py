@@ -1,12 +1,18 @@
 """
 Generator mapy do znalezienia optymalnego rozmieszczenia stacji dokujących za pomocą tabu-search.
 """
-from typing import List
+from typing import List, Sequence, Tuple, Union
 import collections
+import os
 import numpy as np
-from copy import deepcopy
+from concurrent.futures import ProcessPoolExecutor
+from copy import copy
+from itertools import repeat
 
+import src.AllowedMoveTable as AllowedMoveTable
+import src.DockRoutingTable as DockRoutingTable
 import src.RobotModel as RobotModel
+import src.TrajectoryRecorder as TrajectoryRecorder
 
 
 def generate_random_settings(settings_number: int, allowed_positions_map: np.array):
@@ -107,12 +113,196 @@ class RobotsSwarm:
         return len(self.robots_list)
 
 
+class SwarmArrays:
+    """
+    Stan roju robotów zapisany jako struktura tablic numpy (po jednym elemencie na robota, w kolejności listy robotów;
+    index to numery robotów na tej liście). Pozycje przechowywane są jako spłaszczone indeksy komórek mapy
+    (wiersz * szerokość + kolumna), a przemieszczenia jako różnice takich indeksów. Metoda make_move odpowiada
+    wywołaniu Robot.make_move (a więc i RobotState.update_state) dla wszystkich robotów wskazanych maską naraz.
+    """
+    # atrybuty przechowujące po jednej wartości dla każdego robota
+    __FIELDS = ('ids', 'index', 'battery_size', 'battery_level', 'max_load', 'actual_load', 'failure', 'battery_low',
+                'is_loading', 'position', 'netto_gain', 'cumulative_loading_time', 'cumulative_awaiting_time',
+                '_SwarmArrays__battery_low_level')
+
+    def __init__(self, robots: List[RobotModel.Robot], map_shape: Tuple[int, int], loading_speed_dtype=np.int64):
+        """
+        :param robots: lista robotów, z których odczytywany jest stan początkowy
+        :param map_shape: rozmiar mapy
+        :param loading_speed_dtype: typ prędkości ładowania (wartości mapy stacji dokujących) - poziom baterii
+                                    przechowywany jest w typie mieszczącym zarówno jego wartości, jak i prędkości
+        """
+        states = [robot.get_state() for robot in robots]
+        self.map_shape = tuple(map_shape)
+        self.ids = np.array([robot.get_id() for robot in robots], dtype='int64')
+        self.index = np.arange(len(robots))
+        self.battery_size = np.array([state.battery_size for state in states])
+        self.battery_level = np.array([state.battery_level for state in states],
+                                      dtype=np.result_type(self.battery_size, loading_speed_dtype))
+        self.max_load = np.array([state.max_load for state in states])
+        self.actual_load = np.array([state.actual_load for state in states], dtype='int64')
+        self.failure = np.array([state.failure for state in states], dtype=bool)
+        self.battery_low = np.array([state.battery_low for state in states], dtype=bool)
+        self.is_loading = np.array([state.is_loading for state in states], dtype=bool)
+        positions = np.array([state.actual_position for state in states], dtype='int64').reshape(-1, 2)
+        self.position = positions[:, 0] * self.map_shape[1] + positions[:, 1]
+        self.netto_gain = np.array([robot.netto_gain for robot in robots], dtype='int64')
+        self.cumulative_loading_time = np.array([robot.cumulative_loading_time for robot in robots], dtype='int64')
+        self.cumulative_awaiting_time = np.array([robot.cumulative_awaiting_time for robot in robots], dtype='int64')
+        # niski stan baterii osiągany dla 40% pojemności
+        self.__battery_low_level = 0.4 * self.battery_size
+
+    def __len__(self):
+        return len(self.ids)
+
+    def select(self, mask: np.array) -> 'SwarmArrays':
+        """
+        :param mask: maska robotów
+        :return: stan wybranych robotów (kopia)
+        """
+        selected = copy(self)
+        for field in self.__FIELDS:
+            setattr(selected, field, getattr(self, field)[mask])
+        return selected
+
+    @staticmethod
+    def concatenate(first: 'SwarmArrays', second: 'SwarmArrays') -> 'SwarmArrays':
+        """
+        :return: stan robotów z obydwu obiektów (kopia, najpierw roboty z first)
+        """
+        joined = copy(first)
+        for field in SwarmArrays.__FIELDS:
+            setattr(joined, field, np.concatenate((getattr(first, field), getattr(second, field))))
+        return joined
+
+    def get_positions(self) -> np.array:
+        """
+        :return: macierz (liczba robotów x 2) współrzędnych robotów
+        """
+        return np.stack(np.divmod(self.position, self.map_shape[1]), axis=1)
+
+    def make_move(self, mask: np.array, step: np.array, new_load: np.array, loading_speed: np.array):
+        """
+        Aktualizuje stan robotów wskazanych maską tak samo jak Robot.make_move, pozostałe roboty nie są zmieniane.
+
+        :param mask: maska robotów wykonujących ruch
+        :param step: wektor przemieszczeń (różnic spłaszczonych indeksów komórek, dx * szerokość mapy + dy)
+        :param new_load: wektor zmian obciążenia
+        :param loading_speed: wektor prędkości ładowania
+        """
+        # gdyby się zdarzyło, że chcielibyśmy wziąć z robota więcej niż ma załadowane
+        new_load = np.where(self.actual_load + new_load < 0, self.actual_load, new_load)
+        level = self.battery_level
+        size = self.battery_size
+        # gałęzie RobotState.update_state: normalne działanie, ładowanie i niski poziom baterii
+        low = mask & self.battery_low
+        charging = low & self.is_loading
+        normal = mask ^ low
+        moving = mask ^ charging
+        discharging = low ^ charging
+
+        # w czasie normalnego działania bateria zużywa się zawsze, przy niskim poziomie baterii - tylko w czasie jazdy
+        drain = self.actual_load // 10
+        drain = np.where(normal, drain, drain >> 1) + 1
+        drain *= normal | (discharging & (step != 0))
+        new_level = level + (mask ^ discharging) * loading_speed - drain
+        new_level = np.where(normal, np.minimum(new_level, size), new_level)
+        is_loading = (loading_speed > 0) & (np.where(charging, level, new_level) < size)
+
+        # roboty w normalnym działaniu nie miały niskiego poziomu baterii, a ładujące się - miały
+        self.battery_low |= normal & (new_level < self.__battery_low_level)
+        self.battery_low ^= charging & ~is_loading
+        self.is_loading = np.where(mask, is_loading, self.is_loading)
+        self.battery_level = new_level
+        self.actual_load = self.actual_load + normal * new_load
+        self.position = self.position + moving * step
+
+        self.failure |= mask & ((new_level <= 0) | (self.actual_load > self.max_load))
+        self.netto_gain += mask & (new_load > 0)
+        self.cumulative_loading_time += mask & self.is_loading
+
+    def write_back(self, robots: List[RobotModel.Robot]):
+        """
+        Zapisuje stan z tablic do obiektów robotów.
+
+        :param robots: lista robotów, z której odczytano stan (roboty wybierane są według index)
+        """
+        positions = self.get_positions()
+        for i, robot in enumerate(robots[j] for j in self.index):
+            state = robot.get_state()
+            state.battery_level = self.battery_level[i].item()
+            state.actual_load = self.actual_load[i].item()
+            state.failure = bool(self.failure[i])
+            state.battery_low = bool(self.battery_low[i])
+            state.is_loading = bool(self.is_loading[i])
+            state.actual_position[:] = positions[i]
+            robot.netto_gain = self.netto_gain[i].item()
+            robot.cumulative_loading_time = self.cumulative_loading_time[i].item()
+            robot.cumulative_awaiting_time = self.cumulative_awaiting_time[i].item()
+
+
+def _run_replication(seed: int, allowed_positions_map: np.array, docking_stations_map: np.array,
+                     settings_list: List[RobotModel.RobotSettings], sim_len: int, engine: str, routing: str,
+                     keep_trajectories: bool) -> tuple:
+    """
+    Pojedyncza replikacja symulacji ruchu robotów uruchamiana w procesie puli. Rój tworzony jest od nowa z ustawień
+    początkowych robotów, a ziarno ustawia zarówno generator symulacji 'vectorized', jak i globalny generator
+    numpy.random (symulacja 'objects').
+
+    :return: mapy ruchu, ładowania i usterek, pozycje robotów (None, jeśli keep_trajectories jest False) oraz
+             łączne statystyki robotów i przejazdów do stacji dokujących
+    """
+    np.random.seed(seed)
+    generator = TrafficMapGenerator(allowed_positions_map, docking_stations_map, len(settings_list),
+                                    robots_swarm_predefined_settings=settings_list, engine=engine,
+                                    rng=np.random.default_rng(seed), routing=routing)
+    # bez zachowywania pozycji zapisywana jest tylko pierwsza klatka symulacji
+    recorder = TrajectoryRecorder.TrajectoryRecorder(every=1 if keep_trajectories else max(sim_len, 1))
+    traffic_map, loading_map, failure_map, robot_position, *statistics = generator.generate_map(sim_len, recorder)
+    return traffic_map, loading_map, failure_map, robot_position if keep_trajectories else None, statistics
+
+
 class TrafficMapGenerator:
 
+    # liczba kroków symulacji 'vectorized', dla których liczby losowe losowane są naraz
+    __BLOCK_SIZE = 256
+    # liczba ruchów losowanych naraz w symulacji 'objects'
+    __MOVE_DRAWS_BLOCK = 4096
+
     def __init__(self, allowed_positions_map: np.array, docking_stations_map: np.array, robots_number: int,
                  robots_swarm: RobotsSwarm = None,
-                 robots_swarm_predefined_settings: List[RobotModel.RobotSettings] = None):
+                 robots_swarm_predefined_settings: List[RobotModel.RobotSettings] = None,
+                 engine: str = 'objects',
+                 rng: np.random.Generator = None,
+                 routing: str = 'table'):
+        """
+        :param allowed_positions_map: mapa pozycji dozwolonych --- 0 oznacza brak bariery, 1 oznacza barierę
+        :param docking_stations_map: mapa stacji dokujących, wartość komórki oznacza prędkość ładowania
+        :param robots_number: liczba robotów (gdy rój jest losowany)
+        :param robots_swarm: rój robotów (opcjonalny)
+        :param robots_swarm_predefined_settings: ustawienia robotów (opcjonalne)
+        :param engine: sposób symulacji: 'objects' - pętla po obiektach robotów (pierwotna symulacja);
+                       'vectorized' - stan całego roju w tablicach numpy, aktualizowany naraz w każdym kroku
+        :param rng: generator liczb losowych symulacji 'vectorized' (None - generator z ziarnem losowanym globalnym
+                    generatorem np.random, więc symulacja jest powtarzalna po np.random.seed)
+        :param routing: sposób wyznaczania tras do najbliższej stacji dokującej w symulacji 'objects': 'table' - odczyt
+                        z tablicy następnych kroków (DockRoutingTable); 'bfs' - przeszukiwanie wszerz dla każdej trasy
+                        (symulacja 'vectorized' zawsze korzysta z tablicy)
+        """
+        if engine not in ('vectorized', 'objects'):
+            raise ValueError("Nieznany sposób symulacji: {}".format(engine))
+        if routing not in ('table', 'bfs'):
+            raise ValueError("Nieznany sposób wyznaczania tras: {}".format(routing))
         if robots_swarm_predefined_settings is None: robots_swarm_predefined_settings = []
+        self.__engine = engine
+        self.__routing = routing
+        self.__routing_table = DockRoutingTable.DockRoutingTable(allowed_positions_map)
+        self.__routes = None
+        self.__rng = np.random.default_rng(np.random.randint(np.iinfo(np.int64).max)) if rng is None else rng
+        self.__swarm_arrays = None
+        self.__move_table = AllowedMoveTable.AllowedMoveTable(allowed_positions_map)
+        self.__move_draws = np.zeros(0, dtype='int64')
+        self.__move_draws_cursor = 0
         self.__allowed_positions = allowed_positions_map
         # użyj przekazanego roju robotów lub wygeneruj losowy
         self.__robots_swarm = robots_swarm if robots_swarm else RobotsSwarm(robots_number, allowed_positions_map,
@@ -120,15 +310,43 @@ class TrafficMapGenerator:
         # tam, gdzie wartości są większe od zera, tam znajdują się stacje dokujące, wartość danej komórki oznacza
         # prędkość ładowania
         self.__docking_stations_map = docking_stations_map
+        # trasy robotów do stacji i z powrotem do pracy (macierze int32 współrzędnych) oraz kursory tych tras
         self.__paths_to_docks = {}
         self.__paths_to_work = {}
+        self.__dock_cursors = {}
+        self.__work_cursors = {}
 
         self.no_trips_to_docking_stations = 0
         self.cum_dist_to_dock_when_bat_low = 0
 
         self.busy_docks = np.zeros(docking_stations_map.shape, dtype=bool)
 
-    def generate_map(self, sim_len: int):
+    def set_docking_stations_map(self, docking_stations_map: np.array):
+        """
+        Zmienia mapę stacji dokujących. Zajętość stacji jest zerowana, a rozpoczęte trasy robotów do stacji
+        i z powrotem do pracy (wraz z ich kursorami) są porzucane - roboty z niskim poziomem baterii wyznaczają
+        trasy do nowych stacji, a pozostałe wracają do losowych ruchów. Tablica tras do stacji wyznaczana jest
+        ponownie przy następnej symulacji, jeśli zmieniło się rozmieszczenie stacji.
+
+        :param docking_stations_map: mapa stacji dokujących, wartość komórki oznacza prędkość ładowania
+        """
+        self.__docking_stations_map = docking_stations_map
+        self.busy_docks = np.zeros(docking_stations_map.shape, dtype=bool)
+        self.__paths_to_docks.clear()
+        self.__paths_to_work.clear()
+        self.__dock_cursors.clear()
+        self.__work_cursors.clear()
+        if self.__routes is not None:
+            self.__init_routes(len(self.__routes))
+
+    def get_routing_table(self) -> DockRoutingTable.DockRoutingTable:
+        """
+        :return: tablica tras do najbliższych stacji dokujących
+        """
+        self.__update_routing_table()
+        return self.__routing_table
+
+    def generate_map(self, sim_len: int, recorder: TrajectoryRecorder.TrajectoryRecorder = None):
         """
         Generacja mapy.
         Właściwie jest to symulacja działania robotów w magazynie/szklarni. Losowo wybierane są  obciążenia oraz
@@ -136,17 +354,95 @@ class TrafficMapGenerator:
         najbliższej stacji ładującej
 
         :sim_len: długość symulacji w iteracjach
+        :recorder: zapis pozycji robotów (None - pozycje zwracane są jako macierz int16 o wymiarach długość symulacji
+                   x liczba robotów x 2); jeśli podany, zamiast macierzy pozycji zwracany jest wynik
+                   recorder.get_trajectories()
+        """
+        self.__update_routing_table()
+        dense = recorder is None
+        if dense:
+            recorder = TrajectoryRecorder.TrajectoryRecorder()
+        recorder.open(sim_len, self.__robots_swarm.get_robot_count(), self.__docking_stations_map.shape)
+        if self.__engine == 'vectorized':
+            traffic_map, loading_map = self.__generate_map_vectorized(sim_len, recorder)
+        else:
+            traffic_map, loading_map = self.__generate_map_objects(sim_len, recorder)
+        recorder.close()
+        trajectories = recorder.get_trajectories()
+        return self.__summarize(traffic_map, loading_map, trajectories[:] if dense else trajectories)
+
+    def simulate_replications(self, n: int, sim_len: int, seeds: Union[int, Sequence[int]] = None,
+                              workers: int = None, keep_trajectories: bool = False) -> dict:
+        """
+        Niezależne replikacje symulacji (Monte-Carlo) uruchamiane w puli procesów. Każda replikacja zaczyna się od
+        ustawień początkowych robotów roju i aktualnej mapy stacji dokujących, niezależnie od wcześniejszych wywołań
+        generate_map. Mapy ruchu, ładowania i usterek redukowane są do średniej i wariancji (nieobciążonej, dla jednej
+        replikacji - zerowej) na bieżąco, w kolejności replikacji, więc w pamięci trzymane są tylko wyniki
+        replikacji jeszcze niezredukowanych.
+
+        :param n: liczba replikacji
+        :param sim_len: długość symulacji w iteracjach
+        :param seeds: ziarno, z którego wyprowadzane są ziarna replikacji, lub lista n ziaren replikacji
+        :param workers: liczba procesów puli (None - liczba rdzeni, ale nie więcej niż n)
+        :param keep_trajectories: czy zwracać pozycje robotów z każdej replikacji
+        :return: słownik: ziarna replikacji ('seeds'), średnie i wariancje map ('traffic_mean', 'traffic_var',
+                 'loading_mean', 'loading_var', 'failure_mean', 'failure_var'), statystyki robotów kolejnych
+                 replikacji (wektory 'netto_gain', 'loading_time', 'awaiting_time', 'dist_to_dock',
+                 'trips_to_docks') oraz lista pozycji robotów z kolejnych replikacji ('trajectories' - obiekty
+                 TrajectoryRecorder.Trajectories, None, jeśli keep_trajectories jest False)
+        """
+        if n < 1:
+            raise ValueError("Liczba replikacji musi być dodatnia")
+        if seeds is None or np.isscalar(seeds):
+            seed_sequence = np.random.SeedSequence(seeds)
+            seeds = [int(child.generate_state(1)[0]) for child in seed_sequence.spawn(n)]
+        elif len(seeds) != n:
+            raise ValueError("Liczba ziaren ({}) różni się od liczby replikacji ({})".format(len(seeds), n))
+        workers = min(n, os.cpu_count() or 1) if workers is None else workers
+
+        settings_list = [robot.get_settings() for robot in self.__robots_swarm]
+        maps = np.zeros((3,) + self.__docking_stations_map.shape)
+        squares = np.zeros_like(maps)
+        statistics = []
+        trajectories = [] if keep_trajectories else None
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(_run_replication, seeds, repeat(self.__allowed_positions),
+                               repeat(self.__docking_stations_map), repeat(settings_list), repeat(sim_len),
+                               repeat(self.__engine), repeat(self.__routing), repeat(keep_trajectories))
+            # algorytm Welforda - średnia i suma kwadratów odchyleń aktualizowane po każdej replikacji
+            for i, (traffic_map, loading_map, failure_map, robot_position, robot_statistics) in enumerate(results):
+                replication_maps = np.stack((traffic_map, loading_map, failure_map))
+                delta = replication_maps - maps
+                maps += delta / (i + 1)
+                squares += delta * (replication_maps - maps)
+                statistics.append(robot_statistics)
+                if keep_trajectories:
+                    trajectories.append(robot_position)
+
+        variances = squares / (n - 1) if n > 1 else squares
+        statistics = np.array(statistics, dtype=float).reshape(n, -1)
+        summary = {'seeds': list(seeds), 'trajectories': trajectories}
+        for i, name in enumerate(('traffic', 'loading', 'failure')):
+            summary[name + '_mean'] = maps[i]
+            summary[name + '_var'] = variances[i]
+        for i, name in enumerate(('netto_gain', 'loading_time', 'awaiting_time', 'dist_to_dock', 'trips_to_docks')):
+            summary[name] = statistics[:, i]
+        return summary
+
+    def __generate_map_objects(self, sim_len: int, recorder: TrajectoryRecorder.TrajectoryRecorder):
+        """
+        Symulacja z pętlą po obiektach robotów. Parametry jak w generate_map.
+
+        :return: mapy ruchu i ładowania
         """
         # mapa pokazująca, gdzie jest duy ruch robotów
         traffic_map = np.zeros(self.__docking_stations_map.shape)
         # mapa pokazująca, gdzie zazwyczaj znajdują się roboty z niskim poziomem baterii
         loading_map = np.zeros(self.__docking_stations_map.shape)
-        # mapa pokazująca, gdzie ewentualnie znajdują się popsute roboty
-        failure_map = np.zeros(self.__docking_stations_map.shape)
-        # Macierz zaweirająca pozcyje danego robota w danej iteracji
-        # Skałda sie ona z wymiarów długosć iteracji x ilosć robotów x pozycja (2xint)
+        # Macierz zaweirająca pozcyje robotów w danej iteracji - ilosć robotów x pozycja (2xint), przekazywana do
+        # zapisu po każdej iteracji
         robot_count = self.__robots_swarm.get_robot_count()
-        robot_position = np.zeros((sim_len, robot_count, 2))
+        robot_position = np.zeros((1, robot_count, 2), dtype='int16')
 
         for _ in range(sim_len):  # powtarza kroki symulacji tak długo, jak zadano
             robot_pos_sim_itr = []
@@ -155,7 +451,7 @@ class TrafficMapGenerator:
                     # Zapisanie pozycji danego robota do odpowiedniej komórki w macierzy
                     r_pos = robot.get_actual_position()
                     id = robot.get_id()
-                    robot_position[_, id, :] = r_pos
+                    robot_position[0, id, :] = r_pos
                     continue  # (nie zakładamy możliwości naprawy w czasie symulacji)
                 elif robot.is_loading():  # jeśli robot się ładuje
                     r_pos = robot.get_actual_position()
@@ -184,7 +480,7 @@ class TrafficMapGenerator:
                             loading_map[r_pos[0], r_pos[1]] += 1
                     elif robot.get_id() in self.__paths_to_work.keys():  # jeśli robot może wrócić do miejsca pracy
                         r_pos = robot.get_actual_position()
-                        if len(self.__paths_to_work[robot.get_id()]) > 0:
+                        if self.__work_cursors[robot.get_id()] < len(self.__paths_to_work[robot.get_id()]):
                             direction = self.__direction_to_work(robot.get_id(), r_pos)
                             robot.make_move(direction, 0, 0)
                         else:
@@ -201,8 +497,128 @@ class TrafficMapGenerator:
                 # Zapisanie pozycji danego robota do odpowiedniej komórki w macierzy
                 r_pos = robot.get_actual_position()
                 id = robot.get_id()
-                robot_position[_, id, :] = r_pos
+                robot_position[0, id, :] = r_pos
+            recorder.record(robot_position)
 
+        return traffic_map, loading_map
+
+    def __generate_map_vectorized(self, sim_len: int, recorder: TrajectoryRecorder.TrajectoryRecorder):
+        """
+        Symulacja z całym stanem roju w tablicach numpy (SwarmArrays). W każdym kroku roboty dzielone są maskami
+        na te same grupy, co w pętli po obiektach (usterka, ładowanie, niski poziom baterii na stacji / w drodze
+        do stacji, powrót do pracy, praca), a stan wszystkich robotów aktualizowany jest naraz. Roboty z usterką
+        (nie zakładamy możliwości naprawy) usuwane są z tablic na początku każdego bloku kroków.
+        Droga do najbliższej stacji dokującej odczytywana jest z tablicy tras (DockRoutingTable), a pozycje robotów
+        przekazywane są do zapisu co blok kroków. Parametry jak w generate_map.
+
+        :return: mapy ruchu i ładowania
+        """
+        shape = self.__docking_stations_map.shape
+        cells = int(np.prod(shape))
+        docks = self.__docking_stations_map.ravel()
+        robots = self.__robots_swarm.robots_list
+        if self.__swarm_arrays is None:
+            self.__swarm_arrays = SwarmArrays(robots, shape, docks.dtype)
+            self.__retired = self.__swarm_arrays.select(self.__swarm_arrays.failure)
+            self.__init_routes(len(robots))
+
+        # odwiedzone komórki zliczane są co blok kroków
+        traffic_map = np.zeros(cells)
+        loading_map = np.zeros(cells)
+        robot_count_total = self.__robots_swarm.get_robot_count()
+        busy_docks = self.busy_docks.ravel()
+
+        for block_start in range(0, sim_len, self.__BLOCK_SIZE):
+            self.__retire_failed_robots(robots)
+            swarm = self.__swarm_arrays
+            robot_count = len(swarm)
+            block_len = min(self.__BLOCK_SIZE, sim_len - block_start)
+            # liczby losowe całego bloku: draw // 3 wybiera ruch, a draw % 3 - 1 to zmiana obciążenia
+            draws = self.__rng.integers(0, 3 * AllowedMoveTable.AllowedMoveTable.CHOICES, (block_len, robot_count))
+            move_draws, load_draws = np.divmod(draws, 3)
+            load_draws -= 1
+            # pozycje robotów przed każdym krokiem bloku i po ostatnim oraz maski robotów liczonych w mapach
+            positions = np.empty((block_len + 1, robot_count), dtype='int64')
+            positions[0] = swarm.position
+            traffic_mask = np.empty((block_len, robot_count), dtype=bool)
+            loading_mask = np.empty((block_len, robot_count), dtype=bool)
+
+            for step in range(block_len):
+                position = swarm.position
+                dock_speed = docks[position]
+                loading = swarm.is_loading & ~swarm.failure
+                idle = ~(swarm.failure | swarm.is_loading)
+                low = idle & swarm.battery_low
+                at_dock = low & (dock_speed > 0)
+                to_dock = low ^ at_dock
+                healthy = idle ^ low
+                to_work = healthy & self.__has_work_route
+                working = healthy ^ to_work
+
+                # roboty, które się ładują, zawsze mają niski stan baterii (RobotState.update_state zeruje obie flagi
+                # naraz), więc po tym kroku będą miały baterię naładowaną o dock_speed - naładowane zwalniają stację
+                released = loading & (swarm.battery_level + dock_speed >= swarm.battery_size)
+                # roboty z niskim poziomem baterii na stacji dokującej zajmują ją, jeśli jest wolna, lub czekają
+                docking = self.__occupy_docks(busy_docks, position, released, at_dock)
+                swarm.cumulative_awaiting_time += at_dock & ~docking
+                self.__has_dock_route &= ~at_dock
+
+                # roboty z niskim poziomem baterii jadą do stacji, a naładowane wracają tą samą drogą do pracy
+                new_routes = to_dock & ~self.__has_dock_route
+                if np.count_nonzero(new_routes):
+                    self.__add_routes(new_routes.nonzero()[0], position[new_routes])
+                finished = to_work & (self.__cursor >= 2 * self.__route_length)
+                self.__has_work_route &= ~finished
+                going_back = to_work ^ finished
+                move = self.__route_steps(to_dock, going_back, position)
+
+                # pozostałe roboty poruszają się losowo i losowo zmieniają obciążenie
+                move = np.where(working, self.__random_moves(position, move_draws[step]), move)
+                new_load = working * load_draws[step]
+                swarm.make_move(loading | docking | to_dock | going_back | working, move, new_load,
+                                (loading | docking) * dock_speed)
+
+                traffic_mask[step] = idle ^ at_dock
+                loading_mask[step] = to_dock | to_work
+                positions[step + 1] = swarm.position
+
+            traffic_map += np.bincount(positions[:-1][traffic_mask], minlength=cells)
+            loading_map += np.bincount(positions[:-1][loading_mask], minlength=cells)
+            # zera zamiast np.empty - robot spoza swarm.ids i retired.ids nie zapisze do bloku przypadkowych wartości
+            robot_position = np.zeros((block_len, robot_count_total, 2), dtype='int16')
+            robot_position[:, swarm.ids, 0], robot_position[:, swarm.ids, 1] = np.divmod(positions[1:], shape[1])
+            robot_position[:, self.__retired.ids, :] = self.__retired.get_positions()
+            recorder.record(robot_position)
+
+        self.__swarm_arrays.write_back(robots)
+        return traffic_map.reshape(shape), loading_map.reshape(shape)
+
+    def __retire_failed_robots(self, robots: List[RobotModel.Robot]):
+        """
+        Usuwa roboty z usterką z tablic symulacji 'vectorized' (razem z ich trasami) i zapisuje ich stan do obiektów.
+
+        :param robots: lista robotów
+        """
+        failed = self.__swarm_arrays.failure
+        if not np.count_nonzero(failed):
+            return
+        retired = self.__swarm_arrays.select(failed)
+        retired.write_back(robots)
+        self.__retired = SwarmArrays.concatenate(self.__retired, retired)
+        self.__swarm_arrays = self.__swarm_arrays.select(~failed)
+        self.__routes = self.__routes[~failed]
+        self.__route_length = self.__route_length[~failed]
+        self.__cursor = self.__cursor[~failed]
+        self.__has_dock_route = self.__has_dock_route[~failed]
+        self.__has_work_route = self.__has_work_route[~failed]
+
+    def __summarize(self, traffic_map: np.array, loading_map: np.array, robot_position: np.array):
+        """
+        :return: wyniki symulacji zwracane przez generate_map - mapy ruchu, ładowania i usterek, pozycje robotów oraz
+                 łączne statystyki robotów i przejazdów do stacji dokujących
+        """
+        # mapa pokazująca, gdzie ewentualnie znajdują się popsute roboty
+        failure_map = np.zeros(self.__docking_stations_map.shape)
         for robot in self.__robots_swarm:
             if robot.failure_detected():
                 r_pos = robot.get_actual_position()
@@ -221,75 +637,226 @@ class TrafficMapGenerator:
                cumulative_gain, cumulative_loading_times, cumulative_awaiting_times, \
                self.cum_dist_to_dock_when_bat_low, self.no_trips_to_docking_stations
 
+    @staticmethod
+    def __occupy_docks(busy_docks: np.array, position: np.array, released: np.array, docking: np.array) -> np.array:
+        """
+        Zwalnianie i zajmowanie stacji dokujących w jednym kroku symulacji, w kolejności robotów na liście
+        (tak jak w pętli po obiektach): robot zajmuje stację, jeśli poprzednim zdarzeniem na tej stacji było jej
+        zwolnienie lub, gdy w tym kroku nie było wcześniejszych zdarzeń, stacja była wolna na początku kroku.
+        Macierz busy_docks jest aktualizowana.
+
+        :param busy_docks: spłaszczona macierz zajętości stacji dokujących
+        :param position: spłaszczone pozycje robotów
+        :param released: maska robotów zwalniających stację
+        :param docking: maska robotów próbujących zająć stację
+        :return: maska robotów, które zajęły stację
+        """
+        if not np.count_nonzero(released):
+            # nikt nie zwalnia stacji, a roboty (jeśli są) czekają na zajętych stacjach
+            free = docking & ~busy_docks[position]
+            if not np.count_nonzero(free):
+                return free
+        elif not np.count_nonzero(docking):
+            # stacje są tylko zwalniane
+            busy_docks[position[released]] = False
+            return docking
+
+        robots = (released | docking).nonzero()[0]
+        cells = position[robots]
+        order = np.lexsort((robots, cells))
+        robots, cells = robots[order], cells[order]
+        is_claim = docking[robots]
+
+        # granice grup zdarzeń dotyczących tej samej stacji
+        boundary = cells[1:] != cells[:-1]
+        first = np.concatenate(([True], boundary))
+        last = np.concatenate((boundary, [True]))
+        previous_release = np.concatenate(([False], ~is_claim[:-1]))
+        occupied = np.zeros(len(position), dtype=bool)
+        occupied[robots] = is_claim & np.where(first, ~busy_docks[cells], previous_release)
+        busy_docks[cells[last]] = is_claim[last]
+        return occupied
+
+    def __update_routing_table(self):
+        """
+        Wyznacza tablicę tras ponownie, jeśli zmieniło się rozmieszczenie stacji dokujących. Trasy do stacji, które
+        roboty już rozpoczęły, wyznaczane są wtedy od nowa z ich aktualnych pozycji.
+        """
+        if not self.__routing_table.update(self.__docking_stations_map):
+            return
+        self.__paths_to_docks.clear()
+        self.__dock_distance = self.__routing_table.get_distance_map().ravel()
+        self.__next_step = self.__routing_table.get_next_hop_map().ravel()
+        if self.__routes is not None:
+            self.__has_dock_route &= self.__cursor >= self.__route_length
+            longest = self.__longest_route()
+            if longest > self.__routes.shape[1]:
+                self.__routes = np.pad(self.__routes, ((0, 0), (0, longest - self.__routes.shape[1])))
+
+    def __longest_route(self) -> int:
+        """
+        :return: liczba punktów najdłuższej trasy do najbliższej stacji dokującej
+        """
+        unreachable = self.__routing_table.get_unreachable_distance()
+        return int(np.max(self.__dock_distance[self.__dock_distance < unreachable], initial=0)) + 1
+
+    def __init_routes(self, robot_count: int):
+        """
+        Przygotowuje miejsce na trasy robotów do najbliższych stacji dokujących (kolejne punkty tras odczytywane są
+        z tablicy tras): każdy robot przechowuje jedną trasę (od miejsca pracy do stacji, włącznie z obydwoma
+        końcami) oraz kursor - przez pierwsze długość trasy kroków trasa przechodzona jest od początku do stacji,
+        a przez kolejne od końca z powrotem do pracy.
+
+        :param robot_count: liczba robotów
+        """
+        self.__routes = np.zeros((robot_count, self.__longest_route()), dtype='int32')
+        self.__route_length = np.zeros(robot_count, dtype='int64')
+        self.__cursor = np.zeros(robot_count, dtype='int64')
+        self.__has_dock_route = np.zeros(robot_count, dtype=bool)
+        self.__has_work_route = np.zeros(robot_count, dtype=bool)
+
+    def __add_routes(self, robots: np.array, start: np.array):
+        """
+        Rozpoczyna trasy do najbliższych stacji dokujących wskazanych robotów. Kolejne punkty trasy odczytywane są
+        z tablicy następnych kroków w czasie jazdy i zapisywane, aby robot mógł wrócić tą samą drogą do pracy.
+
+        :param robots: indeksy robotów
+        :param start: spłaszczone pozycje startowe robotów
+        """
+        distance = self.__dock_distance[start]
+        if (distance >= self.__dock_distance.size).any():
+            raise RuntimeError("Nie można odnaleźć najbliższej stacji dokującej")
+        # trasa obejmuje również punkt startowy
+        self.__route_length[robots] = distance + 1
+        self.__cursor[robots] = 0
+        self.__has_dock_route[robots] = True
+        self.__has_work_route[robots] = True
+        self.no_trips_to_docking_stations += robots.size
+        self.cum_dist_to_dock_when_bat_low += int(distance.sum()) + robots.size
+
+    def __route_steps(self, to_dock: np.array, to_work: np.array, position: np.array) -> np.array:
+        """
+        Kolejny krok tras robotów jadących do stacji i wracających do pracy; pozostałe roboty oraz te, które przeszły
+        już całą trasę, stoją w miejscu. Tak jak w przypadku tras zwracanych przez __bfs, pierwszym punktem trasy
+        do stacji jest pozycja startowa (robot w pierwszym kroku stoi w miejscu), a trasa do pracy jest odwróconą
+        trasą do stacji.
+
+        :param to_dock: maska robotów jadących do stacji
+        :param to_work: maska robotów wracających do pracy
+        :param position: spłaszczone pozycje robotów
+        :return: wektor przemieszczeń (różnic spłaszczonych indeksów komórek)
+        """
+        move = np.zeros(len(position), dtype='int64')
+        robots = ((to_dock & (self.__cursor < self.__route_length)) | to_work).nonzero()[0]
+        if robots.size == 0:
+            return move
+        cursor = self.__cursor[robots]
+        length = self.__route_length[robots]
+        current = position[robots]
+        # robot wraca do pracy dopiero po dotarciu do stacji, czyli gdy kursor doszedł do końca trasy
+        back = cursor >= length
+        point = np.where(back, 2 * length - 1 - cursor, cursor)
+        next_point = np.where(back, self.__routes[robots, point],
+                              np.where(cursor == 0, current, self.__next_step[current]))
+        # dla wracających robotów zapisywany jest z powrotem ten sam punkt
+        self.__routes[robots, point] = next_point
+        self.__cursor[robots] = cursor + 1
+        move[robots] = next_point - current
+        return move
+
+    def __random_moves(self, position: np.array, draw: np.array) -> np.array:
+        """
+        Losowe ruchy robotów - dla każdego robota ruch wybierany jest z jednakowym prawdopodobieństwem spośród
+        przesunięć prowadzących do komórek mapy bez barier.
+
+        :param position: spłaszczone pozycje robotów
+        :param draw: wektor liczb losowych z przedziału [0, AllowedMoveTable.CHOICES)
+        :return: wektor przemieszczeń (różnic spłaszczonych indeksów komórek)
+        """
+        return self.__move_table.sample_flat(position, draw)
+
     def __generate_allowed_move(self, actual_position):
-        vmax = self.__allowed_positions.shape[0]
-        hmax = self.__allowed_positions.shape[1]
-        random_move = np.random.randint(-1, 2, 2)
-        new_v = actual_position[0] + random_move[0]
-        new_h = actual_position[1] + random_move[1]
-        while not (0 <= new_v < vmax and 0 <= new_h < hmax):
-            random_move = np.random.randint(-1, 2, 2)
-            new_v = actual_position[0] + random_move[0]
-            new_h = actual_position[1] + random_move[1]
-        while self.__allowed_positions[actual_position[0] + random_move[0]][actual_position[1] + random_move[1]] == 1:
-            random_move = np.random.randint(-1, 2, 2)
-            new_v = actual_position[0] + random_move[0]
-            new_h = actual_position[1] + random_move[1]
-            while not (0 <= new_v < vmax and 0 <= new_h < hmax):
-                random_move = np.random.randint(-1, 2, 2)
-                new_v = actual_position[0] + random_move[0]
-                new_h = actual_position[1] + random_move[1]
-        return random_move
+        """
+        Losowy ruch robota z tablicy dozwolonych ruchów. Liczby losowe losowane są blokami po __MOVE_DRAWS_BLOCK
+        z globalnego generatora numpy.random.
+
+        :param actual_position: aktualna pozycja robota
+        :return: przesunięcie robota
+        """
+        if self.__move_draws_cursor >= len(self.__move_draws):
+            self.__move_draws = self.__move_table.draw(self.__MOVE_DRAWS_BLOCK)
+            self.__move_draws_cursor = 0
+        draw = self.__move_draws[self.__move_draws_cursor]
+        self.__move_draws_cursor += 1
+        return self.__move_table.move(actual_position, draw)
 
     def __direction_to_nearest_dock(self, robot_id: int, robot_position: np.array):
         if robot_id not in self.__paths_to_docks.keys():
-            # odwrotna indeksacja, najpierw podany numer kolumny a potem wiersza, wartości też zwracane w odwrotnej indeksacji
-            self.__paths_to_docks[robot_id] = self.__bfs((robot_position[1], robot_position[0]))
-            self.__paths_to_work[robot_id] = deepcopy(self.__paths_to_docks[robot_id])
-            self.__paths_to_work[robot_id].reverse()
+            if self.__routing == 'table':
+                if self.__routing_table.get_distance_map() is None:
+                    self.__update_routing_table()
+                path = self.__routing_table.route(robot_position)
+            else:
+                path = self.__bfs(robot_position)
+            # trasa do pracy to ta sama trasa przechodzona od końca (widok, bez kopiowania)
+            self.__paths_to_docks[robot_id] = path
+            self.__paths_to_work[robot_id] = path[::-1]
+            self.__dock_cursors[robot_id] = 0
+            self.__work_cursors[robot_id] = 0
             self.no_trips_to_docking_stations += 1
-            self.cum_dist_to_dock_when_bat_low += len(self.__paths_to_docks[robot_id])
-
-        path = self.__paths_to_docks[robot_id]
-        try:
-            next_point = path.pop(
-                0)  # może się zdarzyć 'pop from empty list', gdy robot będzie już na miejscu stacji dokującej
-            xdiff, ydiff = next_point[1] - robot_position[0], next_point[0] - robot_position[1]  # coś nie tak
-            return np.array([xdiff, ydiff])
-        except IndexError:
-            return np.array([0, 0])
+            self.cum_dist_to_dock_when_bat_low += len(path)
+
+        return self.__next_direction(self.__paths_to_docks[robot_id], self.__dock_cursors, robot_id, robot_position)
 
     def __direction_to_work(self, robot_id: int, robot_position: np.array):
-        path = self.__paths_to_work[robot_id]
-        try:
-            next_point = path.pop(
-                0)  # może się zdarzyć 'pop from empty list', gdy robot będzie już na miejscu stacji dokującej
-            xdiff, ydiff = next_point[1] - robot_position[0], next_point[0] - robot_position[1]  # coś nie tak
-            return np.array([xdiff, ydiff])
-        except IndexError:
+        return self.__next_direction(self.__paths_to_work[robot_id], self.__work_cursors, robot_id, robot_position)
+
+    @staticmethod
+    def __next_direction(path: np.array, cursors: dict, robot_id: int, robot_position: np.array) -> np.array:
+        """
+        :param path: trasa - macierz int32 (długość trasy x 2) współrzędnych kolejnych punktów
+        :param cursors: słownik kursorów tras robotów (kursor robota jest przesuwany)
+        :param robot_id: numer robota
+        :param robot_position: aktualna pozycja robota
+        :return: przesunięcie do kolejnego punktu trasy ([0, 0], gdy robot przeszedł już całą trasę)
+        """
+        cursor = cursors[robot_id]
+        if cursor >= len(path):
+            # robot jest już na miejscu stacji dokującej (lub w miejscu pracy)
             return np.array([0, 0])
+        cursors[robot_id] = cursor + 1
+        return path[cursor] - robot_position
 
-    def __bfs(self, start):
+    def __bfs(self, start) -> np.array:
         """
-        Znajdowanie ścieżki do najbliższej stacji ładującej. Zwraca listę krotek określających indeksy pozycji.
-        Trzeba uważać, bo zwraca indeksy w odwrotnej kolejnosci, niż przyjmuje je numpy.array.
+        Znajdowanie ścieżki do najbliższej stacji ładującej. Przeszukiwanie wszerz zapamiętuje dla każdej odwiedzonej
+        komórki (indeksu spłaszczonej mapy) poprzednika, a ścieżka odtwarzana jest raz, po dotarciu do stacji.
         Algorytm uwzględnia ograniczenia w postaci barier oraz istnienie wielu stacji ładujących.
 
-        :start: krotka zawierająca współrzędne punktu startowego (x0, y0)
+        :start: współrzędne punktu startowego (wiersz, kolumna)
+        :return: macierz int32 (długość ścieżki x 2) współrzędnych kolejnych punktów ścieżki, włącznie z punktem
+                 startowym i stacją
         """
-        grid = self.__allowed_positions
-        width = grid.shape[1]
-        height = grid.shape[0]
-        queue = collections.deque([[start]])
-        start = (start[0], start[1])
-        seen = set(tuple([start]))
+        height, width = self.__allowed_positions.shape
+        passable = (self.__allowed_positions != 1).ravel().tolist()
+        docks = (self.__docking_stations_map >= 1).ravel().tolist()
+        parent = np.full(height * width, -1, dtype='int32')
+        start = int(start[0]) * width + int(start[1])
+        parent[start] = start
+        queue = collections.deque([start])
         while queue:
-            path = queue.popleft()
-            x, y = path[-1]
-            if self.__docking_stations_map[y][x] >= 1:
-                return path
-            for x2, y2 in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
-                if 0 <= x2 < width and 0 <= y2 < height and grid[y2][x2] != 1 and (x2, y2) not in seen:
-                    queue.append(path + [(x2, y2)])
-                    seen.add((x2, y2))
+            cell = queue.popleft()
+            if docks[cell]:
+                path = [cell]
+                while cell != start:
+                    cell = int(parent[cell])
+                    path.append(cell)
+                return np.stack(np.divmod(np.array(path[::-1], dtype='int32'), width), axis=1)
+            y, x = divmod(cell, width)
+            # kolejność sąsiadów: kolumna + 1, kolumna - 1, wiersz + 1, wiersz - 1
+            for neighbor, inside in ((cell + 1, x + 1 < width), (cell - 1, x > 0),
+                                     (cell + width, y + 1 < height), (cell - width, y > 0)):
+                if inside and passable[neighbor] and parent[neighbor] < 0:
+                    parent[neighbor] = cell
+                    queue.append(neighbor)
         raise RuntimeError("Nie można odnaleźć najbliższej stacji dokującej")
@@ -0,0 +1,326 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import src.CostFunction as CostFunction
+import src.DistanceFieldCache as DistanceFieldCache
+import src.ZobristHash as ZobristHash
+
+
+class BatchedNeighborhoodEvaluator:
+    """
+    Wektorowy przegląd sąsiedztwa rozwiązania.
+
+    Wszystkie ruchy jednej stacji (przesunięcia o (dx, dy), |dx|, |dy| <= r) tworzone są naraz jako tablice,
+    odsiewane maską dozwolonych komórek, oceniane w paczkach przez IncrementalCost.moves_delta, a następnie
+    sprawdzane względem obu list tabu operacjami na tablicach. Stacje przeglądane są w tej samej kolejności co
+    w NeighborhoodGenerator.move_generator, więc wynik (łącznie z przerwaniem przeglądu przy dynamicznym sąsiedztwie)
+    jest taki sam jak przy przeglądaniu ruchów jeden po drugim.
+    """
+
+    def __init__(self,
+                 r: int,
+                 allowed_cells: np.array,
+                 incremental_cost: CostFunction.IncrementalCost,
+                 chunk_size: int = 256,
+                 zobrist: ZobristHash.ZobristHash = None):
+        """
+        :param r: wielkość (promień) sąsiedztwa
+        :param allowed_cells: macierz logiczna komórek, w których można postawić stację dokującą
+        :param incremental_cost: obiekt liczący przyrostowo koszt ruchów
+        :param chunk_size: maksymalna liczba ruchów ocenianych w jednym wektorowym kroku
+        :param zobrist: haszowanie Zobrista używane do rozpoznawania odwiedzonych rozwiązań
+        """
+        self.__r = r
+        self.__zobrist = zobrist
+        self.__allowed_cells = allowed_cells
+        self.__incremental_cost = incremental_cost
+        self.__chunk_size = chunk_size
+
+        dx, dy = np.meshgrid(np.arange(-r, r + 1), np.arange(-r, r + 1), indexing='ij')
+        self.__offsets = np.stack([dx.ravel(), dy.ravel()], axis=1)
+
+    def evaluate(self,
+                 solution: np.array,
+                 tabu_list: np.array,
+                 long_term_tabu_list: np.array,
+                 threshold: float = None,
+                 first_station: int = 0,
+                 last_station: int = None,
+                 stop_station: np.array = None,
+                 solution_hash: int = None,
+                 visited_hashes: np.array = None,
+                 visited_cadence: np.array = None) -> dict:
+        """
+        Przegląda sąsiedztwo rozwiązania.
+
+        :param solution: aktualne rozwiązanie (macierz stacji dokujących)
+        :param tabu_list: krótkoterminowa lista tabu
+        :param long_term_tabu_list: długoterminowa lista tabu
+        :param threshold: przegląd kończy się na pierwszym dozwolonym ruchu spoza list tabu o koszcie mniejszym niż
+                          threshold (None - przegląd całego sąsiedztwa)
+        :param first_station: numer pierwszej stacji, której ruchy są przeglądane
+        :param last_station: numer stacji, przed którą przegląd się kończy (None - do ostatniej stacji)
+        :param stop_station: jednoelementowa tablica (np. we współdzielonej pamięci) z numerem stacji, przy której
+                             przerwano przegląd; ruchy dalszych stacji nie są oceniane, a po przerwaniu przeglądu
+                             wpisywany jest tu numer bieżącej stacji
+        :param solution_hash: hasz Zobrista rozwiązania
+        :param visited_hashes: posortowane hasze (uint64) niedawno odwiedzonych rozwiązań; ruchy prowadzące do nich
+                               traktowane są jak ruchy z krótkoterminowej listy tabu
+        :param visited_cadence: pozostały czas zabronienia odwiedzonych rozwiązań (w kolejności visited_hashes)
+        :return: słownik z najlepszym ruchem spoza list tabu ('move', 'cost'), najlepszym ruchem z list tabu
+                 ('tabu_move', 'tabu_cost'), statystykami przeglądu ('elems_in_nei', 'elems_in_short_tabu',
+                 'elems_in_long_tabu', 'cadence_sum', 'long_cadence_sum') oraz numerem stacji, przy której przegląd
+                 przerwano ('break_station', None - bez przerwania); ruchy opisane są tak jak
+                 w NeighborhoodGenerator.move_generator
+        """
+        self.__incremental_cost.reset(solution)
+        base_cost = self.__incremental_cost.get_base_cost()
+
+        stations = np.argwhere(solution == 1)
+        station_allowed = self.__allowed_cells[tuple(stations.T)]
+        not_allowed = np.count_nonzero(~station_allowed)
+
+        # największa kadencja listy tabu wśród pozostałych stacji (dla każdej przesuwanej stacji)
+        station_tabu = tabu_list[tuple(stations.T)]
+        other_tabu = np.max(np.where(np.eye(len(stations), dtype=bool), 0, station_tabu[None, :]), axis=1,
+                            initial=0)
+
+        missing = np.argwhere((long_term_tabu_list > 0) * (solution == 0))
+        missing_cadence = long_term_tabu_list[tuple(missing.T)]
+
+        result = {'move': None, 'cost': np.inf, 'tabu_move': None, 'tabu_cost': np.inf,
+                  'elems_in_nei': 0, 'elems_in_short_tabu': 0, 'elems_in_long_tabu': 0,
+                  'cadence_sum': 0.0, 'long_cadence_sum': 0.0, 'break_station': None}
+
+        last_station = len(stations) if last_station is None else min(last_station, len(stations))
+        for station in range(first_station, last_station):
+            if stop_station is not None and stop_station[0] < station:
+                break
+            source = stations[station]
+            destinations = source + self.__offsets
+            in_bounds = np.all((destinations >= 0) & (destinations < solution.shape), axis=1)
+            destinations = destinations[in_bounds]
+            destinations = destinations[solution[tuple(destinations.T)] == 0]
+
+            if not_allowed == 0 or (not_allowed == 1 and not station_allowed[station]):
+                allowed = self.__allowed_cells[tuple(destinations.T)]
+            else:
+                allowed = np.zeros(len(destinations), dtype=bool)
+
+            cost = np.full(len(destinations), np.inf)
+            allowed_index = np.flatnonzero(allowed)
+            for start in range(0, len(allowed_index), self.__chunk_size):
+                chunk = allowed_index[start:start + self.__chunk_size]
+                cost[chunk] = base_cost + self.__incremental_cost.moves_delta(station, destinations[chunk])
+
+            source_long_cadence = long_term_tabu_list[tuple(source)]
+            remaining = ~np.all(missing[None, :, :] == destinations[:, None, :], axis=2)
+            long_cadence = np.maximum(np.max(np.where(remaining, missing_cadence[None, :], 0), axis=1, initial=0),
+                                      source_long_cadence)
+            in_long_tabu = allowed & ((source_long_cadence > 0) | np.any(remaining, axis=1))
+
+            cadence = np.maximum(tabu_list[tuple(destinations.T)], other_tabu[station])
+            if visited_hashes is not None and len(visited_hashes) > 0:
+                hashes = self.__zobrist.moves(solution_hash, source, destinations)
+                index = np.minimum(np.searchsorted(visited_hashes, hashes), len(visited_hashes) - 1)
+                cadence = np.maximum(cadence, np.where(visited_hashes[index] == hashes, visited_cadence[index], 0))
+            in_tabu = allowed & ~in_long_tabu & (cadence > 0)
+            free = allowed & ~in_long_tabu & ~in_tabu
+
+            # przerwanie przeglądu na pierwszym ruchu, który spełnia warunek dynamicznego sąsiedztwa
+            is_break = False
+            if threshold is not None:
+                good = np.flatnonzero(free & (cost < threshold))
+                if len(good) > 0:
+                    is_break = True
+                    end = good[0] + 1
+                    cost, destinations = cost[:end], destinations[:end]
+                    free, in_tabu, in_long_tabu = free[:end], in_tabu[:end], in_long_tabu[:end]
+                    cadence, long_cadence = cadence[:end], long_cadence[:end]
+
+            result['elems_in_nei'] += len(destinations)
+            result['elems_in_short_tabu'] += int(np.count_nonzero(in_tabu))
+            result['elems_in_long_tabu'] += int(np.count_nonzero(in_long_tabu))
+            result['cadence_sum'] += float(np.sum(cadence[in_tabu]))
+            result['long_cadence_sum'] += float(np.sum(long_cadence[in_long_tabu]))
+
+            self.__update_best(result, 'move', 'cost', station, source, destinations, np.where(free, cost, np.inf))
+            self.__update_best(result, 'tabu_move', 'tabu_cost', station, source, destinations,
+                               np.where(in_tabu | in_long_tabu, cost, np.inf))
+            if is_break:
+                result['break_station'] = station
+                if stop_station is not None and station < stop_station[0]:
+                    stop_station[0] = station
+                break
+
+        return result
+
+    def __update_best(self, result: dict, move_key: str, cost_key: str, station: int, source: np.array,
+                      destinations: np.array, cost: np.array):
+        """
+        Zapamiętuje najlepszy ruch z paczki, jeśli jest lepszy od dotychczasowego (przy równych kosztach wygrywa
+        ruch wcześniejszy, tak jak przy przeglądaniu ruchów po kolei).
+        """
+        if len(cost) == 0:
+            return
+        best = int(np.argmin(cost))
+        if cost[best] < result[cost_key]:
+            result[cost_key] = float(cost[best])
+            result[move_key] = (station, (int(source[0]), int(source[1])),
+                                (int(destinations[best][0]), int(destinations[best][1])))
+
+
+# stan procesu roboczego puli, tworzony raz przez _init_worker
+_worker_state = {}
+
+
+def _attach(name: str, shape: tuple, dtype: str) -> tuple:
+    """
+    :return: obiekt pamięci współdzielonej o danej nazwie oraz tablica numpy na niej oparta
+    """
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _init_worker(static_name: str, state_name: str, stop_name: str, shape: tuple, d_max: int, r: int,
+                 chunk_size: int, distance_metric: str, field_cache_mb: float):
+    """
+    Inicjalizacja procesu roboczego. Mapa klientów, macierz dozwolonych komórek i mapa barier czytane są z pamięci
+    współdzielonej; na ich podstawie proces buduje własny IncrementalCost i BatchedNeighborhoodEvaluator. Gdy
+    podano metrykę, każdy proces zapamiętuje własne pola odległości stacji (DistanceFieldCache).
+    """
+    static_shm, static = _attach(static_name, (3,) + shape, 'float64')
+    state_shm, state = _attach(state_name, (3,) + shape, 'int32')
+    stop_shm, stop_station = _attach(stop_name, (1,), 'int64')
+
+    field_cost = None
+    if distance_metric is not None:
+        field_cache = DistanceFieldCache.DistanceFieldCache(shape, distance_metric, static[2], field_cache_mb)
+        field_cost = CostFunction.FieldCacheCost(d_max, static[0], field_cache)
+    incremental_cost = CostFunction.IncrementalCost(d_max, static[0], r, field_cost)
+    _worker_state.update(shm=(static_shm, state_shm, stop_shm), state=state, stop_station=stop_station,
+                         evaluator=BatchedNeighborhoodEvaluator(r, static[1] > 0, incremental_cost, chunk_size,
+                                                                ZobristHash.ZobristHash(shape)))
+
+
+def _evaluate_stations(first_station: int, last_station: int, threshold: float, solution_hash: int,
+                       visited_hashes: np.array, visited_cadence: np.array) -> dict:
+    """
+    Zadanie procesu roboczego - przegląd ruchów stacji o numerach z przedziału [first_station, last_station).
+    """
+    state = _worker_state['state']
+    return _worker_state['evaluator'].evaluate(state[0], state[1], state[2], threshold,
+                                               first_station, last_station, _worker_state['stop_station'],
+                                               solution_hash, visited_hashes, visited_cadence)
+
+
+class ParallelNeighborhoodEvaluator:
+    """
+    Równoległy przegląd sąsiedztwa w puli procesów (concurrent.futures).
+
+    Stacje dzielone są na ciągłe bloki, a każdy proces ocenia ruchy swojego bloku tak jak
+    BatchedNeighborhoodEvaluator. Mapa klientów i macierz dozwolonych komórek (zawierająca już macierz zabronień
+    wyliczoną z masek diamentów) trafiają do pamięci współdzielonej raz, a aktualne rozwiązanie i listy tabu są tam
+    nadpisywane w każdej iteracji. Przy dynamicznym sąsiedztwie procesy dzielą licznik stacji, przy której
+    przerwano przegląd - dalsze stacje nie są już oceniane. Wyniki bloków łączone są w kolejności stacji, więc
+    wynik jest taki sam jak przy przeglądzie w jednym procesie.
+    """
+
+    def __init__(self,
+                 workers: int,
+                 d_max: int,
+                 r: int,
+                 client_map: np.array,
+                 allowed_cells: np.array,
+                 chunk_size: int = 256,
+                 distance_metric: str = None,
+                 barrier_map: np.array = None,
+                 field_cache_mb: float = 64):
+        """
+        :param workers: liczba procesów roboczych
+        :param d_max: zasięg (promień) działania stacji dokujących
+        :param r: wielkość (promień) sąsiedztwa
+        :param client_map: mapa z klientami
+        :param allowed_cells: macierz logiczna komórek, w których można postawić stację dokującą
+        :param chunk_size: maksymalna liczba ruchów ocenianych w jednym wektorowym kroku
+        :param distance_metric: metryka pól odległości stacji zapamiętywanych przez procesy: 'manhattan' lub
+                                'geodesic' (None - odległość Manhattan liczona bezpośrednio, bez pamięci pól)
+        :param barrier_map: mapa barier dla odległości geodezyjnej (None - brak barier)
+        :param field_cache_mb: limit pamięci (w MB) na pola odległości w każdym procesie
+        """
+        self.__workers = workers
+        shape = client_map.shape
+
+        self.__static_shm = shared_memory.SharedMemory(create=True, size=3 * client_map.size * 8)
+        static = np.ndarray((3,) + shape, dtype='float64', buffer=self.__static_shm.buf)
+        static[0] = client_map
+        static[1] = allowed_cells
+        static[2] = 0 if barrier_map is None else barrier_map
+
+        self.__state_shm = shared_memory.SharedMemory(create=True, size=3 * client_map.size * 4)
+        self.__state = np.ndarray((3,) + shape, dtype='int32', buffer=self.__state_shm.buf)
+
+        self.__stop_shm = shared_memory.SharedMemory(create=True, size=8)
+        self.__stop_station = np.ndarray((1,), dtype='int64', buffer=self.__stop_shm.buf)
+
+        self.__pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                          initargs=(self.__static_shm.name, self.__state_shm.name,
+                                                    self.__stop_shm.name, shape, d_max, r, chunk_size,
+                                                    distance_metric, field_cache_mb))
+
+    def evaluate(self,
+                 solution: np.array,
+                 tabu_list: np.array,
+                 long_term_tabu_list: np.array,
+                 threshold: float = None,
+                 solution_hash: int = None,
+                 visited_hashes: np.array = None,
+                 visited_cadence: np.array = None) -> dict:
+        """
+        Przegląda sąsiedztwo rozwiązania. Parametry i wynik jak w BatchedNeighborhoodEvaluator.evaluate.
+        Hasze odwiedzonych rozwiązań przekazywane są procesom razem z zadaniem; procesy budują takie same klucze
+        Zobrista, bo zależą one tylko od rozmiaru mapy.
+        """
+        self.__state[0] = solution
+        self.__state[1] = tabu_list
+        self.__state[2] = long_term_tabu_list
+
+        stations_number = int(np.count_nonzero(solution == 1))
+        self.__stop_station[0] = stations_number
+        bounds = np.linspace(0, stations_number, self.__workers + 1).astype(int)
+        futures = [self.__pool.submit(_evaluate_stations, int(first), int(last), threshold, solution_hash,
+                                      visited_hashes, visited_cadence)
+                   for first, last in zip(bounds[:-1], bounds[1:]) if last > first]
+        return self.__merge([future.result() for future in futures])
+
+    def close(self):
+        """
+        Zamyka pulę procesów i zwalnia pamięć współdzieloną.
+        """
+        self.__pool.shutdown()
+        for shm in (self.__static_shm, self.__state_shm, self.__stop_shm):
+            shm.close()
+            shm.unlink()
+
+    @staticmethod
+    def __merge(results: list) -> dict:
+        """
+        Łączy wyniki kolejnych bloków stacji. Bloki za pierwszym przerwanym przeglądem są pomijane, a przy równych
+        kosztach wygrywa ruch z wcześniejszego bloku.
+        """
+        merged = {'move': None, 'cost': np.inf, 'tabu_move': None, 'tabu_cost': np.inf,
+                  'elems_in_nei': 0, 'elems_in_short_tabu': 0, 'elems_in_long_tabu': 0,
+                  'cadence_sum': 0.0, 'long_cadence_sum': 0.0, 'break_station': None}
+        for result in results:
+            for key in ['elems_in_nei', 'elems_in_short_tabu', 'elems_in_long_tabu', 'cadence_sum',
+                        'long_cadence_sum']:
+                merged[key] += result[key]
+            if result['cost'] < merged['cost']:
+                merged['move'], merged['cost'] = result['move'], result['cost']
+            if result['tabu_cost'] < merged['tabu_cost']:
+                merged['tabu_move'], merged['tabu_cost'] = result['tabu_move'], result['tabu_cost']
+            if result['break_station'] is not None:
+                merged['break_station'] = result['break_station']
+                break
+        return merged
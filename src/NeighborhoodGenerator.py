@@ -47,3 +47,52 @@ def neighborhood_generator(parcel_locker_matrix: np.array, r: int):
                             yield np.copy(neighbor)
                             neighbor[_x, _y] = 0
                 neighbor[x, y] = 1
+
+
+def move_generator(parcel_locker_matrix: np.array, r: int):
+    """
+    Generator ruchów prowadzących do sąsiadów rozwiązania. Zamiast kopii całej macierzy zwraca opis ruchu:
+    (numer stacji, (x, y) - stara pozycja stacji, (_x, _y) - nowa pozycja stacji).
+    Ruchy zwracane są w tej samej kolejności co sąsiedzi z neighborhood_generator, a stacje numerowane są
+    w kolejności przeglądania macierzy wierszami (tak jak w np.argwhere).
+
+    Przykład działania:
+
+    Dla rozwiązania początkowego:
+    |0 1 0 0|
+    |0 0 1 0|
+    |0 0 0 0|
+    i promienia 1 r=1
+
+    Generowane są kolejno ruchy:
+    (0, (0, 1), (0, 0)), (0, (0, 1), (0, 2)), (0, (0, 1), (1, 0)), (0, (0, 1), (1, 1)),
+    (1, (1, 2), (0, 2)), (1, (1, 2), (0, 3)), (1, (1, 2), (1, 1)), ...
+
+    :param parcel_locker_matrix: macierz stacji dokujących
+    :param r: promień sąsiedztwa
+    :return move: (numer stacji, stara pozycja, nowa pozycja)
+    """
+    x_size = parcel_locker_matrix.shape[0]
+    y_size = parcel_locker_matrix.shape[1]
+
+    for station, (x, y) in enumerate(np.argwhere(parcel_locker_matrix == 1)):
+        x, y = int(x), int(y)
+        for _x in range(max(x - r, 0), min(x + r + 1, x_size)):
+            for _y in range(max(y - r, 0), min(y + r + 1, y_size)):
+                if parcel_locker_matrix[_x, _y] == 0:
+                    yield station, (x, y), (_x, _y)
+
+
+def apply_move(parcel_locker_matrix: np.array, move) -> np.array:
+    """
+    Tworzy macierz sąsiada opisanego ruchem z move_generator.
+
+    :param parcel_locker_matrix: macierz stacji dokujących
+    :param move: (numer stacji, stara pozycja, nowa pozycja)
+    :return neighbor: kopia macierzy z przesuniętą stacją
+    """
+    _, source, destination = move
+    neighbor = np.copy(parcel_locker_matrix)
+    neighbor[source] = 0
+    neighbor[destination] = 1
+    return neighbor
@@ -0,0 +1,325 @@
+import numpy as np
+import os
+import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Tuple
+
+import src.Solver as Solver
+import src.Helpers as Helpers
+from src.SettingMenager import setting_menager
+
+
+def _make_solver(seed: int, path_to_settings: str, solver_args: tuple, solver_params: dict,
+                 banned_positions: np.array, frame: int, docks_params: dict) -> Tuple[Solver.Solver, np.array]:
+    """
+    Tworzy solwer w procesie puli. Losuje początkowe rozmieszczenie stacji (Helpers.generate_docking_stations_map)
+    z danego ziarna i ustawia je jako rozwiązanie startowe. Jeśli podano docks_params, rozmieszczenie początkowe
+    odczytywane jest z nich zamiast losowania.
+
+    :return: solwer gotowy do uruchomienia oraz jego rozwiązanie startowe
+    """
+    setting_menager.change_path_to_settings_file(path_to_settings)
+    np.random.seed(seed)
+
+    n_max, p_max, d_max, r, min_time_in_tl, min_time_in_lt_tl, client_map = solver_args
+    allowed_positions = np.zeros(client_map.shape) if banned_positions is None else banned_positions
+    docking_stations_map, _, _ = Helpers.generate_docking_stations_map(allowed_positions, n_max, frame,
+                                                                        docks_params=docks_params)
+    docking_stations_map = (docking_stations_map > 0).astype('int32')
+
+    solver = Solver.Solver(n_max, p_max, d_max, r, min_time_in_tl, min_time_in_lt_tl, client_map, frame,
+                           starting_solution=docking_stations_map, banned_positions=banned_positions,
+                           **solver_params)
+    return solver, docking_stations_map
+
+
+def _run_single_start(*solver_setup) -> tuple:
+    """
+    Pojedynczy przebieg algorytmu uruchamiany w procesie puli.
+
+    :param solver_setup: parametry przekazywane do _make_solver
+    :return: najlepsze rozwiązanie, jego koszt oraz rozwiązanie startowe
+    """
+    solver, starting_solution = _make_solver(*solver_setup)
+    solution = solver.solve(record_and_plot_data=False, telemetry_on=False, plot_data=False)
+    return solution, solver.get_best_cost(), starting_solution
+
+
+class MultiStartSolver:
+    """
+    Wielostartowy Tabu Search.
+    Uruchamia K niezależnych przebiegów klasy Solver w puli procesów. Każdy przebieg ma własne ziarno i własne,
+    losowe rozmieszczenie początkowe stacji dokujących (jeśli podano docks_params, tylko pierwszy przebieg zaczyna
+    od rozmieszczenia z docks_params). Zwracane jest najlepsze rozwiązanie, a statystyki kosztów wszystkich
+    przebiegów dostępne są przez get_statistics.
+    """
+
+    def __init__(self,
+                 runs: int,
+                 n_max: int,
+                 p_max: int,
+                 d_max: int,
+                 r: int,
+                 min_time_in_tl: int,
+                 min_time_in_lt_tl: int,
+                 client_map: np.array,
+                 frame: int = 1,
+                 banned_positions: np.array = None,
+                 docks_params: dict = None,
+                 workers: int = None,
+                 seed: int = None,
+                 **solver_params):
+        """
+        :param runs: liczba niezależnych przebiegów algorytmu
+        :param n_max: ilość stacji dokujących
+        :param p_max: pojemność stacji dokujących
+        :param d_max: zasięg (promień) działania stacji dokujących
+        :param r: wielkość (promień) sąsiedztwa danego rozwiązania
+        :param min_time_in_tl: rozmiar listy tabu
+        :param min_time_in_lt_tl: rozmiar długoterminowej listy tabu
+        :param client_map: mapa z klientami
+        :param frame: szerokość ramki mapy, w której można stawiać stacje dokujące
+        :param banned_positions: mapa pozycji zabronionych, na których nie można postawić stacji dokujących
+        :param docks_params: parametry stacji dokujących przekazywane do Helpers.generate_docking_stations_map -
+                             rozmieszczenie początkowe pierwszego przebiegu (pozostałe przebiegi losują własne)
+        :param workers: liczba procesów puli (None - liczba rdzeni, ale nie więcej niż runs)
+        :param seed: ziarno, z którego wyprowadzane są ziarna kolejnych przebiegów
+        :param solver_params: pozostałe parametry klasy Solver (np. iteration_lim, time_lim, dynamic_neighborhood)
+        """
+        if runs < 1:
+            raise ValueError("Liczba przebiegów musi być dodatnia")
+
+        self.__runs = runs
+        self.__solver_args = (n_max, p_max, d_max, r, min_time_in_tl, min_time_in_lt_tl, np.copy(client_map))
+        self.__frame = frame
+        self.__banned_positions = banned_positions
+        self.__docks_params = docks_params
+        self.__workers = min(runs, os.cpu_count() or 1) if workers is None else workers
+        self.__solver_params = solver_params
+
+        seed_sequence = np.random.SeedSequence(seed)
+        self.__seeds = [int(child.generate_state(1)[0]) for child in seed_sequence.spawn(runs)]
+
+        self.__solutions = []
+        self.__costs = []
+        self.__starting_solutions = []
+
+    def solve(self) -> np.array:
+        """
+        Uruchamia wszystkie przebiegi algorytmu.
+
+        :return: najlepsze rozwiązanie spośród wszystkich przebiegów
+        """
+        path_to_settings = setting_menager.default_path_to_settings
+        with ProcessPoolExecutor(max_workers=self.__workers) as pool:
+            futures = [pool.submit(_run_single_start, seed, path_to_settings, self.__solver_args,
+                                   self.__solver_params, self.__banned_positions, self.__frame,
+                                   self.__docks_params if run == 0 else None)
+                       for run, seed in enumerate(self.__seeds)]
+            results = [future.result() for future in futures]
+
+        self.__solutions = [solution for solution, _, _ in results]
+        self.__costs = [cost for _, cost, _ in results]
+        self.__starting_solutions = [starting_solution for _, _, starting_solution in results]
+        return self.get_best_solution()
+
+    def get_starting_solutions(self) -> list:
+        """
+        :return: rozwiązania startowe kolejnych przebiegów
+        """
+        return [np.copy(starting_solution) for starting_solution in self.__starting_solutions]
+
+    def get_best_solution(self) -> np.array:
+        """
+        :return: najlepsze rozwiązanie (przy równych kosztach - z przebiegu o mniejszym numerze)
+        """
+        return np.copy(self.__solutions[int(np.argmin(self.__costs))])
+
+    def get_statistics(self) -> dict:
+        """
+        :return: słownik ze statystykami przebiegów: ziarna, koszty najlepszych rozwiązań poszczególnych przebiegów,
+                 numer najlepszego przebiegu oraz koszt najlepszy, najgorszy, średni i jego odchylenie standardowe
+        """
+        costs = np.array(self.__costs)
+        return {'seeds': list(self.__seeds),
+                'costs': [float(cost) for cost in costs],
+                'best_run': int(np.argmin(costs)),
+                'best_cost': float(np.min(costs)),
+                'worst_cost': float(np.max(costs)),
+                'mean_cost': float(np.mean(costs)),
+                'std_cost': float(np.std(costs))}
+
+
+def _run_island(island: int, exchange_interval: int, share_long_term_tabu: bool,
+                outbox: multiprocessing.Queue, inbox: multiprocessing.Queue, *solver_setup):
+    """
+    Proces jednej wyspy. Co exchange_interval iteracji wysyła swoje najlepsze rozwiązanie do koordynatora
+    i odbiera od niego rozwiązanie elitarne (najlepsze spośród wszystkich wysp). Wyspa, która utknęła (brak poprawy
+    w ostatnim etapie lub brak nowych rozwiązań w sąsiedztwie), wznawia przeszukiwanie od rozwiązania elitarnego.
+    Pula procesów przeglądających sąsiedztwo (workers > 1) otwierana jest raz, na cały czas pracy wyspy.
+    """
+    solver = None
+    try:
+        solver, _ = _make_solver(*solver_setup)
+        solver.open_workers()
+        restarts = 0
+        while True:
+            best_cost = solver.get_best_cost()
+            solver.run_iterations(exchange_interval)
+            improved = solver.get_best_cost() < best_cost
+            done = solver.is_finished() and not solver.is_stuck()
+            long_term_tabu_list = solver.get_long_term_tabu_list() if share_long_term_tabu else None
+            outbox.put((island, solver.get_best_solution(), solver.get_best_cost(), long_term_tabu_list, done,
+                        restarts))
+            if done:
+                break
+
+            elite_solution, elite_cost, elite_long_term_tabu_list = inbox.get()
+            if solver.is_stuck() or (not improved and elite_cost < solver.get_best_cost()):
+                solver.restart(elite_solution)
+                restarts += 1
+            if elite_long_term_tabu_list is not None:
+                solver.share_long_term_tabu(elite_long_term_tabu_list)
+    except Exception:
+        outbox.put((island, None, None, traceback.format_exc(), True, 0))
+    finally:
+        if solver is not None:
+            solver.close_workers()
+
+
+class IslandSolver:
+    """
+    Wyspowy (kooperacyjny) Tabu Search.
+    Kilka trajektorii klasy Solver (wysp) działa równolegle w osobnych procesach. Co exchange_interval iteracji wyspy
+    przesyłają przez kolejki swoje najlepsze rozwiązania (x_min), koordynator wybiera z nich rozwiązanie elitarne
+    i odsyła je wszystkim wyspom (opcjonalnie razem z długoterminową listą tabu wyspy, z której pochodzi).
+    Wyspa, która utknęła, wznawia przeszukiwanie od rozwiązania elitarnego. Wymiana odbywa się synchronicznie,
+    więc przy zadanym ziarnie wynik jest powtarzalny.
+    """
+
+    def __init__(self,
+                 islands: int,
+                 exchange_interval: int,
+                 n_max: int,
+                 p_max: int,
+                 d_max: int,
+                 r: int,
+                 min_time_in_tl: int,
+                 min_time_in_lt_tl: int,
+                 client_map: np.array,
+                 frame: int = 1,
+                 banned_positions: np.array = None,
+                 docks_params: dict = None,
+                 share_long_term_tabu: bool = False,
+                 seed: int = None,
+                 **solver_params):
+        """
+        :param islands: liczba wysp (procesów)
+        :param exchange_interval: co ile iteracji wyspy wymieniają najlepsze rozwiązania
+        :param n_max: ilość stacji dokujących
+        :param p_max: pojemność stacji dokujących
+        :param d_max: zasięg (promień) działania stacji dokujących
+        :param r: wielkość (promień) sąsiedztwa danego rozwiązania
+        :param min_time_in_tl: rozmiar listy tabu
+        :param min_time_in_lt_tl: rozmiar długoterminowej listy tabu
+        :param client_map: mapa z klientami
+        :param frame: szerokość ramki mapy, w której można stawiać stacje dokujące
+        :param banned_positions: mapa pozycji zabronionych, na których nie można postawić stacji dokujących
+        :param docks_params: parametry stacji dokujących przekazywane do Helpers.generate_docking_stations_map -
+                             rozmieszczenie początkowe pierwszej wyspy (pozostałe wyspy losują własne)
+        :param share_long_term_tabu: czy razem z rozwiązaniem elitarnym przesyłać długoterminową listę tabu
+        :param seed: ziarno, z którego wyprowadzane są ziarna kolejnych wysp
+        :param solver_params: pozostałe parametry klasy Solver (kryterium stopu iteration_lim lub time_lim dotyczy
+                              każdej wyspy)
+        """
+        if islands < 1:
+            raise ValueError("Liczba wysp musi być dodatnia")
+        if exchange_interval < 1:
+            raise ValueError("Odstęp między wymianami rozwiązań musi być dodatni")
+
+        self.__islands = islands
+        self.__exchange_interval = exchange_interval
+        self.__share_long_term_tabu = share_long_term_tabu
+        self.__solver_args = (n_max, p_max, d_max, r, min_time_in_tl, min_time_in_lt_tl, np.copy(client_map))
+        self.__frame = frame
+        self.__banned_positions = banned_positions
+        self.__docks_params = docks_params
+        self.__solver_params = solver_params
+
+        seed_sequence = np.random.SeedSequence(seed)
+        self.__seeds = [int(child.generate_state(1)[0]) for child in seed_sequence.spawn(islands)]
+
+        self.__solutions = []
+        self.__costs = []
+        self.__restarts = []
+        self.__exchanges = 0
+
+    def solve(self) -> np.array:
+        """
+        Uruchamia wyspy i koordynuje wymianę rozwiązań aż do spełnienia kryterium stopu na wszystkich wyspach.
+
+        :return: najlepsze rozwiązanie spośród wszystkich wysp
+        """
+        path_to_settings = setting_menager.default_path_to_settings
+        outbox = multiprocessing.Queue()
+        inboxes = [multiprocessing.Queue() for _ in range(self.__islands)]
+        processes = [multiprocessing.Process(target=_run_island,
+                                             args=(island, self.__exchange_interval, self.__share_long_term_tabu,
+                                                   outbox, inboxes[island], seed, path_to_settings,
+                                                   self.__solver_args, self.__solver_params,
+                                                   self.__banned_positions, self.__frame,
+                                                   self.__docks_params if island == 0 else None))
+                     for island, seed in enumerate(self.__seeds)]
+        for process in processes:
+            process.start()
+
+        reports = {}
+        active = set(range(self.__islands))
+        self.__exchanges = 0
+        try:
+            while active:
+                for _ in range(len(active)):
+                    island, solution, cost, long_term_tabu_list, done, restarts = outbox.get()
+                    if solution is None:
+                        raise RuntimeError("Błąd w procesie wyspy {}:\n{}".format(island, long_term_tabu_list))
+                    reports[island] = (solution, cost, long_term_tabu_list, restarts)
+                    if done:
+                        active.discard(island)
+                if not active:
+                    break
+
+                elite = min(reports, key=lambda i: (reports[i][1], i))
+                elite_solution, elite_cost, elite_long_term_tabu_list, _ = reports[elite]
+                for island in sorted(active):
+                    inboxes[island].put((elite_solution, elite_cost, elite_long_term_tabu_list))
+                self.__exchanges += 1
+        finally:
+            for process in processes:
+                process.join(timeout=None if not active else 0)
+                if process.is_alive():
+                    process.terminate()
+
+        self.__solutions = [reports[island][0] for island in range(self.__islands)]
+        self.__costs = [reports[island][1] for island in range(self.__islands)]
+        self.__restarts = [reports[island][3] for island in range(self.__islands)]
+        return self.get_best_solution()
+
+    def get_best_solution(self) -> np.array:
+        """
+        :return: najlepsze rozwiązanie (przy równych kosztach - z wyspy o mniejszym numerze)
+        """
+        return np.copy(self.__solutions[int(np.argmin(self.__costs))])
+
+    def get_statistics(self) -> dict:
+        """
+        :return: słownik ze statystykami: ziarna wysp, koszty najlepszych rozwiązań wysp, liczba wznowień każdej
+                 wyspy od rozwiązania elitarnego, liczba wymian oraz numer i koszt najlepszej wyspy
+        """
+        costs = np.array(self.__costs)
+        return {'seeds': list(self.__seeds),
+                'costs': [float(cost) for cost in costs],
+                'restarts': list(self.__restarts),
+                'exchanges': self.__exchanges,
+                'best_island': int(np.argmin(costs)),
+                'best_cost': float(np.min(costs))}
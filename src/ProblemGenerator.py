@@ -1,6 +1,7 @@
+import os
 import numpy as np
 from abc import ABC, abstractmethod
-from typing import Tuple
+from typing import Iterator, Tuple
 
 
 class ProblemGenInterface(ABC):
@@ -29,56 +30,143 @@ class RandomProblemGen(ProblemGenInterface):
 
                  map_shape: Tuple[int, int],
                  clients_number: int,
-                 max_clients_number_in_cell: int):
+                 max_clients_number_in_cell: int,
+                 rng: np.random.Generator = None):
+        """
+        :param map_shape: rozmiar mapy
+        :param clients_number: sumaryczna liczba klientów na mapie
+        :param max_clients_number_in_cell: maksymalna liczba klientów w jednej komórce
+        :param rng: generator liczb losowych (None - globalny generator np.random, powtarzalny po np.random.seed)
+        """
+        if clients_number < 0 or clients_number > np.prod(map_shape) * max_clients_number_in_cell:
+            raise ValueError("Nie da się rozmieścić {} klientów na mapie {} przy maksymalnie {} klientach w komórce"
+                             .format(clients_number, map_shape, max_clients_number_in_cell))
 
         self.__map_shape = map_shape
         self.__clients_number = clients_number
         self.__max_clients_number_in_cell = max_clients_number_in_cell
+        self.__rng = rng
 
     def generate_problem(self) -> np.array:
 
         # wygeneruj początkową macierz losową o zadanym rozmiarze, minimalnej wartości komórki 0 i maksymalnej
-        # równej self.__max_clients_number_in_cell
-        problem_matrix = np.random.randint(0, self.__max_clients_number_in_cell, self.__map_shape)
-
-        # jeśli sumaryczna ilość klientów na mapie jest za duża
-        if np.sum(problem_matrix) > self.__clients_number:
-            for _ in range(np.sum(problem_matrix) - self.__clients_number):
-                # sprawdź, ile jest elementów większych od zera
-                cell_with_clients = problem_matrix > 0
-                cell_with_clients_no = np.count_nonzero(cell_with_clients)
-                # wylosuj indeks (numer) komórki do pomniejszenia o 1
-                # jeśli zamiast indeksów do nawiasów kwadratowych macierzy numpy
-                # wstawimy macierz o elementach True, False to zwróci nam to wektor
-                # [o wymiarze (,rozmiar_wektora) - dlatego argumentem dla np.zeros jest liczba a nie krotka]
-                # o elementach, niestety nie możemy potem odwołać się do tego wektora
-                # tylko musimy stosować dziwną konstrukcję z dodatkowym wektorem z jedną jedynką
-                index_to_sub_1 = np.random.randint(0, cell_with_clients_no - 1)
-                # trzeba zmienić typ macierzy, żeby dało się odjąć
-                to_sub1 = np.zeros(cell_with_clients_no, dtype='int32')
-                to_sub1[index_to_sub_1] = 1
-                problem_matrix[cell_with_clients] -= to_sub1
-
-        # jeśli sumaryczna ilość klientów na mapie jest za mała
+        # mniejszej od self.__max_clients_number_in_cell
+        if self.__rng is None:
+            problem_matrix = np.random.randint(0, max(self.__max_clients_number_in_cell, 1), self.__map_shape)
         else:
-            for _ in range(self.__clients_number - np.sum(problem_matrix)):
-                # sprawdź, ile jest elementów mniejszych od maksymalnej ilości klientów w komórce
-                cell_with_less_clients = problem_matrix < self.__max_clients_number_in_cell
-                cell_with_less_clients_no = np.count_nonzero(cell_with_less_clients)
-                # wylosuj indeks (numer) komórki do powiększenia o 1
-                # jeśli zamiast indeksów do nawiasów kwadratowych macierzy numpy
-                # wstawimy macierz o elementach True, False to zwróci nam to wektor
-                # [o wymiarze (,rozmiar_wektora) - dlatego argumentem dla np.zeros jest liczba a nie krotka]
-                # o elementach, niestety nie możemy potem odwołać się do tego wektora
-                # tylko musimy stosować dziwną konstrukcję z dodatkowym wektorem z jedną jedynką
-                index_to_sub_1 = np.random.randint(0, cell_with_less_clients_no - 1)
-                # trzeba zmienić typ macierzy, żeby dało się dodać
-                to_add1 = np.zeros(cell_with_less_clients_no, dtype='int32')
-                to_add1[index_to_sub_1] = 1
-                problem_matrix[cell_with_less_clients] += to_add1
+            problem_matrix = self.__rng.integers(0, max(self.__max_clients_number_in_cell, 1), self.__map_shape)
+        surplus = int(np.sum(problem_matrix)) - self.__clients_number
+
+        # jeśli sumaryczna ilość klientów na mapie jest za duża - z każdej komórki można zabrać wszystkich klientów
+        if surplus > 0:
+            problem_matrix -= self.__draw_counts(problem_matrix, surplus)
+        # jeśli sumaryczna ilość klientów na mapie jest za mała - każdą komórkę można dopełnić do maksimum
+        elif surplus < 0:
+            problem_matrix += self.__draw_counts(self.__max_clients_number_in_cell - problem_matrix, -surplus)
 
         return problem_matrix
 
+    def generate_batch(self, n: int, seed: int = None, path: str = None) -> Iterator[np.array]:
+        """
+        Generuje leniwie n map klientów. Każda mapa losowana jest własnym generatorem liczb losowych, utworzonym
+        z seed przez np.random.SeedSequence.spawn, więc i-ta mapa zależy tylko od seed oraz i.
+        Jeśli podano path, mapy zapisywane są na bieżąco do jednego pliku .npy o rozmiarze (n, *map_shape)
+        i najmniejszym typie mieszczącym max_clients_number_in_cell - plik można potem odwzorować w pamięci
+        funkcją load_batch zamiast generować mapy ponownie. Jeśli generator zostanie zamknięty przed wygenerowaniem
+        wszystkich map (np. przerwanie pętli), w pliku zostają tylko mapy już wygenerowane.
+
+        :param n: liczba map
+        :param seed: ziarno generatora liczb losowych (None - losowane globalnym generatorem np.random)
+        :param path: ścieżka do pliku .npy, w którym zapisywane są mapy (None - bez zapisu)
+        :return: generator kolejnych map klientów
+        """
+        if n < 0:
+            raise ValueError("Liczba map musi być nieujemna")
+
+        if seed is None:
+            seed = int(np.random.randint(np.iinfo(np.int64).max))
+        batch = None
+        written = 0
+        if path is not None:
+            batch = np.lib.format.open_memmap(path, mode='w+', dtype=batch_dtype(self.__max_clients_number_in_cell),
+                                              shape=(n, *self.__map_shape))
+        try:
+            for i, child in enumerate(np.random.SeedSequence(seed).spawn(n)):
+                problem_matrix = RandomProblemGen(self.__map_shape, self.__clients_number,
+                                                  self.__max_clients_number_in_cell,
+                                                  np.random.default_rng(child)).generate_problem()
+                if batch is not None:
+                    batch[i] = problem_matrix
+                    written = i + 1
+                yield problem_matrix
+        finally:
+            if batch is not None:
+                batch.flush()
+                del batch
+                if written < n:
+                    _truncate_batch(path, written)
+
+    def __draw_counts(self, capacity: np.array, amount: int) -> np.array:
+        """
+        Rozdziela amount jednostek pomiędzy komórki o niezerowej pojemności, losując komórki z jednakowym
+        prawdopodobieństwem (jak przy dodawaniu/odejmowaniu klientów pojedynczo). W każdej rundzie pozostała liczba
+        jednostek losowana jest jednym rozkładem wielomianowym, przydział jest przycinany do pojemności komórek,
+        a nadmiar losowany ponownie w kolejnej rundzie pomiędzy komórki, które mają jeszcze wolne miejsce.
+
+        :param capacity: macierz maksymalnej liczby jednostek, które można przydzielić każdej komórce
+        :param amount: liczba jednostek do rozdzielenia (nie większa od sumy pojemności)
+        :return: macierz przydzielonych jednostek o rozmiarze capacity
+        """
+        multinomial = np.random.multinomial if self.__rng is None else self.__rng.multinomial
+        remaining = capacity.ravel().astype('int64')
+        counts = np.zeros(remaining.size, dtype='int64')
+        while amount > 0:
+            eligible = np.flatnonzero(remaining)
+            drawn = multinomial(amount, np.full(eligible.size, 1 / eligible.size))
+            np.minimum(drawn, remaining[eligible], out=drawn)
+            counts[eligible] += drawn
+            remaining[eligible] -= drawn
+            amount -= int(np.sum(drawn))
+        return counts.reshape(capacity.shape)
+
+
+def batch_dtype(max_clients_number_in_cell: int) -> np.dtype:
+    """
+    :param max_clients_number_in_cell: maksymalna liczba klientów w jednej komórce
+    :return: najmniejszy typ całkowity bez znaku mieszczący max_clients_number_in_cell
+    """
+    return np.min_scalar_type(max(int(max_clients_number_in_cell), 0))
+
+
+def _truncate_batch(path: str, n: int):
+    """
+    Zostawia w pliku .npy z mapami tylko n pierwszych map. Mapy przepisywane są pojedynczo do nowego pliku, który
+    zastępuje stary, więc w pamięci jest naraz co najwyżej jedna mapa.
+
+    :param path: ścieżka do pliku .npy
+    :param n: liczba map do zachowania
+    """
+    batch = np.load(path, mmap_mode='r')
+    truncated_path = path + '.part'
+    truncated = np.lib.format.open_memmap(truncated_path, mode='w+', dtype=batch.dtype, shape=(n, *batch.shape[1:]))
+    for i in range(n):
+        truncated[i] = batch[i]
+    truncated.flush()
+    del truncated, batch
+    os.replace(truncated_path, path)
+
+
+def load_batch(path: str) -> np.array:
+    """
+    Odwzorowuje w pamięci (tylko do odczytu) plik z mapami zapisanymi przez RandomProblemGen.generate_batch.
+    Mapy mają zwarty typ całkowity bez znaku - przed obliczeniami, w których mogą pojawić się wartości ujemne
+    lub przepełnienie, należy je rzutować, np. batch[i].astype('int64').
+
+    :param path: ścieżka do pliku .npy
+    :return: macierz map klientów o rozmiarze (n, *map_shape)
+    """
+    return np.load(path, mmap_mode='r')
+
 
 if __name__ == '__main__':
     p_gen = RandomProblemGen(map_shape=(1, 1),
@@ -121,6 +121,18 @@ class Robot:
         if self.__state.is_loading:
             self.cumulative_loading_time += 1
 
+    def get_settings(self) -> RobotSettings:
+        """
+        :return: ustawienia początkowe robota (obiekt, nie kopia)
+        """
+        return self.__settings
+
+    def get_state(self) -> RobotState:
+        """
+        :return: aktualny stan robota (obiekt, nie kopia)
+        """
+        return self.__state
+
     def get_actual_position(self) -> np.array:
         return np.copy(self.__state.actual_position)
 
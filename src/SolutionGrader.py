@@ -2,6 +2,10 @@ import numpy as np
 from abc import ABC, abstractmethod
 from typing import Tuple
 
+import src.CostCache as CostCache
+import src.Helpers as Helpers
+import src.ZobristHash as ZobristHash
+
 
 class SolutionGraderInterface(ABC):
     """
@@ -15,14 +19,24 @@ class SolutionGraderInterface(ABC):
 class SolutionGrader(SolutionGraderInterface):
     """
     Klasa zawierająca funkcjonalności związane z oceną rozwiązania ostatecznego pod względem dodatkowych kryteriów.
+    Klienci przypisywani są do najbliższej stacji w metryce Manhattan niezależnie od metryki użytej przez solwer
+    (parametr distance_metric klasy Solver), więc oceny rozwiązań uzyskanych z różnymi metrykami są porównywalne.
+    Z tego powodu Solver udostępnia przypisanie klientów do stacji w pamięci podręcznej tylko w metryce Manhattan.
     """
     def __init__(self,
                  clients_map: np.array,
-                 solution: np.array):
-
+                 solution: np.array,
+                 cost_cache: CostCache.CostCache = None):
+        """
+        :param clients_map: mapa klientów
+        :param solution: rozwiązanie do oceny
+        :param cost_cache: pamięć podręczna liczby klientów przypisanych do stacji (np. Solver.get_cost_cache() -
+                           wtedy układy ocenione już przez solwer nie są liczone ponownie)
+        """
         self.__clients_map = clients_map
         self.__solution = solution
         self.__map_shape = self.__clients_map.shape
+        self.__cost_cache = cost_cache
 
     def grade_solution(self, solution: np.array, clients_map: np.array):
         """
@@ -34,29 +48,44 @@ class SolutionGrader(SolutionGraderInterface):
         """
         self.__solution = solution
         self.__clients_map = clients_map
+        self.__map_shape = self.__clients_map.shape
 
-        clients_per_pl = self.__map_clients_to_nearest_pl()
+        if self.__cost_cache is None:
+            clients_per_pl = self.__station_loads()
+        else:
+            namespace = CostCache.CostCache.station_loads_namespace(clients_map)
+            solution_hash = ZobristHash.ZobristHash(self.__map_shape).hash(solution)
+            clients_per_pl, _ = self.__cost_cache.get_or_compute(namespace, solution_hash, self.__station_loads)
 
         return np.var(clients_per_pl[clients_per_pl > 0])
 
+    def __station_loads(self) -> np.array:
+        """
+        :return: liczba klientów przypisanych do kolejnych stacji dokujących (w kolejności np.argwhere)
+        """
+        return self.__map_clients_to_nearest_pl()[self.__solution == 1]
+
     def __map_clients_to_nearest_pl(self) -> np.array:
         """
         Funkcja licząca ile klientów ma najbliżej do danej stacji dokującej.
+        Każda komórka dostaje numer najbliższej stacji z etykietowanej transformaty odległościowej
+        (Helpers.nearest_source_transform, remisy rozstrzygane tak jak w __find_nearest_pl), a sumy klientów
+        przypisanych do stacji liczone są jednym wywołaniem np.bincount.
 
         :return nearest_clients_no: macierz, gdzie w miejscu stacji dokujących wpisana jest ilość klientów,
                                     którzy mają do niego najbliżej
         """
-        nearest_clients_no = np.zeros(self.__map_shape)
-        for x in range(self.__clients_map.shape[0]):
-            for y in range(self.__clients_map.shape[1]):
-                if self.__clients_map[x, y] > 0:
-                    nearest_clients_no[self.__find_nearest_pl((x, y))] += self.__clients_map[x, y]
-
-        return nearest_clients_no
+        if not np.any(self.__solution == 1):
+            return np.zeros(self.__map_shape)
+        _, nearest = Helpers.nearest_source_transform(self.__solution == 1)
+        clients = self.__clients_map > 0
+        return np.bincount(nearest[clients], weights=self.__clients_map[clients],
+                           minlength=self.__clients_map.size).reshape(self.__map_shape)
 
     def __find_nearest_pl(self, clients_cell_coords: Tuple[int, int]) -> Tuple[int, int]:
         """
         Funkcja znajdująca najbliższą stację dokującą dla danej komórki z klientami.
+        Przeszukuje kolejne diamenty wokół komórki; zostawiona jako wzorzec dla __map_clients_to_nearest_pl.
 
         :param clients_cell_coords:  współrzędne komórki z klientami, dla których szukamy najbliższej stacji dokującej
         :return nearest_pl: współrzędne najbliższej stacji dokującej
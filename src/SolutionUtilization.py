@@ -4,6 +4,7 @@ import logging
 
 from src.PlotSaver import save_plot_to_file
 import src.Helpers as Helpers
+import src.DistanceFieldCache as DistanceFieldCache
 """
     Klasa służąca do oblicznia wykorzystania stacji dokujących oraz reprezentacji graficznej obciążenia
 """
@@ -11,13 +12,21 @@ import src.Helpers as Helpers
 
 class SolutionUtilization:
 
-    def __init__(self, _client_map: np.array, _solution: np.array, _p_max: int, _d_max: int):
+    # liczba komórek z klientami, dla których odległości od wszystkich stacji liczone są w jednym kroku
+    __CHUNK_SIZE = 4096
+
+    def __init__(self, _client_map: np.array, _solution: np.array, _p_max: int, _d_max: int,
+                 _field_cache: DistanceFieldCache.DistanceFieldCache = None):
         """
         :param _client_map: Mapa klientów
         :param _solution: Rozmieszczenie stacji dokujących
         :param _p_max: Maksymalna pojemność pojedynczego stacji dokującej
         :param _d_max: Zasięg działania stacji dokującej
+        :param _field_cache: Pamięć podręczna pól odległości stacji (np. z klasy Solver); używana tylko z metryką
+                             Manhattan, w której klienci przypisywani są do stacji - pamięć z metryką geodezyjną
+                             (ze znacznikami komórek nieosiągalnych) jest pomijana; None - transformata odległościowa
         """
+        self.__field_cache = _field_cache
         self.__client_map = np.copy(_client_map)
         self.__plt_map = np.copy(_solution)
         self.__p_max = _p_max
@@ -135,6 +144,13 @@ class SolutionUtilization:
         """
         return np.copy(self.__plt_utilisation)
 
+    def get_client_within_plt_zone(self):
+        """
+        Funkcja wzracająca kopię mapy stref działania stacji dokujących
+        :return: Macierz, gdzie 1 oznacza komórki w zasięgu działania stacji dokujących
+        """
+        return np.copy(self.__client_within_plt_zone)
+
     def print_solution_utilization_data(self):
         """
             Funkcja wypisująca w konsoli informacje zebrane podczas działania algorytmu
@@ -210,104 +226,117 @@ class SolutionUtilization:
 
     def __calculate(self):
         """
-            Funkcja wewnętrzna obliczająca macierze wykrozsytanie stacji dokujących oraz stref ich działania
+            Funkcja wewnętrzna obliczająca macierze wykrozsytanie stacji dokujących oraz stref ich działania.
+
+            Klienci komórki trafiają do stacji najbliższych tej komórce: pierścienie wokół stacji przeglądane są
+            od najmniejszego promienia, więc komórka opróżniana jest na pierścieniu o promieniu równym odległości
+            do najbliższej stacji. Przy kilku równie odległych stacjach klienci rozdzielani są po jednym, kolejno
+            dla stacji w kolejności wierszy - stacja o numerze k wśród m takich stacji dostaje c // m klientów
+            i jednego więcej, gdy k < c % m. Do zasięgu stacji wliczani są klienci z pierścieni o promieniu nie
+            większym niż d_max, a za strefę działania stacji uznawane są komórki pierścieni o promieniu do d_max,
+            przejrzanych zanim rozdzielono wszystkich klientów.
         """
-        temp_client_map = np.copy(self.__client_map)
         self.__plt_utilisation_without_d_max = np.zeros(self.__map_shape)
-        radius_of_plt = 0
-        # Zakończ jak braknie klientów
-        while (not np.all((self.__client_map == 0))) and (not np.all((self.__plt_map == 0))):
-            for i in range(0, np.max(self.__client_map) + 1):
-                for x_plt in range(0, self.__map_shape[0]):
-                    for y_plt in range(0, self.__map_shape[1]):
-                        if self.__plt_map[x_plt][y_plt] == 1:
-                            self.__distribute_client_to_plt(x_plt, y_plt, radius_of_plt)
-
-            radius_of_plt = radius_of_plt + 1
-            if radius_of_plt > self.__map_shape[0] + self.__map_shape[1]:
+        stations = np.argwhere(self.__plt_map == 1)
+        clients_pos = np.argwhere(self.__client_map > 0)
+        if len(clients_pos) > 0 and np.any(self.__plt_map != 0):
+            if len(stations) == 0:
                 raise ValueError('Prosimy skontaktować sie z biurem obłsugi klienta :) ')
-        self.__client_map = np.copy(temp_client_map)
+            clients = self.__client_map[tuple(clients_pos.T)].astype('int64')
+
+            utilisation = np.zeros(len(stations))
+            utilisation_without_d_max = np.zeros(len(stations))
+            last_radius = 0
+            for start in range(0, len(clients_pos), self.__CHUNK_SIZE):
+                pos = clients_pos[start:start + self.__CHUNK_SIZE]
+                count = clients[start:start + self.__CHUNK_SIZE]
+                distance = (np.abs(stations[:, 0, None] - pos[None, :, 0]) +
+                            np.abs(stations[:, 1, None] - pos[None, :, 1]))
+                nearest_distance = np.min(distance, axis=0)
+                is_nearest = distance == nearest_distance
+                nearest_no = np.count_nonzero(is_nearest, axis=0)
+                rank = np.cumsum(is_nearest, axis=0) - 1
+                share = np.where(is_nearest, count // nearest_no + (rank < count % nearest_no), 0)
+
+                utilisation_without_d_max += np.sum(share, axis=1)
+                utilisation += np.sum(share * (nearest_distance <= self.__d_max), axis=1)
+                last_radius = max(last_radius, int(np.max(nearest_distance)))
+
+            self.__plt_utilisation_without_d_max[tuple(stations.T)] = utilisation_without_d_max
+            # wartość w macierzy zmienia się tylko dla stacji, które dostały klientów w swoim zasięgu
+            served = utilisation > 0
+            self.__plt_utilisation[tuple(stations[served].T)] = utilisation[served]
+            zone = Helpers.manhattan_distance_transform(self.__plt_map == 1) <= min(self.__d_max, last_radius)
+            self.__client_within_plt_zone[zone] = 1
 
         # trzeba zachować kolejność wywołań
         self.__calculate_distance_matrix()
         self.__calculate_av_clients()
         self.__calculate_av_distances()
 
-    def __distribute_client_to_plt(self, x_plt: int, y_plt: int, radius: int):
-        """
-            Funckja przydzielające klientów do każdego stacji dokujących
-        """
-        x_start = x_plt - radius
-        if x_start < 0:
-            x_start = 0
-        x_end = x_plt + radius + 1
-        if x_end > self.__map_shape[0]:
-            x_end = self.__map_shape[0]
-        for x in range(x_start, x_end):
-            y_start = y_plt - radius
-            if y_start < 0:
-                y_start = 0
-            y_end = y_plt + radius + 1
-            if y_end > self.__map_shape[1]:
-                y_end = self.__map_shape[1]
-            for y in range(y_start, y_end):
-                if np.abs(x_plt - x) + np.abs(y_plt - y) == radius:
-                    if radius <= self.__d_max:
-                        self.__client_within_plt_zone[x][y] = 1
-                    if self.__client_map[x][y] > 0:
-                        clients = 1
-                        total_clients_per_plt = self.__plt_utilisation_without_d_max[x_plt][y_plt] + clients
-                        self.__plt_utilisation_without_d_max[x_plt][y_plt] = total_clients_per_plt
-                        self.__client_map[x][y] -= clients
-                        if radius <= self.__d_max:  # Uwględnie zasiegu działania stacji dokujących
-                            self.__plt_utilisation[x_plt][y_plt] = total_clients_per_plt
-
     def __calculate_distance_matrix(self):
         """
         Funkcja obliczająca macierz self.__distance_matrix.
+        Bez pamięci pól odległości macierz liczona jest dwuprzebiegową transformatą odległościową L1
+        (Helpers.manhattan_distance_transform). Gdy podano pamięć pól odległości w metryce Manhattan (np. z klasy
+        Solver), odległość od najbliższej stacji to element po elemencie minimum z zapamiętanych pól stacji. Pamięć
+        z inną metryką jest pomijana, aby macierz odległości i przypisanie klientów do stacji w __calculate
+        korzystały z tej samej metryki.
         :return:
         """
-        diamond_list = [Helpers.diamond_edge(r) for r in range(self.__map_shape[0] + self.__map_shape[1])]
-        for index, _ in np.ndenumerate(self.__distance_matrix):
-            y, x = index
-            for r in range(self.__map_shape[0] + self.__map_shape[1]):
-                x_min = x - r if x - r > 0 else 0
-                x_max = x + r + 1 if x + r + 1 < self.__map_shape[1] else self.__map_shape[1]
-                y_min = y - r if y - r > 0 else 0
-                y_max = y + r + 1 if y + r + 1 < self.__map_shape[0] else self.__map_shape[0]
+        if not np.any(self.__plt_map):
+            self.__distance_matrix = np.zeros(self.__map_shape)
+        elif self.__field_cache is None or self.__field_cache.get_map_shape() != self.__map_shape or \
+                self.__field_cache.get_metric() != 'manhattan':
+            self.__distance_matrix = Helpers.manhattan_distance_transform(self.__plt_map).astype('float64')
+        else:
+            self.__distance_matrix = self.__field_cache.distance_field(self.__plt_map != 0).astype('float64')
+
+    def get_distance_matrix(self):
+        """
+        Funkcja zwracająca kopię macierzy odległości od najbliższej stacji dokującej
+        :return: Macierz, w której wartość komórki określa jej oddalenie od najbliższej stacji dokującej
+        """
+        return np.copy(self.__distance_matrix)
 
-                mx_min = r - (x - x_min)
-                mx_max = r + (x_max - 1 - x) + 1
-                my_min = r - (y - y_min)
-                my_max = r + (y_max - 1 - y) + 1
+    def get_av_distance_for_clients_cell(self):
+        """
+        Funkcja zwracająca kopię słownika średnich odległości od najbliższej stacji dokującej
+        :return: Słownik, w którym kluczem jest liczba klientów w komórce, a wartością średnia odległość komórek
+                 z taką liczbą klientów od najbliższej stacji dokującej
+        """
+        return dict(self.__av_distance_for_clients_cell)
 
-                cut = self.__plt_map[y_min:y_max, x_min:x_max]
-                mask = diamond_list[r][my_min:my_max, mx_min:mx_max]
-                values = cut[mask]
-                if np.any(values):
-                    self.__distance_matrix[index] = r
-                    break
+    def get_av_clients_at_given_range(self):
+        """
+        Funkcja zwracająca kopię słownika średnich liczb klientów w zadanej odległości od stacji dokujących
+        :return: Słownik, w którym kluczem jest odległość od najbliższej stacji dokującej, a wartością średnia
+                 liczba klientów w komórkach w tej odległości
+        """
+        return dict(self.__av_clients_at_given_range)
 
     def __calculate_av_distances(self):
         """
         Funkcja licząca średnią odległość od stacji dokujących dla komórek o zadanej ilości klientów.
+        Komórki grupowane są według liczby klientów jednym wywołaniem np.bincount.
         Modyfikuje self.__av_distance_for_clients_cell
         :return:
         """
-        max_clients = int(np.max(self.__client_map))
-        for clients_no in range(max_clients + 1):
-            mask = self.__client_map == clients_no
-            self.__av_distance_for_clients_cell[clients_no] = \
-                np.sum(self.__distance_matrix[mask]) / np.count_nonzero(mask) if np.any(mask) else 0
+        clients_no = self.__client_map.astype('int64').ravel()
+        cells = np.bincount(clients_no)
+        distances = np.bincount(clients_no, weights=self.__distance_matrix.ravel())
+        av_distances = np.where(cells > 0, distances / np.maximum(cells, 1), 0)
+        self.__av_distance_for_clients_cell.update(enumerate(av_distances))
 
     def __calculate_av_clients(self):
         """
         Funkcja licząca średnią ilość klientów w zadanej odległości od najbliższego stacji dokujących.
+        Komórki grupowane są według odległości jednym wywołaniem np.bincount.
         Modyfikuje self.__av_clients_at_given_range.
         :return:
         """
-        max_dist = int(np.max(self.__distance_matrix))
-        for dist in range(max_dist + 1):
-            mask = self.__distance_matrix == dist
-            self.__av_clients_at_given_range[dist] = \
-                np.sum(self.__client_map[mask]) / np.count_nonzero(mask) if np.any(mask) else 0
+        distance = self.__distance_matrix.astype('int64').ravel()
+        cells = np.bincount(distance)
+        clients = np.bincount(distance, weights=self.__client_map.ravel())
+        av_clients = np.where(cells > 0, clients / np.maximum(cells, 1), 0)
+        self.__av_clients_at_given_range.update(enumerate(av_clients))
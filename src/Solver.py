@@ -6,8 +6,13 @@ import inspect
 import logging
 
 import src.ConditionTester as ConditionTester
+import src.CostFunction as CostFunction
+import src.CostCache as CostCache
+import src.DistanceFieldCache as DistanceFieldCache
+import src.ZobristHash as ZobristHash
 import src.StartingSolutionGenerator as StartingSolutionGenerator
 import src.NeighborhoodGenerator as NeighborhoodGenerator
+import src.NeighborhoodEvaluator as NeighborhoodEvaluator
 import src.DataCollectorPlotter as DataCollectorPlotter
 import src.Helpers as Helpers
 
@@ -18,6 +23,8 @@ class Telemetry:
 
     telemetry_data = {}
 
+    telemetry_counters = {}
+
     telemetry_on = True
 
     @staticmethod
@@ -36,10 +43,30 @@ class Telemetry:
             name, comp_time = value
             logging.info("{:<50} {:>10}.{}".format(name, int(np.floor(comp_time)), int((comp_time % 1)*100)))
 
+        if Telemetry.telemetry_counters:
+            logging.info("{:<50} {:>15}".format('LICZNIK', 'WARTOŚĆ'))
+            for name, value in Telemetry.telemetry_counters.items():
+                logging.info("{:<50} {:>15}".format(name, value))
+
     @staticmethod
     def get_telemetry_data():
         return dict.copy(Telemetry.telemetry_data)
 
+    @staticmethod
+    def get_telemetry_counters():
+        return dict.copy(Telemetry.telemetry_counters)
+
+    @staticmethod
+    def count(name: str, value: int = 1):
+        """
+        Zwiększa licznik telemetrii (np. trafień pamięci podręcznej kosztów).
+
+        :param name: nazwa licznika
+        :param value: wartość, o którą zwiększany jest licznik
+        """
+        if Telemetry.telemetry_on:
+            Telemetry.telemetry_counters[name] = Telemetry.telemetry_counters.get(name, 0) + value
+
     @staticmethod
     def telemetry(method: Callable = None, class_name: str = 'Solver'):
         """
@@ -113,7 +140,18 @@ class Solver:
                  telemetry_on: bool = False,
 
                  starting_solution: np.array = None,
-                 banned_positions: np.array = None):
+                 banned_positions: np.array = None,
+
+                 cost_backend: str = 'field_cache',
+                 delta_evaluation: bool = True,
+                 neighborhood_mode: str = 'moves',
+                 workers: int = None,
+                 cost_cache: CostCache.CostCache = None,
+                 cost_cache_capacity: int = 100000,
+                 visited_tenure: int = 0,
+                 distance_metric: str = 'manhattan',
+                 barrier_map: np.array = None,
+                 field_cache_mb: float = 64):
         """
         Inicjalizacja atrybutów klasy. Atrybuty te są konieczne do rozwiązania problemu.
         Wstępnie inicjalizuje zmienne, które będą potrzebne na dalszym etapie rozwiązywania problemu.
@@ -131,6 +169,28 @@ class Solver:
         :param starting_solution: zadane rozwiązanie startowe, możemy wykorzystać ten parametr, gdy korzystamy z
                                   innego niż standardowego generatora rozwiązania początkowego
         :param banned_positions: mapa pozycji zabronionych, na których nie można postawić stacji dokujących
+        :param cost_backend: sposób liczenia funkcji kosztu: 'field_cache' (minimum z zapamiętanych pól odległości
+                             stacji), 'distance_transform' (jedno pole odległości na rozwiązanie) lub 'diamond'
+                             (pierwotne przeszukiwanie pierścieni dla każdej komórki)
+        :param delta_evaluation: czy koszt sąsiadów liczyć przyrostowo względem aktualnego rozwiązania (tylko na
+                                 komórkach, których przypisanie do stacji może się zmienić)
+        :param neighborhood_mode: sposób przeglądania sąsiedztwa: 'moves' (opisy ruchów, macierz tworzona tylko dla
+                                  przyjętego ruchu), 'matrix' (kopia macierzy dla każdego sąsiada) lub 'batched'
+                                  (wszystkie ruchy stacji oceniane naraz operacjami na tablicach, zawsze z przyrostowym
+                                  liczeniem kosztu)
+        :param workers: liczba procesów przeglądających sąsiedztwo; przy workers > 1 ruchy stacji dzielone są między
+                        procesy puli i oceniane jak w trybie 'batched' (None lub 1 - jeden proces)
+        :param cost_cache: pamięć podręczna kosztów rozwiązań; przy delta_evaluation solwer zapisuje w niej też liczbę
+                           klientów przypisanych do stacji kolejnych x_a, z której korzysta SolutionGrader
+        :param cost_cache_capacity: pojemność pamięci podręcznej tworzonej, gdy nie podano cost_cache
+                                    (0 - bez pamięci podręcznej)
+        :param visited_tenure: przez ile iteracji odwiedzone rozwiązania (rozpoznawane po haszu Zobrista) traktowane
+                               są jak elementy krótkoterminowej listy tabu (0 - bez pamięci odwiedzonych rozwiązań)
+        :param distance_metric: metryka odległości klientów od stacji: 'manhattan' lub 'geodesic' (długość
+                                najkrótszej drogi omijającej bariery, pola odległości zapamiętywane dla pozycji stacji)
+        :param barrier_map: mapa barier dla metryki 'geodesic' (None - używana jest mapa banned_positions, czyli
+                            w main.py mapa barier po dylatacji)
+        :param field_cache_mb: limit pamięci (w MB) na zapamiętane pola odległości stacji
         """
 
         # Atrybuty związane z parametrami problemu
@@ -176,9 +236,62 @@ class Solver:
                                                                                         self.__d_max,
                                                                                         self.__client_map)
 
-        self.__diamond_list = [Helpers.diamond_edge(r) for r in range(self.__map_shape[0] + self.__map_shape[1])]
+        self.__diamond_cost = CostFunction.DiamondCost(self.__d_max, self.__client_map)
+        self.__barrier_map = None
+        if distance_metric == 'geodesic':
+            self.__barrier_map = self.__banned_positions if barrier_map is None else barrier_map
+        self.__distance_metric = distance_metric
+        self.__field_cache_mb = field_cache_mb
+        self.__field_cache = DistanceFieldCache.DistanceFieldCache(self.__map_shape, distance_metric,
+                                                                   self.__barrier_map, field_cache_mb)
+        self.__field_cost = None
+        if cost_backend == 'field_cache':
+            self.__field_cost = CostFunction.FieldCacheCost(self.__d_max, self.__client_map, self.__field_cache)
+            self.__cost_function = self.__field_cost
+        elif distance_metric == 'geodesic':
+            raise ValueError("Metryka geodezyjna wymaga funkcji kosztu 'field_cache'")
+        elif cost_backend == 'distance_transform':
+            self.__cost_function = CostFunction.DistanceTransformCost(self.__d_max, self.__client_map)
+        elif cost_backend == 'diamond':
+            self.__cost_function = self.__diamond_cost
+        else:
+            raise ValueError("Nieznany sposób liczenia funkcji kosztu: {}".format(cost_backend))
+
+        self.__zobrist = ZobristHash.ZobristHash(self.__map_shape)
+        self.__x_a_hash = None
+        self.__visited_tenure = visited_tenure
+        self.__visited = {}
+
+        if cost_cache is None and cost_cache_capacity > 0:
+            cost_cache = CostCache.CostCache(cost_cache_capacity)
+        self.__cost_cache = cost_cache
+        self.__cost_cache_namespace = ('Solver.cost', cost_backend, distance_metric, self.__d_max,
+                                       CostCache.CostCache.fingerprint(self.__client_map),
+                                       None if self.__barrier_map is None else
+                                       CostCache.CostCache.fingerprint(self.__barrier_map))
+        # liczba klientów przypisanych do stacji jest wspólna z SolutionGrader tylko w metryce Manhattan
+        self.__station_loads_namespace = CostCache.CostCache.station_loads_namespace(self.__client_map) \
+            if distance_metric == 'manhattan' else None
+
+        self.__delta_evaluation = delta_evaluation
+        self.__incremental_cost = CostFunction.IncrementalCost(self.__d_max, self.__client_map, self.__r,
+                                                               self.__field_cost)
+
+        if neighborhood_mode not in ('moves', 'matrix', 'batched'):
+            raise ValueError("Nieznany sposób przeglądania sąsiedztwa: {}".format(neighborhood_mode))
+        self.__neighborhood_mode = neighborhood_mode
+        self.__batched_evaluator = NeighborhoodEvaluator.BatchedNeighborhoodEvaluator(
+            self.__r, self.__condition_tester.allowed_cells(), self.__incremental_cost, zobrist=self.__zobrist)
+        self.__workers = 1 if workers is None else workers
+        if self.__workers < 1:
+            raise ValueError("Liczba procesów musi być dodatnia")
+        self.__parallel_evaluator = None
+        self.__not_allowed_stations = set()
+        self.__stations_in_tabu = {}
+        self.__missing_long_term_tabu = {}
 
         Telemetry.telemetry_on = telemetry_on
+        Telemetry.telemetry_counters = {}
         Telemetry.telemetry_data = {**Telemetry.telemetry_data,
                                     **{method_name: 0 for method_name, method in
                                        inspect.getmembers(Solver, predicate=inspect.isfunction)}}
@@ -194,6 +307,7 @@ class Solver:
             self.__starting_solution = None
 
         # atrybuty związane z przebiegiem algorytmu
+        self.__start_time = None
         self.__curr_time = 0
         self.__curr_it = 0
 
@@ -206,7 +320,14 @@ class Solver:
         self.__x_min_new_tabu = None
         self.__Q_min_new_tabu = np.inf
 
-    def solve(self, record_and_plot_data: bool = False, telemetry_on: bool = False) -> np.array:
+    def solve(self, record_and_plot_data: bool = False, telemetry_on: bool = False,
+              plot_data: bool = True) -> np.array:
+        """
+        :param record_and_plot_data: czy zbierać dane przebiegu oraz rysować wykres telemetrii
+        :param telemetry_on: czy mierzyć czasy wywołań metod
+        :param plot_data: czy rysować wykresy zebranych danych przebiegu (np. False w procesach puli)
+        :return: najlepsze znalezione rozwiązanie
+        """
         self.__record_and_plot_data = record_and_plot_data
         Telemetry.telemetry_on = telemetry_on
         to_return = self.__solve()
@@ -216,68 +337,245 @@ class Solver:
             Telemetry.print_telemetry()
             # Utwórz wykres telemetrii
             DataCollectorPlotter.generate_plot_of_telemetry(Telemetry.get_telemetry_data())
-        # Reprezentacja uzyskanych danych podczas przebiegu algorytmu
-        self.__collect_and_represent_data.plot_data()
+        if plot_data:
+            # Reprezentacja uzyskanych danych podczas przebiegu algorytmu
+            self.__collect_and_represent_data.plot_data()
         return to_return
 
+    def get_cost_cache(self) -> CostCache.CostCache:
+        """
+        :return: pamięć podręczna kosztów rozwiązań (None, gdy wyłączona)
+        """
+        return self.__cost_cache
+
+    def get_distance_field_cache(self) -> DistanceFieldCache.DistanceFieldCache:
+        """
+        :return: pamięć podręczna pól odległości stacji (można ją przekazać np. do SolutionUtilization)
+        """
+        return self.__field_cache
+
+    def get_best_cost(self) -> float:
+        """
+        :return: koszt najlepszego znalezionego rozwiązania
+        """
+        return self.__Q_min
+
     def __solve(self) -> np.array:
+        """
+        Uruchamia algorytm Tabu Search. Przy workers > 1 na czas obliczeń tworzy pulę procesów przeglądających
+        sąsiedztwo.
+
+        :return self.__x_min: najlepsze znalezione rozwiązanie
+        """
+        self.__open_workers()
+        try:
+            return self.__tabu_search()
+        finally:
+            self.__close_workers()
+
+    def run_iterations(self, iterations: int) -> np.array:
+        """
+        Wykonuje co najwyżej iterations kolejnych iteracji algorytmu (mniej, gdy spełnione zostanie kryterium stopu
+        lub w sąsiedztwie zabraknie nowych rozwiązań). Przy pierwszym wywołaniu uruchamia algorytm metodą start.
+        Pozwala prowadzić obliczenia etapami, np. wymieniając rozwiązania między kilkoma solwerami. Pula procesów
+        otwarta wcześniej metodą open_workers pozostaje otwarta po powrocie - w przeciwnym razie pula tworzona jest
+        tylko na czas wywołania.
+
+        :param iterations: maksymalna liczba iteracji do wykonania
+        :return self.__x_min: najlepsze dotychczas znalezione rozwiązanie
+        """
+        opened = self.__parallel_evaluator is None
+        self.__open_workers()
+        try:
+            if self.__start_time is None:
+                self.start()
+            for _ in range(iterations):
+                if self.is_finished() or not self.step():
+                    break
+        finally:
+            if opened:
+                self.__close_workers()
+        return self.__x_min
+
+    def open_workers(self):
+        """
+        Przy workers > 1 tworzy pulę procesów przeglądających sąsiedztwo, używaną przez kolejne wywołania
+        run_iterations aż do wywołania close_workers.
+        """
+        self.__open_workers()
+
+    def close_workers(self):
+        """
+        Zamyka pulę procesów otwartą metodą open_workers.
+        """
+        self.__close_workers()
+
+    def is_finished(self) -> bool:
+        """
+        :return: czy algorytm zakończył pracę (spełnione kryterium stopu lub brak nowych rozwiązań w sąsiedztwie)
+        """
+        return self.__start_time is not None and (self.__x_a is None or self.__stop_condition())
+
+    def is_stuck(self) -> bool:
+        """
+        :return: czy w sąsiedztwie aktualnego rozwiązania zabrakło nowych rozwiązań
+        """
+        return self.__start_time is not None and self.__x_a is None
+
+    def restart(self, solution: np.array):
+        """
+        Wznawia przeszukiwanie od zadanego rozwiązania (np. najlepszego rozwiązania innego solwera).
+        Listy tabu są czyszczone, a najlepsze znalezione rozwiązanie aktualizowane, jeśli zadane jest lepsze.
+
+        :param solution: rozwiązanie, od którego algorytm kontynuuje obliczenia
+        """
+        if self.__start_time is None:
+            self.start()
+        self.__x_a = np.copy(solution)
+        self.__x_a_hash = self.__zobrist.hash(self.__x_a)
+        self.__Q_a = self.__cost(self.__x_a)
+        self.__visited = {}
+        self.__tabu_list[:] = 0
+        self.__long_term_tabu_list[:] = 0
+        if self.__Q_a < self.__Q_min:
+            self.__x_min = np.copy(self.__x_a)
+            self.__Q_min = self.__Q_a
+
+    def share_long_term_tabu(self, long_term_tabu_list: np.array):
+        """
+        Dołącza do długoterminowej listy tabu wpisy z listy innego solwera. Przyjmowane są tylko wpisy z pól,
+        na których aktualne rozwiązanie ma stacje dokujące - lista ta blokuje ruszanie stojących stacji.
+
+        :param long_term_tabu_list: długoterminowa lista tabu innego solwera
+        """
+        if self.__x_a is None:
+            return
+        shared = np.where(self.__x_a > 0, long_term_tabu_list, 0)
+        self.__long_term_tabu_list = np.maximum(self.__long_term_tabu_list, shared).astype('int32')
+
+    def get_best_solution(self) -> np.array:
+        """
+        :return: najlepsze znalezione rozwiązanie
+        """
+        return None if self.__x_min is None else np.copy(self.__x_min)
+
+    def get_long_term_tabu_list(self) -> np.array:
+        """
+        :return: kopia długoterminowej listy tabu
+        """
+        return np.copy(self.__long_term_tabu_list)
+
+    def get_solution_hash(self) -> int:
+        """
+        :return: hasz Zobrista aktualnego rozwiązania
+        """
+        return self.__x_a_hash
+
+    def get_iteration(self) -> int:
+        """
+        :return: liczba wykonanych iteracji
+        """
+        return self.__curr_it
+
+    def __open_workers(self):
+        """
+        Przy workers > 1 tworzy pulę procesów przeglądających sąsiedztwo.
+        """
+        if self.__workers > 1 and self.__parallel_evaluator is None:
+            self.__parallel_evaluator = NeighborhoodEvaluator.ParallelNeighborhoodEvaluator(
+                self.__workers, self.__d_max, self.__r, self.__client_map, self.__condition_tester.allowed_cells(),
+                distance_metric=self.__distance_metric if self.__field_cost is not None else None,
+                barrier_map=self.__barrier_map, field_cache_mb=self.__field_cache_mb)
+
+    def __close_workers(self):
+        """
+        Zamyka pulę procesów przeglądających sąsiedztwo.
+        """
+        if self.__parallel_evaluator is not None:
+            self.__parallel_evaluator.close()
+            self.__parallel_evaluator = None
+
+    def __tabu_search(self) -> np.array:
         """
         Funkcja implementuje dostosowany przez nas algorytm Tabu Search.
 
-        :param record_and_plot_data: opcjonalny argument służący do wyboru, czy chcemy wizualizować przebieg algorytmu
         :return self.__x_min: najlepsze znalezione rozwiązanie
         """
+        self.start()
+        while not self.__stop_condition():
+            if not self.step():
+                break
+        return self.__x_min
+
+    def start(self):
+        """
+        Przygotowuje algorytm do pracy: wyznacza rozwiązanie początkowe i zeruje liczniki kryterium stopu.
+        Kolejne iteracje wykonuje metoda step.
+        """
         # inicjalizacja zmiennych odpowiedzialnych za kryterium stopu
-        start_time = time.time()
+        self.__start_time = time.time()
         self.__curr_time = 0
         self.__curr_it = 0
 
         if self.__record_and_plot_data:
             logging.info("Generuję rozwiązanie początkowe")
         self.__x_a = self.__get_starting_solution()
+        self.__x_a_hash = self.__zobrist.hash(self.__x_a)
         self.__x_min = np.copy(self.__x_a)
         self.__Q_a = self.__cost(self.__x_a)
         self.__Q_min = self.__Q_a
+        self.__remember_visited()
 
         logging.info("Koszt rozwiązania początkowego: %.2f" % self.__Q_a)
         self.__collect_and_represent_data.collect_data(self.__x_a, self.__Q_a, self.__tabu_list,
                                                        self.__long_term_tabu_list, 0,
                                                        0, 0,
-                                                       0, 0)
+                                                       0, 0, self.__x_a_hash)
 
-        while not self.__stop_condition():
-            # aktualny numer iteracji, dany na sam początek w przypadku, gdyby był potrzebny aktualny indeks iteracji
-            self.__curr_it += 1
-            if self.__record_and_plot_data:
-                logging.info("Iteracja: " + str(self.__curr_it))
-                logging.info("Aktualne rozwiązanie ma koszt: %.2f" % self.__Q_a)
+    def step(self) -> bool:
+        """
+        Wykonuje jedną iterację algorytmu Tabu Search: przegląda sąsiedztwo x_a, wybiera nowe rozwiązanie
+        i aktualizuje listy tabu.
 
-            self.__Q_min_new = np.inf
-            self.__Q_min_new_tabu = np.inf
-            self.__x_min_new = None
-            self.__x_min_new_tabu = None
+        :return: False, gdy w sąsiedztwie nie znaleziono nowego rozwiązania (dalsze iteracje nie są możliwe)
+        """
+        # aktualny numer iteracji, dany na sam początek w przypadku, gdyby był potrzebny aktualny indeks iteracji
+        self.__curr_it += 1
+        if self.__record_and_plot_data:
+            logging.info("Iteracja: " + str(self.__curr_it))
+            logging.info("Aktualne rozwiązanie ma koszt: %.2f" % self.__Q_a)
 
-            elems_in_nei = 0
-            elems_in_short_tabu = 0
-            elems_in_long_tabu = 0
-            av_cadence = 0
-            av_long_cadence = 0
+        self.__Q_min_new = np.inf
+        self.__Q_min_new_tabu = np.inf
+        self.__x_min_new = None
+        self.__x_min_new_tabu = None
 
-            if self.__record_and_plot_data:
-                logging.info("Przeszukuję sąsiedztwo")
+        elems_in_nei = 0
+        elems_in_short_tabu = 0
+        elems_in_long_tabu = 0
+        av_cadence = 0
+        av_long_cadence = 0
 
-            for neighbor in self.__yield_neighbor():
+        if self.__record_and_plot_data:
+            logging.info("Przeszukuję sąsiedztwo")
+
+        self.__prepare_neighborhood()
+
+        if self.__neighborhood_mode == 'batched' or self.__parallel_evaluator is not None:
+            elems_in_nei, elems_in_short_tabu, elems_in_long_tabu, av_cadence, av_long_cadence = \
+                self.__scan_batched_neighborhood()
+        else:
+            for candidate in self.__yield_neighbor():
                 elems_in_nei += 1
-                if self.__is_solution_allowed(neighbor):
-                    x_new = neighbor
-                    Q_new = self.__cost(x_new)
-                    is_in_long_tabu, long_cadence = self.__is_in_long_term_tabu_list(x_new)
+                if self.__is_candidate_allowed(candidate):
+                    Q_new = self.__candidate_cost(candidate)
+                    is_in_long_tabu, long_cadence = self.__is_candidate_in_long_term_tabu_list(candidate)
                     if not is_in_long_tabu:
-                        is_in_tabu, cadence = self.__is_in_tabu_list(x_new)
+                        is_in_tabu, cadence = self.__is_candidate_in_tabu_list(candidate)
                         if not is_in_tabu:
                             if Q_new < self.__Q_min_new:
                                 self.__Q_min_new = Q_new
-                                self.__x_min_new = np.copy(x_new)
+                                self.__x_min_new = candidate
                         else:
                             # jeśli jest w krótkoterminowej liście tabu to licz średnią kadencyjność elementu, który
                             # zabrania ruch i licz ilość zabronień
@@ -285,7 +583,7 @@ class Solver:
                             elems_in_short_tabu += 1
                             if Q_new < self.__Q_min_new_tabu:
                                 self.__Q_min_new_tabu = Q_new
-                                self.__x_min_new_tabu = np.copy(x_new)
+                                self.__x_min_new_tabu = candidate
                     else:
                         # jeśli jest w długoterminowej liście tabu to licz średnią kadencyjność elementu, który
                         # zabrania ruch i licz ilość zabronień
@@ -293,71 +591,262 @@ class Solver:
                         elems_in_long_tabu += 1
                         if Q_new < self.__Q_min_new_tabu:
                             self.__Q_min_new_tabu = Q_new
-                            self.__x_min_new_tabu = np.copy(x_new)
+                            self.__x_min_new_tabu = candidate
                 if (self.__Q_min_new < 0.5 * (self.__Q_min + self.__Q_a)) and self.__dynamic_neighborhood:
                     break
 
-            logging.info('Przeszukano ' + str(elems_in_nei) + ' elementów z sąsiedztwa')
-
-            # licz średnie współczynniki kadencyjności elementów, które dokonały zabronienia
-            av_cadence = float(av_cadence / elems_in_short_tabu if elems_in_short_tabu > 0 else self.__min_time_in_tl)
-            av_long_cadence = float(av_long_cadence / elems_in_long_tabu if elems_in_long_tabu > 0 else
-                                    self.__min_time_in_lt_tl)
-            # normalizacja, żeby pokazywało, ile iteracji wcześniej został dodany element zabraniający
-            av_cadence = self.__min_time_in_tl - av_cadence
-            av_long_cadence = self.__min_time_in_lt_tl - av_long_cadence
-
-            prev_x_a = np.copy(self.__x_a)
-            self.__x_a = np.copy(self.__x_min_new) if not (self.__x_min_new is None) else None
-            self.__Q_a = self.__Q_min_new
-
-            if self.__aspiration_criteria():
-                self.__x_a = np.copy(self.__x_min_new_tabu)
-                self.__Q_a = self.__Q_min_new_tabu
-                # zmodyfikuj odpowiednią listę tabu, na podstawie której rozwiązaniu tutaj trafiło
-                if self.__is_in_long_term_tabu_list(self.__x_a)[0]:
-                    # potrzebujemy jednej jedynki w miejscu, gdzie stała stacja dokująca, którego nie wolno było ruszyć
-                    move = prev_x_a - self.__x_a
-                    self.__delete_given_move_from_long_term_tabu(move == 1)
-                    # jeśli jest na obu listach, to trzeba też usunąć z listy krótkoterminowej
-                    # bardzo rzadko zachodzi taka sytuacja, ale gdy już do niej dojdzie to następuje błąd
-                    if self.__is_in_tabu_list(self.__x_a)[0]:
-                        move = (self.__tabu_list > 0) * (self.__x_a > 0)
-                        self.__delete_given_move_from_tabu(move)
-                else:
-                    # potrzebujemy miejsca, w które nie wolno było postawić stacji dokujących
+        # macierze rozwiązań tworzone są tylko dla najlepszych kandydatów
+        x_min_new_hash = self.__candidate_hash(self.__x_min_new)
+        x_min_new_tabu_hash = self.__candidate_hash(self.__x_min_new_tabu)
+        self.__x_min_new = self.__candidate_to_solution(self.__x_min_new)
+        self.__x_min_new_tabu = self.__candidate_to_solution(self.__x_min_new_tabu)
+
+        logging.info('Przeszukano ' + str(elems_in_nei) + ' elementów z sąsiedztwa')
+
+        # licz średnie współczynniki kadencyjności elementów, które dokonały zabronienia
+        av_cadence = float(av_cadence / elems_in_short_tabu if elems_in_short_tabu > 0 else self.__min_time_in_tl)
+        av_long_cadence = float(av_long_cadence / elems_in_long_tabu if elems_in_long_tabu > 0 else
+                                self.__min_time_in_lt_tl)
+        # normalizacja, żeby pokazywało, ile iteracji wcześniej został dodany element zabraniający
+        av_cadence = self.__min_time_in_tl - av_cadence
+        av_long_cadence = self.__min_time_in_lt_tl - av_long_cadence
+
+        prev_x_a = np.copy(self.__x_a)
+        self.__x_a = np.copy(self.__x_min_new) if not (self.__x_min_new is None) else None
+        self.__x_a_hash = x_min_new_hash
+        self.__Q_a = self.__Q_min_new
+
+        if self.__aspiration_criteria():
+            self.__x_a = np.copy(self.__x_min_new_tabu)
+            self.__x_a_hash = x_min_new_tabu_hash
+            self.__Q_a = self.__Q_min_new_tabu
+            # rozwiązanie mogło być zabronione także jako niedawno odwiedzone
+            self.__visited.pop(self.__x_a_hash, None)
+            # zmodyfikuj odpowiednią listę tabu, na podstawie której rozwiązaniu tutaj trafiło
+            if self.__is_in_long_term_tabu_list(self.__x_a)[0]:
+                # potrzebujemy jednej jedynki w miejscu, gdzie stała stacja dokująca, którego nie wolno było ruszyć
+                move = prev_x_a - self.__x_a
+                self.__delete_given_move_from_long_term_tabu(move == 1)
+                # jeśli jest na obu listach, to trzeba też usunąć z listy krótkoterminowej
+                # bardzo rzadko zachodzi taka sytuacja, ale gdy już do niej dojdzie to następuje błąd
+                if self.__is_in_tabu_list(self.__x_a)[0]:
                     move = (self.__tabu_list > 0) * (self.__x_a > 0)
                     self.__delete_given_move_from_tabu(move)
-            if self.__Q_a < self.__Q_min:
-                # należy pamiętać, że gdyby nie copy, to modyfikacja
-                # x_a zmieniała by też x_min
-                self.__x_min = np.copy(self.__x_a)
-                self.__Q_min = self.__Q_a
-            if self.__x_a is None:
-                if self.__record_and_plot_data:
-                    logging.info("Nie znaleziono nowego rozwiązania w sąsiedztwie")
-                break
-
-            # Dla listy tabu składającej się od razu z indeksów
-            # natychmiast usunie najstarszy ruch
-            self.__change_times_to_left_tl()
-            self.__change_times_to_left_lt_tl()
-            move = prev_x_a - self.__x_a
-            self.__add_move_to_tabu_list(move)
-            self.__add_move_to_long_term_tabu_list(move)
-
-            # Aktualizacja zmiennych odpowiadających za kryterium czasowe stopu
-            self.__curr_time = time.time() - start_time
-
-            # Aktualizacja danych przekazywanych do DataCollectorPlotter
-            self.__collect_and_represent_data.collect_data(self.__x_a, self.__Q_a, self.__tabu_list,
-                                                           self.__long_term_tabu_list, elems_in_nei,
-                                                           av_cadence, av_long_cadence,
-                                                           elems_in_short_tabu, elems_in_long_tabu)
-        return self.__x_min
+            else:
+                # potrzebujemy miejsca, w które nie wolno było postawić stacji dokujących
+                move = (self.__tabu_list > 0) * (self.__x_a > 0)
+                self.__delete_given_move_from_tabu(move)
+        if self.__Q_a < self.__Q_min:
+            # należy pamiętać, że gdyby nie copy, to modyfikacja
+            # x_a zmieniała by też x_min
+            self.__x_min = np.copy(self.__x_a)
+            self.__Q_min = self.__Q_a
+        if self.__x_a is None:
+            if self.__record_and_plot_data:
+                logging.info("Nie znaleziono nowego rozwiązania w sąsiedztwie")
+            return False
+
+        # Dla listy tabu składającej się od razu z indeksów
+        # natychmiast usunie najstarszy ruch
+        self.__change_times_to_left_tl()
+        self.__change_times_to_left_lt_tl()
+        move = prev_x_a - self.__x_a
+        self.__add_move_to_tabu_list(move)
+        self.__add_move_to_long_term_tabu_list(move)
+        self.__remember_visited()
+
+        # Aktualizacja zmiennych odpowiadających za kryterium czasowe stopu
+        self.__curr_time = time.time() - self.__start_time
+
+        # Aktualizacja danych przekazywanych do DataCollectorPlotter
+        self.__collect_and_represent_data.collect_data(self.__x_a, self.__Q_a, self.__tabu_list,
+                                                       self.__long_term_tabu_list, elems_in_nei,
+                                                       av_cadence, av_long_cadence,
+                                                       elems_in_short_tabu, elems_in_long_tabu, self.__x_a_hash)
+        return True
 
     def __yield_neighbor(self):
-        return NeighborhoodGenerator.neighborhood_generator(self.__x_a, self.__r)
+        if self.__neighborhood_mode == 'matrix':
+            return NeighborhoodGenerator.neighborhood_generator(self.__x_a, self.__r)
+        return NeighborhoodGenerator.move_generator(self.__x_a, self.__r)
+
+    def __prepare_neighborhood(self):
+        """
+        Przygotowuje dane potrzebne do oceny kandydatów z sąsiedztwa aktualnego rozwiązania x_a.
+        W trybie 'moves' zapamiętuje stacje x_a stojące na niedozwolonych pozycjach i na liście tabu oraz pola
+        długoterminowej listy tabu, na których brakuje stacji - dzięki temu ocena ruchu nie wymaga przeglądania
+        całej macierzy.
+        """
+        self.__visited = {solution_hash: expiry for solution_hash, expiry in self.__visited.items()
+                          if expiry > self.__curr_it}
+
+        if self.__neighborhood_mode == 'batched' or self.__parallel_evaluator is not None:
+            # BatchedNeighborhoodEvaluator sam przygotowuje IncrementalCost dla x_a (w puli - w procesach potomnych),
+            # więc stan dla pamięci podręcznej wyznaczany jest tu tylko wtedy, gdy jest ona włączona; ponowne
+            # przygotowanie tego samego x_a przez BatchedNeighborhoodEvaluator korzysta z już policzonych odległości
+            if self.__cost_cache is not None:
+                self.__incremental_cost.reset(self.__x_a)
+                self.__share_x_a_evaluation()
+            return
+
+        if self.__delta_evaluation:
+            self.__incremental_cost.reset(self.__x_a)
+            self.__share_x_a_evaluation()
+
+        if self.__neighborhood_mode == 'moves':
+            stations = [tuple(int(i) for i in position) for position in np.argwhere(self.__x_a == 1)]
+            self.__not_allowed_stations = {position for position in stations
+                                           if not self.__condition_tester.is_position_allowed(position)}
+            self.__stations_in_tabu = {position: int(self.__tabu_list[position]) for position in stations
+                                       if self.__tabu_list[position] > 0}
+            missing = np.argwhere((self.__long_term_tabu_list > 0) * (self.__x_a == 0))
+            self.__missing_long_term_tabu = {tuple(int(i) for i in position):
+                                             int(self.__long_term_tabu_list[tuple(position)])
+                                             for position in missing}
+
+    def __share_x_a_evaluation(self):
+        """
+        Zapisuje w pamięci podręcznej koszt x_a policzony przez IncrementalCost, dzięki czemu pamięć podręczna
+        kosztów jest wypełniana także przy przyrostowym liczeniu kosztu sąsiadów, oraz liczbę klientów przypisanych do
+        stacji x_a, z której korzysta SolutionGrader.
+        """
+        if self.__cost_cache is None:
+            return
+        self.__cost_cache.put(self.__cost_cache_namespace, self.__x_a_hash, self.__incremental_cost.get_base_cost())
+        if self.__station_loads_namespace is not None:
+            self.__cost_cache.put(self.__station_loads_namespace, self.__x_a_hash,
+                                  self.__incremental_cost.get_station_loads())
+
+    def __scan_batched_neighborhood(self) -> Tuple[int, int, int, float, float]:
+        """
+        Przegląda całe sąsiedztwo x_a operacjami na tablicach (NeighborhoodEvaluator, w puli procesów przy
+        workers > 1) i ustawia najlepszych kandydatów tak, jak robi to pętla po kolejnych ruchach.
+
+        :return: liczba przejrzanych elementów sąsiedztwa, liczba elementów na krótkoterminowej i długoterminowej
+                 liście tabu oraz sumy kadencyjności elementów zabraniających ruch dla obu list
+        """
+        threshold = 0.5 * (self.__Q_min + self.__Q_a) if self.__dynamic_neighborhood else None
+        evaluator = self.__batched_evaluator if self.__parallel_evaluator is None else self.__parallel_evaluator
+        visited_hashes = np.array(sorted(self.__visited), dtype=np.uint64)
+        visited_cadence = np.array([self.__visited[solution_hash] - self.__curr_it
+                                    for solution_hash in sorted(self.__visited)], dtype='int64')
+        result = evaluator.evaluate(self.__x_a, self.__tabu_list, self.__long_term_tabu_list, threshold,
+                                    solution_hash=self.__x_a_hash, visited_hashes=visited_hashes,
+                                    visited_cadence=visited_cadence)
+        self.__x_min_new, self.__Q_min_new = result['move'], result['cost']
+        self.__x_min_new_tabu, self.__Q_min_new_tabu = result['tabu_move'], result['tabu_cost']
+        return result['elems_in_nei'], result['elems_in_short_tabu'], result['elems_in_long_tabu'], \
+            result['cadence_sum'], result['long_cadence_sum']
+
+    def __candidate_hash(self, candidate) -> int:
+        """
+        :param candidate: kandydat z sąsiedztwa (macierz lub opis ruchu) albo None
+        :return: hasz Zobrista kandydata (None, gdy kandydat to None); dla ruchu liczony w czasie O(1) z haszu x_a
+        """
+        if candidate is None:
+            return None
+        if self.__neighborhood_mode == 'matrix':
+            return self.__zobrist.hash(candidate)
+        _, source, destination = candidate
+        return self.__zobrist.move(self.__x_a_hash, source, destination)
+
+    def __remember_visited(self):
+        """
+        Zapamiętuje hasz aktualnego rozwiązania w pamięci odwiedzonych rozwiązań (gdy visited_tenure > 0).
+        Tak jak na krótkoterminowej liście tabu, w kolejnej iteracji pozostały czas zabronienia wynosi visited_tenure.
+        """
+        if self.__visited_tenure > 0:
+            self.__visited[self.__x_a_hash] = self.__curr_it + self.__visited_tenure + 1
+
+    def __candidate_to_solution(self, candidate) -> np.array:
+        """
+        :param candidate: kandydat z sąsiedztwa (macierz lub opis ruchu) albo None
+        :return: macierz rozwiązania odpowiadająca kandydatowi (None, gdy kandydat to None)
+        """
+        if candidate is None:
+            return None
+        if self.__neighborhood_mode == 'matrix':
+            return np.copy(candidate)
+        return NeighborhoodGenerator.apply_move(self.__x_a, candidate)
+
+    def __is_candidate_allowed(self, candidate) -> bool:
+        """
+        :param candidate: kandydat z sąsiedztwa (macierz lub opis ruchu)
+        :return: czy kandydat spełnia ograniczenia
+        """
+        if self.__neighborhood_mode == 'matrix':
+            return self.__is_solution_allowed(candidate)
+        _, source, destination = candidate
+        return self.__condition_tester.is_move_allowed(source, destination) and \
+            self.__not_allowed_stations <= {source}
+
+    def __candidate_cost(self, candidate) -> float:
+        """
+        :param candidate: kandydat z sąsiedztwa (macierz lub opis ruchu)
+        :return: koszt kandydata
+        """
+        if self.__neighborhood_mode == 'matrix':
+            return self.__neighbor_cost(candidate)
+        station, source, destination = candidate
+        if self.__delta_evaluation:
+            return self.__incremental_cost.get_base_cost() + self.__incremental_cost.move_delta(station,
+                                                                                                destination)
+        if self.__cost_cache is not None:
+            return self.__cached_cost(self.__zobrist.move(self.__x_a_hash, source, destination),
+                                      lambda: self.__move_cost(source, destination))
+        return self.__move_cost(source, destination)
+
+    def __move_cost(self, source: Tuple[int, int], destination: Tuple[int, int]) -> float:
+        """
+        :param source: stara pozycja stacji
+        :param destination: nowa pozycja stacji
+        :return: pełny koszt x_a po przesunięciu stacji
+        """
+        # ruch wykonywany jest na chwilę na x_a, żeby nie kopiować całej macierzy
+        self.__x_a[source], self.__x_a[destination] = 0, 1
+        cost = self.__cost_function.cost(self.__x_a)
+        self.__x_a[source], self.__x_a[destination] = 1, 0
+        return cost
+
+    def __is_candidate_in_tabu_list(self, candidate) -> Tuple[bool, float]:
+        """
+        Odpowiednik __is_in_tabu_list dla kandydata. Ruch jest na liście tabu, gdy po jego wykonaniu jakaś stacja
+        stoi na polu listy tabu albo gdy prowadzi do niedawno odwiedzonego rozwiązania.
+
+        :param candidate: kandydat z sąsiedztwa (macierz lub opis ruchu)
+        :return: czy kandydat jest na liście tabu oraz współczynnik elementu zabraniającego ruch
+        """
+        if self.__neighborhood_mode == 'matrix':
+            is_in_tabu, cadence = self.__is_in_tabu_list(candidate)
+        else:
+            _, source, destination = candidate
+            cadences = [cadence for position, cadence in self.__stations_in_tabu.items() if position != source]
+            if self.__tabu_list[destination] > 0:
+                cadences.append(int(self.__tabu_list[destination]))
+            is_in_tabu, cadence = len(cadences) > 0, float(max(cadences, default=0))
+
+        if self.__visited:
+            candidate_hash = self.__candidate_hash(candidate)
+            if candidate_hash in self.__visited:
+                is_in_tabu = True
+                cadence = max(cadence, float(self.__visited[candidate_hash] - self.__curr_it))
+        return is_in_tabu, cadence
+
+    def __is_candidate_in_long_term_tabu_list(self, candidate) -> Tuple[bool, float]:
+        """
+        Odpowiednik __is_in_long_term_tabu_list dla kandydata. Ruch jest na długoterminowej liście tabu, gdy po
+        jego wykonaniu na którymś z pól tej listy brakuje stacji.
+
+        :param candidate: kandydat z sąsiedztwa (macierz lub opis ruchu)
+        :return: czy kandydat jest na długoterminowej liście tabu oraz współczynnik elementu zabraniającego ruch
+        """
+        if self.__neighborhood_mode == 'matrix':
+            return self.__is_in_long_term_tabu_list(candidate)
+        _, source, destination = candidate
+        cadences = [cadence for position, cadence in self.__missing_long_term_tabu.items() if position != destination]
+        if self.__long_term_tabu_list[source] > 0:
+            cadences.append(int(self.__long_term_tabu_list[source]))
+        return len(cadences) > 0, float(max(cadences, default=0))
 
     def __get_starting_solution(self):
         """
@@ -375,21 +864,48 @@ class Solver:
                 logging.info("Generuję automatycznie możliwie najlepsze rozwiązanie początkowe")
             return self.__default_starting_sol_gen.generate()
 
-    def __cost(self, x_new: np.array) -> int:
+    def __cost(self, x_new: np.array) -> float:
         """
         Funkcja licząca koszt danego rozwiązania. Korzysta ze wzoru zamieszczonego w dokumentacji.
+        Obliczenia wykonuje wybrana przy inicjalizacji implementacja funkcji kosztu (cost_backend), a wyniki
+        zapamiętywane są w pamięci podręcznej kosztów.
 
         :param x_new: rozwiązanie, dla którego liczona jest funkcja celu
         :return cost: koszt dla tego rozwiązania
         """
-        cost = 0
-        for index, value in np.ndenumerate(self.__client_map):
-            if value > 0:
-                cost += value * self.__dist_to_nearest_pl(index, x_new)
+        if self.__cost_cache is None:
+            return self.__cost_function.cost(x_new)
+        return self.__cached_cost(self.__zobrist.hash(x_new), lambda: self.__cost_function.cost(x_new))
 
+    def __cached_cost(self, key: int, compute: Callable[[], float]) -> float:
+        """
+        :param key: hasz Zobrista układu stacji
+        :param compute: funkcja licząca koszt, gdy nie ma go w pamięci
+        :return cost: koszt rozwiązania
+        """
+        cost, is_hit = self.__cost_cache.get_or_compute(self.__cost_cache_namespace, key, compute)
+        Telemetry.count('CostCache.hits' if is_hit else 'CostCache.misses')
         return cost
 
-    def __dist_to_nearest_pl(self, actual_point: Tuple[int, int], pl_map: np.array) -> int:
+    def __neighbor_cost(self, neighbor: np.array) -> float:
+        """
+        Funkcja licząca koszt sąsiada aktualnego rozwiązania.
+        Przy włączonym delta_evaluation sąsiad różni się od x_a położeniem jednej stacji, więc jego koszt to koszt x_a
+        powiększony o zmianę kosztu wynikającą z tego ruchu.
+
+        :param neighbor: sąsiad aktualnego rozwiązania
+        :return cost: koszt sąsiada
+        """
+        if not self.__delta_evaluation:
+            return self.__cost(neighbor)
+
+        diff = neighbor - self.__x_a
+        source = tuple(np.argwhere(diff < 0)[0])
+        destination = tuple(np.argwhere(diff > 0)[0])
+        station = self.__incremental_cost.station_index(source)
+        return self.__incremental_cost.get_base_cost() + self.__incremental_cost.move_delta(station, destination)
+
+    def __dist_to_nearest_pl(self, actual_point: Tuple[int, int], pl_map: np.array) -> float:
 
         """
         Funkcja zwracająca odległość pomiędzy punktem [actual_point] a najbliższą stacją dokującą, jeśli ta odległość
@@ -399,26 +915,7 @@ class Solver:
         :param actual_point:
         :return:
         """
-        # Wersja macierzowa - najszybszy sposób przeprowadzania obliczeń
-        y, x = actual_point
-        if pl_map[y, x]:
-            return 0
-        for r in range(self.__map_shape[0] + self.__map_shape[1]):
-            x_min = x - r if x - r > 0 else 0
-            x_max = x + r + 1 if x + r + 1 < self.__map_shape[1] else self.__map_shape[1]
-            y_min = y - r if y - r > 0 else 0
-            y_max = y + r + 1 if y + r + 1 < self.__map_shape[0] else self.__map_shape[0]
-
-            mx_min = r - (x - x_min)
-            mx_max = r + (x_max - 1 - x) + 1
-            my_min = r - (y - y_min)
-            my_max = r + (y_max - 1 - y) + 1
-
-            cut = pl_map[y_min:y_max, x_min:x_max]
-            mask = self.__diamond_list[r][my_min:my_max, mx_min:mx_max]
-            values = cut[mask]
-            if np.any(values):
-                return r if r <= self.__d_max else self.__d_max*(2 - np.exp(-(r - self.__d_max)/self.__d_max))
+        return self.__diamond_cost.dist_to_nearest_pl(actual_point, pl_map)
 
     def __is_in_tabu_list(self, x_new: np.array) -> Tuple[bool, float]:
         """
@@ -457,7 +954,7 @@ class Solver:
         is_in_tabu = pl_not_in_forbidden_places < self.__n_max
         cadence = self.__tabu_list[(diff <= 0) * (x_new > 0)] if is_in_tabu else 0
 
-        return is_in_tabu, float(cadence)
+        return is_in_tabu, float(np.max(cadence))
 
     def __is_in_long_term_tabu_list(self, x_new: np.array) -> Tuple[bool, float]:
         """
@@ -474,7 +971,7 @@ class Solver:
         tabu_pl = self.__long_term_tabu_list > 0
         cadence = self.__long_term_tabu_list[(~x_new * tabu_pl) == -1] if is_in_long_tabu else 0
 
-        return is_in_long_tabu, float(cadence)
+        return is_in_long_tabu, float(np.max(cadence))
 
     def __change_times_to_left_tl(self):
         """
@@ -1,3 +1,4 @@
+import heapq
 import numpy as np
 from abc import ABC, abstractmethod
 from typing import Tuple
@@ -58,6 +59,12 @@ class StartingSolutionGen(StartingSolutionGenInterface):
 
     Kryterium stopu: skończyły się stacje dokujące
 
+    Macierz masek liczona jest raz, splotem mapy komórek z klientami z diamentem (Helpers.diamond_convolution).
+    Po wstawieniu stacji zmieniają się tylko komórki w odległości 2*D_max od niej, więc aktualizowane jest tylko to
+    okno. Komórki o największej wartości wyszukiwane są kopcem z leniwym usuwaniem: wpis, którego wartość jest już
+    nieaktualna, po zdjęciu z kopca wstawiany jest ponownie z aktualną wartością. Przy równych wartościach wybierana
+    jest komórka pierwsza w kolejności wierszy (tak jak przez np.argmax).
+
     Jeśli pozostały stacje dokujące, a miejsca do ich umieszczenia nie ma (wszystkie pozostałe komórki
     nie spełniają ograniczeń) to rzucany jest wyjątek, że nie można wygenerować rozwiązania początkowego
     """
@@ -90,32 +97,47 @@ class StartingSolutionGen(StartingSolutionGenInterface):
         """
         self.__temp_clients_map = np.copy(self.__client_map)
         starting_solution = np.zeros(self.__map_shape, dtype='int32')
+        self.__make_mask_matrix()
 
-        available_pl = self.__n_max
+        # komórki, w których zasięgu jest zbyt wielu klientów, nigdy nie trafiają do kopca
+        allowed = Helpers.diamond_convolution(self.__client_map, self.__d_max) <= self.__p_max
+        heap = [(-self.__mask_matrix.flat[index], index) for index in np.flatnonzero(allowed)]
+        heapq.heapify(heap)
 
-        while available_pl > 0:
-            self.__make_mask_matrix()
-            place_found = False
-            # iteruje po komórkach o wartościach od największych do najmniejszych, aż nie znajdzie optymalnego miejsca
-            while not place_found:
+        for _ in range(self.__n_max):
+            while True:
                 # jeśli przeszukano wszystkie pozycje i nie znaleziono miejsca
-                if np.max(self.__mask_matrix) == -1:
+                if not heap:
                     raise RuntimeError("Can't generate starting solution")
-                # znajduje pierwsze maksimum w macierzy masek
-                max_ind = np.unravel_index(np.argmax(self.__mask_matrix, axis=None), self.__mask_matrix.shape)
-
-                if self.__check_client_number_in_pl_range(max_ind) > self.__p_max or starting_solution[max_ind] == 1:
-                    # wstawiam -1, żeby maksimum mi nie znajdowało tej komórki (zabraniam ustawienia stacji dokujących
-                    # w to miejsce) jeśli max to będzie -1, to wtedy generator kończy działanie
-                    self.__mask_matrix[max_ind] = -1
-                else:
-                    starting_solution[max_ind] = 1
-                    available_pl -= 1
-                    place_found = True
-                    self.__reduce_temp_clients_map(max_ind)
+                value, index = heapq.heappop(heap)
+                if -value == self.__mask_matrix.flat[index]:
+                    break
+                heapq.heappush(heap, (-self.__mask_matrix.flat[index], index))
+
+            max_ind = np.unravel_index(index, self.__map_shape)
+            starting_solution[max_ind] = 1
+            self.__update_mask_matrix(max_ind)
 
         return starting_solution
 
+    def __update_mask_matrix(self, cell_coord: Tuple[int, int]):
+        """
+        Usuwa klientów z otoczenia wstawionej stacji dokującej i aktualizuje macierz masek w oknie o promieniu
+        2*D_max wokół niej - tylko tam zmienia się liczba komórek z klientami w zasięgu.
+
+        :param cell_coord: współrzędne wstawionej stacji dokującej
+        """
+        y, x = cell_coord
+        r = 2 * self.__d_max
+        y_min, y_max = max(y - r, 0), min(y + r + 1, self.__map_shape[0])
+        x_min, x_max = max(x - r, 0), min(x + r + 1, self.__map_shape[1])
+
+        before = self.__temp_clients_map[y_min:y_max, x_min:x_max] > 0
+        self.__reduce_temp_clients_map(cell_coord)
+        removed = before & ~(self.__temp_clients_map[y_min:y_max, x_min:x_max] > 0)
+
+        self.__mask_matrix[y_min:y_max, x_min:x_max] -= Helpers.diamond_convolution(removed, self.__d_max)
+
     def __reduce_temp_clients_map(self, cell_coord: Tuple[int, int]):
         """
         Usuwa klientów w tymczasowej mapie po wstawieniu w okolicy stacji dokujących
@@ -143,30 +165,12 @@ class StartingSolutionGen(StartingSolutionGenInterface):
 
     def __make_mask_matrix(self):
         """
-        Funkcja tworząca macierz maskową.
+        Funkcja tworząca macierz maskową - splot macierzy komórek z klientami z diamentem o promieniu D_max.
 
         :return: None
         """
-        self.__mask_matrix = np.zeros(self.__map_shape)
-        r = self.__d_max
-        for index, value in np.ndenumerate(self.__temp_clients_map):
-            if value > 0:
-                y, x = index
-
-                x_min = x - r if x - r > 0 else 0
-                x_max = x + r + 1 if x + r + 1 < self.__map_shape[1] else self.__map_shape[1]
-                y_min = y - r if y - r > 0 else 0
-                y_max = y + r + 1 if y + r + 1 < self.__map_shape[0] else self.__map_shape[0]
-
-                mx_min = r - (x - x_min)
-                mx_max = r + (x_max - 1 - x) + 1
-                my_min = r - (y - y_min)
-                my_max = r + (y_max - 1 - y) + 1
-
-                temp_mask = np.copy(self.__mask_matrix[y_min:y_max, x_min:x_max])
-                temp_mask[self.__diamond_matrix[my_min:my_max, mx_min:mx_max]] += 1
-
-                self.__mask_matrix[y_min:y_max, x_min:x_max] = temp_mask
+        self.__mask_matrix = Helpers.diamond_convolution((self.__temp_clients_map > 0).astype('int64'),
+                                                         self.__d_max)
 
     def __check_client_number_in_pl_range(self, pl_coords: Tuple[int, int]) -> int:
         """
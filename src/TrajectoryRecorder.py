@@ -0,0 +1,214 @@
+import os
+import numpy as np
+from typing import Iterator, Tuple
+
+
+class Trajectories:
+    """
+    Zapisane pozycje robotów, odczytywane leniwie klatka po klatce (także z pliku odwzorowanego w pamięci).
+    Indeksowanie jak w macierzy (liczba klatek x liczba robotów x 2): trajectories[i] to macierz int16 (liczba
+    robotów x 2) współrzędnych (wiersz, kolumna) robotów w i-tej zapisanej klatce, a trajectories[a:b] - stos
+    takich macierzy. Przy kodowaniu różnicowym klatki zapisane są jako przesunięcia względem poprzedniej klatki,
+    a co KEYFRAME_INTERVAL klatek zapisywana jest klatka pełna - odczyt dowolnej klatki wymaga zsumowania co
+    najwyżej KEYFRAME_INTERVAL przesunięć, a odczyt kolejnych klatek - jednego.
+    """
+    # co ile klatek zapisywana jest klatka pełna przy kodowaniu różnicowym
+    KEYFRAME_INTERVAL = 256
+
+    def __init__(self, frames: np.array, keyframes: np.array = None, every: int = 1):
+        """
+        :param frames: macierz (liczba klatek x liczba robotów x 2) pozycji robotów lub, przy kodowaniu różnicowym,
+                       ich przesunięć względem poprzedniej klatki
+        :param keyframes: macierz pełnych klatek co KEYFRAME_INTERVAL klatek (None - brak kodowania różnicowego)
+        :param every: co który krok symulacji zapisana jest klatka
+        """
+        self.__frames = frames
+        self.__keyframes = keyframes
+        self.__every = every
+        # ostatnio odtworzona klatka (numer, pozycje) - kolejne klatki odtwarzane są z niej jednym przesunięciem
+        self.__cached = None
+
+    @property
+    def shape(self) -> Tuple[int, int, int]:
+        return self.__frames.shape
+
+    def __len__(self):
+        return len(self.__frames)
+
+    def get_every(self) -> int:
+        """
+        :return: co który krok symulacji zapisana jest klatka (klatka i odpowiada krokowi i * every)
+        """
+        return self.__every
+
+    def __getitem__(self, item):
+        """
+        Nadpisanie [] - numer klatki, wycinek klatek lub krotka, której pierwszy element wybiera klatki
+        """
+        if isinstance(item, tuple):
+            frames = self[item[0]]
+            return frames[(slice(None),) + item[1:]] if isinstance(item[0], slice) else frames[item[1:]]
+        if isinstance(item, slice):
+            if self.__keyframes is None:
+                return np.array(self.__frames[item], dtype='int16')
+            frames = [self.__frame(i) for i in range(*item.indices(len(self)))]
+            return np.stack(frames) if frames else np.zeros((0,) + self.shape[1:], dtype='int16')
+        index = int(item)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Numer klatki {} poza zakresem".format(item))
+        return self.__frame(index)
+
+    def __iter__(self) -> Iterator[np.array]:
+        """
+        :return: generator kolejnych klatek
+        """
+        for i in range(len(self)):
+            yield self.__frame(i)
+
+    def __frame(self, index: int) -> np.array:
+        """
+        :param index: numer klatki
+        :return: macierz int16 (liczba robotów x 2) pozycji robotów w klatce (kopia)
+        """
+        if self.__keyframes is None:
+            return np.array(self.__frames[index], dtype='int16')
+        start = index - index % self.KEYFRAME_INTERVAL
+        if self.__cached is not None and start <= self.__cached[0] <= index:
+            start, position = self.__cached
+        else:
+            position = self.__keyframes[start // self.KEYFRAME_INTERVAL]
+        position = (position + np.sum(self.__frames[start + 1:index + 1], axis=0, dtype='int32')).astype('int16')
+        self.__cached = (index, position)
+        return np.copy(position)
+
+
+class TrajectoryRecorder:
+    """
+    Zapis pozycji robotów z kolejnych kroków symulacji TrafficMapGenerator.generate_map.
+    Pozycje zapisywane są jako int16 (mapa może mieć co najwyżej 32768 wierszy i kolumn), opcjonalnie tylko co every
+    krok symulacji (kroki 0, every, 2 * every, ...) i/lub różnicowo - jako przesunięcia int8 (int16, gdy every > 127)
+    względem poprzedniej zapisanej klatki z pełną klatką co Trajectories.KEYFRAME_INTERVAL klatek. Klatki trzymane
+    są w pamięci lub, jeśli podano path, zapisywane na bieżąco do pliku .npy (przy kodowaniu różnicowym pełne klatki
+    trafiają do drugiego pliku, z przyrostkiem _keyframes) - plik można potem odczytywać leniwie funkcją
+    load_trajectories.
+
+    Symulacja wywołuje open na początku, record dla kolejnych bloków kroków i close na końcu, więc w jej miejsce
+    można przekazać dowolny obiekt z tymi metodami oraz get_trajectories.
+    """
+
+    def __init__(self, every: int = 1, delta: bool = False, path: str = None):
+        """
+        :param every: co który krok symulacji zapisywać pozycje robotów
+        :param delta: czy zapisywać przesunięcia robotów względem poprzedniej klatki zamiast pozycji
+        :param path: ścieżka do pliku .npy, do którego zapisywane są klatki (None - klatki w pamięci)
+        """
+        if every < 1:
+            raise ValueError("Odstęp między zapisywanymi krokami musi być dodatni")
+        self.__every = every
+        self.__delta = delta
+        self.__path = path
+        self.__frames = None
+        self.__keyframes = None
+        self.__tick = 0
+        self.__count = 0
+        self.__last = None
+
+    def open(self, sim_len: int, robot_count: int, map_shape: Tuple[int, int]):
+        """
+        Przygotowuje zapis symulacji (poprzedni zapis tego obiektu jest nadpisywany).
+
+        :param sim_len: długość symulacji w iteracjach
+        :param robot_count: liczba robotów
+        :param map_shape: rozmiar mapy
+        """
+        if max(map_shape) > np.iinfo(np.int16).max + 1:
+            raise ValueError("Mapa o rozmiarze {} jest za duża do zapisu pozycji jako int16".format(tuple(map_shape)))
+        shape = ((sim_len + self.__every - 1) // self.__every, robot_count, 2)
+        dtype = ('int8' if self.__every <= np.iinfo(np.int8).max else 'int16') if self.__delta else 'int16'
+        interval = Trajectories.KEYFRAME_INTERVAL
+        keyframes_shape = ((shape[0] + interval - 1) // interval,) + shape[1:]
+        if self.__path is None:
+            self.__frames = np.zeros(shape, dtype=dtype)
+            self.__keyframes = np.zeros(keyframes_shape, dtype='int16') if self.__delta else None
+        else:
+            self.__frames = np.lib.format.open_memmap(self.__path, mode='w+', dtype=dtype, shape=shape)
+            keyframes_path = _keyframes_path(self.__path)
+            if self.__delta:
+                self.__keyframes = np.lib.format.open_memmap(keyframes_path, mode='w+', dtype='int16',
+                                                             shape=keyframes_shape)
+            else:
+                # plik pełnych klatek z wcześniejszego zapisu różnicowego oznaczałby kodowanie różnicowe
+                if os.path.exists(keyframes_path):
+                    os.remove(keyframes_path)
+                self.__keyframes = None
+        self.__tick = 0
+        self.__count = 0
+        self.__last = None
+
+    def record(self, positions: np.array):
+        """
+        :param positions: macierz (liczba kroków x liczba robotów x 2) współrzędnych robotów w kolejnych krokach
+                          symulacji, następujących po krokach zapisanych wcześniej
+        """
+        # kopia - symulacja może ponownie użyć przekazanej macierzy
+        kept = np.array(positions[(-self.__tick) % self.__every::self.__every], dtype='int16')
+        self.__tick += len(positions)
+        if not len(kept):
+            return
+        frames = slice(self.__count, self.__count + len(kept))
+        if self.__delta:
+            if self.__last is None:
+                self.__last = kept[0]
+            delta = np.diff(kept, axis=0, prepend=self.__last[None])
+            limit = np.iinfo(self.__frames.dtype).max
+            if np.any(np.abs(delta) > limit):
+                raise ValueError("Przesunięcie robota między klatkami przekracza {}".format(limit))
+            self.__frames[frames] = delta
+            # pełne klatki - pierwsze klatki kolejnych bloków po KEYFRAME_INTERVAL klatek
+            interval = Trajectories.KEYFRAME_INTERVAL
+            keyframes = np.arange(-(-self.__count // interval) * interval, frames.stop, interval)
+            self.__keyframes[keyframes // interval] = kept[keyframes - self.__count]
+            self.__last = kept[-1]
+        else:
+            self.__frames[frames] = kept
+        self.__count = frames.stop
+
+    def close(self):
+        """
+        Kończy zapis symulacji - zapisuje klatki do pliku (jeśli podano path).
+        """
+        if self.__path is not None:
+            self.__frames.flush()
+            if self.__keyframes is not None:
+                self.__keyframes.flush()
+
+    def get_trajectories(self) -> Trajectories:
+        """
+        :return: zapisane pozycje robotów (przy zapisie do pliku - odczytywane leniwie z pliku)
+        """
+        if self.__path is not None:
+            return load_trajectories(self.__path, self.__every)
+        return Trajectories(self.__frames, self.__keyframes, self.__every)
+
+
+def _keyframes_path(path: str) -> str:
+    """
+    :param path: ścieżka do pliku .npy z klatkami
+    :return: ścieżka do pliku .npy z pełnymi klatkami kodowania różnicowego
+    """
+    return os.path.splitext(path)[0] + '_keyframes.npy'
+
+
+def load_trajectories(path: str, every: int = 1) -> Trajectories:
+    """
+    Odwzorowuje w pamięci (tylko do odczytu) plik z pozycjami robotów zapisanymi przez TrajectoryRecorder.
+
+    :param path: ścieżka do pliku .npy
+    :param every: co który krok symulacji zapisano klatkę
+    :return: pozycje robotów odczytywane leniwie z pliku
+    """
+    keyframes_path = _keyframes_path(path)
+    keyframes = np.load(keyframes_path, mmap_mode='r') if os.path.exists(keyframes_path) else None
+    return Trajectories(np.load(path, mmap_mode='r'), keyframes, every)
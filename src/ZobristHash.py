@@ -0,0 +1,49 @@
+import numpy as np
+from typing import Tuple
+
+
+class ZobristHash:
+    """
+    Haszowanie Zobrista układów stacji dokujących.
+
+    Każda komórka mapy ma losowy, 64-bitowy klucz, a hasz rozwiązania to XOR kluczy komórek ze stacjami. Przesunięcie
+    stacji z source do destination zmienia hasz o klucze tych dwóch komórek, więc aktualizacja dla ruchu ma koszt O(1).
+    Klucze losowane są z ziarna wyznaczonego przez rozmiar mapy, więc dla map tego samego rozmiaru (np. w różnych
+    procesach) hasze są takie same.
+    """
+
+    def __init__(self, map_shape: Tuple[int, int], seed: int = None):
+        """
+        :param map_shape: rozmiar mapy
+        :param seed: ziarno generatora kluczy (None - ziarno zależne tylko od rozmiaru mapy)
+        """
+        entropy = list(map_shape) if seed is None else [seed] + list(map_shape)
+        rng = np.random.default_rng(np.random.SeedSequence(entropy))
+        self.__keys = rng.integers(0, np.iinfo(np.uint64).max, size=map_shape, dtype=np.uint64, endpoint=True)
+
+    def hash(self, solution: np.array) -> int:
+        """
+        :param solution: macierz stacji dokujących
+        :return: hasz układu stacji
+        """
+        return int(np.bitwise_xor.reduce(self.__keys[solution > 0], initial=np.uint64(0)))
+
+    def move(self, solution_hash: int, source: Tuple[int, int], destination: Tuple[int, int]) -> int:
+        """
+        :param solution_hash: hasz rozwiązania przed ruchem
+        :param source: stara pozycja stacji
+        :param destination: nowa pozycja stacji
+        :return: hasz rozwiązania po przesunięciu stacji
+        """
+        return solution_hash ^ int(self.__keys[source]) ^ int(self.__keys[destination])
+
+    def moves(self, solution_hash: int, source: Tuple[int, int], destinations: np.array) -> np.array:
+        """
+        Wektorowa wersja move dla wielu komórek docelowych tej samej stacji.
+
+        :param solution_hash: hasz rozwiązania przed ruchem
+        :param source: stara pozycja stacji
+        :param destinations: współrzędne komórek docelowych (tablica n x 2)
+        :return: tablica haszy (uint64) rozwiązań po ruchach
+        """
+        return np.uint64(solution_hash) ^ self.__keys[tuple(source)] ^ self.__keys[tuple(destinations.T)]
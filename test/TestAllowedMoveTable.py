@@ -0,0 +1,52 @@
+import unittest
+import numpy as np
+
+import src.AllowedMoveTable as AllowedMoveTable
+
+
+class TestAllowedMoveTable(unittest.TestCase):
+
+    def setUp(self):
+        np.random.seed(3)
+        self.barriers = (np.random.random((8, 11)) < 0.3).astype('int32')
+        self.table = AllowedMoveTable.AllowedMoveTable(self.barriers)
+
+    def allowed_moves(self, row, column):
+        return {(dx, dy) for dx in range(-1, 2) for dy in range(-1, 2)
+                if 0 <= row + dx < self.barriers.shape[0] and 0 <= column + dy < self.barriers.shape[1]
+                and self.barriers[row + dx, column + dy] != 1}
+
+    def test_uniform_over_allowed_moves(self):
+        draws = np.arange(AllowedMoveTable.AllowedMoveTable.CHOICES)
+        for row, column in np.argwhere(self.barriers != 1):
+            moves = self.table.sample(np.tile([row, column], (len(draws), 1)), draws)
+            offsets, counts = np.unique(moves, axis=0, return_counts=True)
+            allowed = self.allowed_moves(row, column)
+            self.assertEqual(allowed, {tuple(offset) for offset in offsets})
+            self.assertEqual(len(allowed), self.table.get_moves_count()[row, column])
+            # każdy dozwolony ruch wybierany jest dla tej samej liczby wartości losowych
+            self.assertTrue(np.all(counts == len(draws) // len(allowed)))
+
+    def test_sampling_variants_agree(self):
+        positions = np.argwhere(self.barriers != 1)
+        draws = self.table.draw(len(positions))
+        self.assertTrue(np.all((0 <= draws) & (draws < AllowedMoveTable.AllowedMoveTable.CHOICES)))
+
+        moves = self.table.sample(positions, draws)
+        flat_moves = self.table.sample_flat(positions[:, 0] * self.barriers.shape[1] + positions[:, 1], draws)
+        np.testing.assert_array_equal(moves[:, 0] * self.barriers.shape[1] + moves[:, 1], flat_moves)
+        for position, draw, move in zip(positions, draws, moves):
+            np.testing.assert_array_equal(move, self.table.move(tuple(position), draw))
+
+    def test_isolated_cell(self):
+        barriers = np.ones((4, 4), dtype='int32')
+        barriers[1, 1] = 0
+        table = AllowedMoveTable.AllowedMoveTable(barriers)
+        np.testing.assert_array_equal([0, 0], table.move((1, 1), AllowedMoveTable.AllowedMoveTable.CHOICES - 1))
+        # na komórce bez dozwolonych ruchów (np. barierze otoczonej barierami) robot stoi w miejscu
+        self.assertEqual(1, table.get_moves_count()[3, 3])
+        np.testing.assert_array_equal([0, 0], table.move((3, 3), 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -82,5 +82,56 @@ class TestConditionTester(unittest.TestCase):
         self.assertTrue(cond_test.is_solution_allowed(proposed_pl_map))
 
 
+class TestConditionTesterMoves(unittest.TestCase):
+
+    def test_is_move_allowed_equals_is_solution_allowed(self):
+        np.random.seed(7)
+        clients_map = np.random.randint(0, 6, (9, 11))
+        banned_positions = (np.random.rand(9, 11) > 0.8).astype('int32')
+        for frame in [0, 1, 2]:
+            cond_test = src.ConditionTester.OneConditionTester(p_max=40,
+                                                               d_max=1,
+                                                               clients_map=clients_map,
+                                                               banned_positions=banned_positions,
+                                                               frame=frame)
+            allowed = [(x, y) for x in range(9) for y in range(11)
+                       if cond_test.is_solution_allowed(np.eye(1, 99, x * 11 + y, dtype='int32').reshape(9, 11))]
+            for x in range(9):
+                for y in range(11):
+                    self.assertEqual((x, y) in allowed, cond_test.is_move_allowed(allowed[0], (x, y)))
+
+    def test_allowed_cells_bitmap(self):
+        clients_map = np.zeros((5, 6), dtype='int32')
+        clients_map[0, 0] = 10
+        banned_positions = np.zeros((5, 6), dtype='int32')
+        banned_positions[4, 5] = 1
+        cond_test = src.ConditionTester.OneConditionTester(p_max=5,
+                                                           d_max=1,
+                                                           clients_map=clients_map,
+                                                           banned_positions=banned_positions,
+                                                           frame=1)
+        expected = np.ones((5, 6), dtype=bool)
+        expected[1:-1, 1:-1] = False
+        expected[[0, 0, 1, 4], [0, 1, 0, 5]] = False
+
+        np.testing.assert_array_equal(expected, cond_test.allowed_cells())
+        self.assertFalse(cond_test.allowed_cells().flags.writeable)
+        self.assertTrue(cond_test.is_move_allowed((0, 2), (4, 4)))
+        self.assertFalse(cond_test.is_move_allowed((0, 2), (4, 5)))
+
+    def test_ban_matrix_equals_per_cell_loop(self):
+        np.random.seed(10)
+        for shape, d_max, p_max in [((9, 11), 1, 15), ((20, 13), 3, 60), ((6, 7), 5, 40), ((5, 5), 0, 3)]:
+            clients_map = np.random.randint(0, 6, shape)
+            cond_test = src.ConditionTester.OneConditionTester(p_max=p_max,
+                                                               d_max=d_max,
+                                                               clients_map=clients_map,
+                                                               banned_positions=None,
+                                                               frame=0)
+            expected = np.array([[cond_test._OneConditionTester__are_to_many_clients_in_area((x, y))
+                                  for y in range(shape[1])] for x in range(shape[0])])
+            np.testing.assert_array_equal(expected, cond_test._OneConditionTester__ban_matrix)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+import numpy as np
+
+import src.CostCache as CostCache
+import src.Solver as Solver
+import src.SolutionGrader as SolutionGrader
+from src.SettingMenager import setting_menager
+
+
+class TestCostCache(unittest.TestCase):
+
+    def test_lru_eviction(self):
+        cache = CostCache.CostCache(capacity=2)
+        cache.put('cost', b'a', 1.0)
+        cache.put('cost', b'b', 2.0)
+        self.assertEqual(1.0, cache.get('cost', b'a'))
+        cache.put('cost', b'c', 3.0)
+
+        self.assertIsNone(cache.get('cost', b'b'))
+        self.assertEqual(1.0, cache.get('cost', b'a'))
+        self.assertEqual(3.0, cache.get('cost', b'c'))
+        self.assertIsNone(cache.get('variance', b'a'))
+        self.assertDictEqual({'hits': 3, 'misses': 2, 'size': 2, 'capacity': 2}, cache.get_statistics())
+
+
+class TestCostCacheInSolver(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        setting_menager.change_path_to_settings_file('settings/test_cases/case1.json')
+
+    def test_solver_with_cost_cache(self):
+        np.random.seed(15)
+        clients_map = np.random.randint(0, 10, (12, 12))
+        pl_map = np.zeros(clients_map.shape, dtype='int32')
+        pl_map[[0, 11, 5], [3, 7, 0]] = 1
+
+        results = []
+        for capacity in [0, 1000]:
+            solver = Solver.Solver(n_max=3, p_max=10000, d_max=2, r=1, min_time_in_tl=3, min_time_in_lt_tl=1,
+                                   client_map=clients_map, iteration_lim=10, starting_solution=pl_map,
+                                   delta_evaluation=False, telemetry_on=True, cost_cache_capacity=capacity)
+            solution = solver._Solver__solve()
+            results.append((solution, solver.get_best_cost(), Solver.Telemetry.get_telemetry_counters()))
+
+        np.testing.assert_array_equal(results[0][0], results[1][0])
+        self.assertEqual(results[0][1], results[1][1])
+        self.assertDictEqual({}, results[0][2])
+        self.assertGreater(results[1][2]['CostCache.hits'], 0)
+        self.assertGreater(results[1][2]['CostCache.misses'], 0)
+
+    def test_cache_shared_with_grader(self):
+        self.check_cache_shared_with_grader('moves', 1)
+
+    def test_cache_shared_with_grader_batched(self):
+        self.check_cache_shared_with_grader('batched', 1)
+        self.check_cache_shared_with_grader('batched', 2)
+
+    def check_cache_shared_with_grader(self, neighborhood_mode: str, workers: int):
+        np.random.seed(3)
+        clients_map = np.random.randint(0, 10, (12, 12))
+        pl_map = np.zeros(clients_map.shape, dtype='int32')
+        pl_map[[0, 11, 5], [3, 7, 0]] = 1
+
+        solver = Solver.Solver(n_max=3, p_max=10000, d_max=2, r=1, min_time_in_tl=3, min_time_in_lt_tl=1,
+                               client_map=clients_map, iteration_lim=5, starting_solution=pl_map,
+                               neighborhood_mode=neighborhood_mode, workers=workers)
+        solution = solver._Solver__solve()
+        cache = solver.get_cost_cache()
+
+        # rozwiązanie startowe było x_a w pierwszej iteracji, więc SolutionGrader korzysta z wartości solwera
+        expected = SolutionGrader.SolutionGrader(clients_map, pl_map).grade_solution(pl_map, clients_map)
+        hits = cache.get_statistics()['hits']
+        grader = SolutionGrader.SolutionGrader(clients_map, solution, cost_cache=cache)
+        self.assertAlmostEqual(expected, grader.grade_solution(pl_map, clients_map))
+        self.assertEqual(hits + 1, cache.get_statistics()['hits'])
+
+        cache.clear()
+        self.assertAlmostEqual(expected, grader.grade_solution(pl_map, clients_map))
+        self.assertDictEqual({'hits': 0, 'misses': 1, 'size': 1, 'capacity': 100000}, cache.get_statistics())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+import unittest
+from unittest import mock
+import numpy as np
+
+import src.CostFunction as CostFunction
+import src.Helpers as Helpers
+
+
+class TestDistanceTransform(unittest.TestCase):
+
+    def test_manhattan_distance_transform(self):
+        pl_map = np.array([
+            [0, 0, 1],
+            [1, 0, 0],
+            [0, 0, 0],
+            [0, 0, 0]
+        ])
+
+        expected = np.array([
+            [1, 1, 0],
+            [0, 1, 1],
+            [1, 2, 2],
+            [2, 3, 3]
+        ])
+
+        np.testing.assert_array_equal(expected, Helpers.manhattan_distance_transform(pl_map))
+
+    def test_manhattan_distance_transform_random(self):
+        np.random.seed(1)
+        for _ in range(20):
+            pl_map = (np.random.rand(13, 17) > 0.97).astype('int32')
+            pl_map[np.random.randint(13), np.random.randint(17)] = 1
+            stations = np.argwhere(pl_map)
+            rows, cols = np.indices(pl_map.shape)
+            expected = np.min([np.abs(rows - x) + np.abs(cols - y) for x, y in stations], axis=0)
+
+            np.testing.assert_array_equal(expected, Helpers.manhattan_distance_transform(pl_map))
+
+    def test_nearest_source_transform(self):
+        np.random.seed(11)
+        for _ in range(20):
+            sources = (np.random.rand(9, 12) > 0.9).astype('int32')
+            sources[np.random.randint(9), np.random.randint(12)] = 1
+            stations = np.argwhere(sources)
+            rows, cols = np.indices(sources.shape)
+            dist = np.array([np.abs(rows - x) + np.abs(cols - y) for x, y in stations])
+            # np.argmin wybiera pierwszą stację w kolejności wierszami, tak jak przy remisach w transformacie
+            nearest_station = stations[np.argmin(dist, axis=0)]
+            expected_nearest = np.ravel_multi_index((nearest_station[..., 0], nearest_station[..., 1]), sources.shape)
+
+            distance, nearest = Helpers.nearest_source_transform(sources)
+            np.testing.assert_array_equal(np.min(dist, axis=0), distance)
+            np.testing.assert_array_equal(expected_nearest, nearest)
+
+        distance, nearest = Helpers.nearest_source_transform(np.zeros((3, 4)))
+        np.testing.assert_array_equal(np.full((3, 4), 7), distance)
+        np.testing.assert_array_equal(np.full((3, 4), -1), nearest)
+
+    def test_geodesic_distance_transform(self):
+        sources = np.zeros((4, 5), dtype='int32')
+        sources[0, 0] = 1
+        passable = np.ones((4, 5), dtype=bool)
+        passable[0:3, 2] = False
+
+        expected = np.array([
+            [0, 1, 2, 9, 10],
+            [1, 2, 3, 8, 9],
+            [2, 3, 4, 7, 8],
+            [3, 4, 5, 6, 7]
+        ])
+
+        np.testing.assert_array_equal(expected, Helpers.geodesic_distance_transform(sources, passable))
+        np.testing.assert_array_equal(Helpers.manhattan_distance_transform(sources),
+                                      Helpers.geodesic_distance_transform(sources, np.ones((4, 5), dtype=bool)))
+
+        passable[3, 2] = False
+        self.assertEqual(20, Helpers.geodesic_distance_transform(sources, passable)[0, 4])
+
+
+class TestCostFunction(unittest.TestCase):
+
+    def test_distance_transform_cost_equals_diamond_cost(self):
+        np.random.seed(2)
+        for d_max in [1, 2, 4]:
+            clients_map = np.random.randint(0, 5, (15, 20))
+            pl_map = np.zeros(clients_map.shape, dtype='int32')
+            pl_map[tuple(np.random.randint(0, 15, 3)), tuple(np.random.randint(0, 20, 3))] = 1
+
+            diamond = CostFunction.DiamondCost(d_max, clients_map)
+            transform = CostFunction.DistanceTransformCost(d_max, clients_map)
+
+            self.assertAlmostEqual(diamond.cost(pl_map), transform.cost(pl_map))
+
+    def test_incremental_cost_move_delta(self):
+        np.random.seed(3)
+        r = 2
+        clients_map = np.random.randint(0, 5, (18, 22))
+        pl_map = np.zeros(clients_map.shape, dtype='int32')
+        pl_map[np.random.randint(0, 18, 6), np.random.randint(0, 22, 6)] = 1
+        diamond = CostFunction.DiamondCost(3, clients_map)
+        incremental = CostFunction.IncrementalCost(3, clients_map, r)
+        incremental.reset(pl_map)
+        self.assertAlmostEqual(diamond.cost(pl_map), incremental.get_base_cost())
+
+        stations = np.argwhere(pl_map)
+        for _ in range(100):
+            station = np.random.randint(len(stations))
+            x, y = stations[station] + np.random.randint(-r, r + 1, 2)
+            if not (0 <= x < 18 and 0 <= y < 22) or pl_map[x, y]:
+                continue
+            neighbor = np.copy(pl_map)
+            neighbor[tuple(stations[station])] = 0
+            neighbor[x, y] = 1
+
+            self.assertAlmostEqual(diamond.cost(neighbor),
+                                   incremental.get_base_cost() + incremental.move_delta(station, (x, y)))
+
+    def test_geodesic_cost(self):
+        np.random.seed(13)
+        clients_map = np.random.randint(0, 5, (16, 18))
+        pl_map = np.zeros(clients_map.shape, dtype='int32')
+        pl_map[[2, 9, 14], [3, 15, 7]] = 1
+        barrier_map = np.zeros(clients_map.shape, dtype='int32')
+        barrier_map[4:14, [6, 12]] = 1
+
+        self.assertAlmostEqual(CostFunction.DistanceTransformCost(2, clients_map).cost(pl_map),
+                               CostFunction.GeodesicCost(2, clients_map).cost(pl_map))
+
+        geodesic = CostFunction.GeodesicCost(2, clients_map, barrier_map)
+        self.assertGreater(geodesic.cost(pl_map), CostFunction.DistanceTransformCost(2, clients_map).cost(pl_map))
+        self.assertIs(geodesic.station_field((2, 3)), geodesic.station_field((2, 3)))
+
+        incremental = CostFunction.IncrementalCost(2, clients_map, 2, geodesic)
+        incremental.reset(pl_map)
+        self.assertAlmostEqual(geodesic.cost(pl_map), incremental.get_base_cost())
+        for station, (x, y) in enumerate(np.argwhere(pl_map)):
+            for dx, dy in [(-2, 1), (1, 1), (-1, -2), (0, 2)]:
+                neighbor = np.copy(pl_map)
+                neighbor[x, y] = 0
+                neighbor[x + dx, y + dy] = 1
+                self.assertAlmostEqual(geodesic.cost(neighbor),
+                                       incremental.get_base_cost() + incremental.move_delta(station, (x + dx, y + dy)))
+
+        # po przyjęciu ruchu odczytywane jest tylko pole przesuniętej stacji
+        neighbor = np.copy(pl_map)
+        neighbor[9, 15] = 0
+        neighbor[10, 14] = 1
+        with mock.patch.object(geodesic, 'client_distances', wraps=geodesic.client_distances) as client_distances:
+            incremental.reset(neighbor)
+        self.assertEqual(1, client_distances.call_count)
+        self.assertEqual([10, 14], list(client_distances.call_args[0][0]))
+        self.assertAlmostEqual(geodesic.cost(neighbor), incremental.get_base_cost())
+
+
+if __name__ == '__main__':
+    unittest.main()
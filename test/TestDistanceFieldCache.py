@@ -0,0 +1,53 @@
+import unittest
+import numpy as np
+
+import src.DistanceFieldCache as DistanceFieldCache
+import src.Helpers as Helpers
+
+
+class TestDistanceFieldCache(unittest.TestCase):
+
+    def test_distance_field_equals_distance_transform(self):
+        np.random.seed(15)
+        cache = DistanceFieldCache.DistanceFieldCache((13, 17))
+        for _ in range(10):
+            solution = np.zeros((13, 17), dtype='int32')
+            solution[np.random.randint(0, 13, 4), np.random.randint(0, 17, 4)] = 1
+
+            distance = cache.distance_field(solution)
+            self.assertEqual(np.uint16, distance.dtype)
+            np.testing.assert_array_equal(Helpers.manhattan_distance_transform(solution), distance)
+
+    def test_geodesic_field(self):
+        barrier_map = np.zeros((6, 7), dtype='int32')
+        barrier_map[:5, 3] = 1
+        sources = np.zeros((6, 7), dtype='int32')
+        sources[0, 0] = 1
+        cache = DistanceFieldCache.DistanceFieldCache((6, 7), 'geodesic', barrier_map)
+
+        np.testing.assert_array_equal(Helpers.geodesic_distance_transform(sources, barrier_map == 0),
+                                      cache.field((0, 0)))
+        self.assertFalse(cache.field((0, 0)).flags.writeable)
+
+        with self.assertRaises(ValueError):
+            DistanceFieldCache.DistanceFieldCache((6, 7), 'euclidean')
+
+    def test_lru_eviction_with_memory_ceiling(self):
+        # jedno pole 32 x 32 uint16 zajmuje 2 KB, więc w 4 KB mieszczą się dwa pola
+        cache = DistanceFieldCache.DistanceFieldCache((32, 32), max_memory_mb=4 / 1024)
+        first = cache.field((0, 0))
+        cache.field((1, 1))
+        self.assertIs(first, cache.field((0, 0)))
+        cache.field((2, 2))
+
+        statistics = cache.get_statistics()
+        self.assertEqual(2, statistics['capacity'])
+        self.assertEqual(2, len(cache))
+        self.assertEqual(1, statistics['evictions'])
+        self.assertEqual(1, statistics['hits'])
+        self.assertAlmostEqual(4 / 1024, statistics['memory_mb'])
+        self.assertEqual(3, statistics['misses'])
+
+
+if __name__ == '__main__':
+    unittest.main()
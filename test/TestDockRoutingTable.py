@@ -0,0 +1,70 @@
+import unittest
+import numpy as np
+
+import src.DockRoutingTable as DockRoutingTable
+import src.Helpers as Helpers
+
+
+class TestDockRoutingTable(unittest.TestCase):
+
+    def setUp(self):
+        np.random.seed(7)
+        self.barriers = (np.random.random((15, 20)) < 0.25).astype('int32')
+        self.docks = np.zeros((15, 20), dtype='int32')
+        self.docks[[2, 9, 13], [3, 17, 8]] = [15, 32, 60]
+        self.barriers[self.docks > 0] = 0
+
+    def test_distance_map_equals_geodesic_distance(self):
+        table = DockRoutingTable.DockRoutingTable(self.barriers, self.docks)
+        passable = self.barriers != 1
+        expected = Helpers.geodesic_distance_transform(self.docks > 0, passable)
+        np.testing.assert_array_equal(expected[passable], table.get_distance_map()[passable])
+        self.assertTrue(np.all(table.get_distance_map()[~passable] == table.get_unreachable_distance()))
+        self.assertFalse(table.get_distance_map().flags.writeable)
+
+    def test_route_follows_next_hops_to_dock(self):
+        table = DockRoutingTable.DockRoutingTable(self.barriers, self.docks)
+        directions = table.get_direction_map()
+        for start in np.argwhere(table.get_distance_map() < table.get_unreachable_distance()):
+            route = table.route(tuple(start))
+            self.assertEqual(np.int32, route.dtype)
+            np.testing.assert_array_equal(start, route[0])
+            self.assertEqual(table.distance(start) + 1, len(route))
+            self.assertGreater(self.docks[tuple(route[-1])], 0)
+            for (row, column), (next_row, next_column) in zip(route[:-1], route[1:]):
+                self.assertEqual(1, abs(next_row - row) + abs(next_column - column))
+                self.assertEqual(0, self.barriers[next_row, next_column])
+                np.testing.assert_array_equal([next_row - row, next_column - column], table.direction((row, column)))
+                np.testing.assert_array_equal(directions[row, column], table.direction((row, column)))
+
+    def test_rebuild_only_when_docks_move(self):
+        table = DockRoutingTable.DockRoutingTable(self.barriers, self.docks)
+        self.assertEqual(1, table.get_rebuild_count())
+
+        # zmiana prędkości ładowania nie zmienia tras
+        faster = self.docks * 2
+        self.assertFalse(table.update(faster))
+        self.assertEqual(1, table.get_rebuild_count())
+
+        moved = np.zeros_like(self.docks)
+        moved[0, 0] = 15
+        self.barriers[0, 0] = 0
+        table = DockRoutingTable.DockRoutingTable(self.barriers, self.docks)
+        self.assertTrue(table.update(moved))
+        self.assertEqual(2, table.get_rebuild_count())
+        self.assertEqual(0, table.distance((0, 0)))
+
+    def test_unreachable_dock(self):
+        barriers = np.zeros((5, 5), dtype='int32')
+        barriers[:, 2] = 1
+        docks = np.zeros((5, 5), dtype='int32')
+        docks[0, 0] = 1
+        table = DockRoutingTable.DockRoutingTable(barriers, docks)
+        self.assertEqual(table.get_unreachable_distance(), table.distance((4, 4)))
+        np.testing.assert_array_equal([0, 0], table.direction((4, 4)))
+        with self.assertRaises(RuntimeError):
+            table.route((4, 4))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,11 @@
+import io
 import unittest
+from contextlib import redirect_stdout
+from unittest import mock
 import numpy as np
 
-from src.MapGenerator import generate_random_settings, generate_swarm, RobotsSwarm, TrafficMapGenerator
+from src.MapGenerator import generate_random_settings, generate_swarm, RobotsSwarm, SwarmArrays, TrafficMapGenerator
+from src.RobotModel import Robot, RobotSettings
 
 
 allowed_positions_map = np.array([
@@ -96,6 +100,96 @@ class TestFunctions(unittest.TestCase):
             self.assertTrue(np.all(settings_list[i].starting_position==robot._Robot__settings.starting_position))
 
 
+# mapa w kształcie węża - między dowolnymi dwiema komórkami istnieje dokładnie jedna najkrótsza droga
+snake_map = np.array([
+    [0, 0, 0, 0, 0, 0, 0],
+    [1, 1, 1, 1, 1, 1, 0],
+    [0, 0, 0, 0, 0, 0, 0],
+    [0, 1, 1, 1, 1, 1, 1],
+    [0, 0, 0, 0, 0, 0, 0],
+])
+snake_cells = [(0, y) for y in range(7)] + [(1, 6)] + [(2, y) for y in range(6, -1, -1)] + [(3, 0)] + \
+              [(4, y) for y in range(7)]
+snake_docks = np.zeros(snake_map.shape, dtype='int64')
+snake_docks[snake_cells[4]] = 15
+snake_docks[snake_cells[17]] = 7
+# ruch "losowy" w testach - krok do następnej komórki węża, na końcu węża robot stoi w miejscu
+snake_forward = np.zeros(snake_map.shape + (2,), dtype='int64')
+for (x0, y0), (x1, y1) in zip(snake_cells[:-1], snake_cells[1:]):
+    snake_forward[x0, y0] = (x1 - x0, y1 - y0)
+snake_forward_step = (snake_forward[..., 0] * snake_map.shape[1] + snake_forward[..., 1]).ravel()
+
+
+def make_settings(id, position, battery_size, starting_battery_level, max_load):
+    return RobotSettings(battery_size=battery_size, starting_battery_level=starting_battery_level, max_load=max_load,
+                         starting_position=np.array(position), id=id, size=(500, 500, 100), max_loading_speed=10,
+                         weight=100, power=500, max_speed=10, name=str(id), price=10)
+
+
+def snake_settings():
+    settings = []
+    for id, (cell, battery_size, level) in enumerate([(0, 60, 26), (0, 60, 26), (2, 80, 40), (9, 100, 45),
+                                                      (12, 70, 50), (16, 120, 60), (20, 90, 38), (22, 60, 59)]):
+        settings.append(make_settings(id, snake_cells[cell], battery_size, level, 40))
+    return settings
+
+
+class FixedLoadRng:
+    """
+    Generator zastępujący losowanie obciążeń stałą wartością (zmiana obciążenia to liczba losowa modulo 3 minus 1)
+    """
+    def __init__(self, load):
+        self.load = load
+
+    def integers(self, low, high, size):
+        return np.full(size, self.load + 1)
+
+
+class TestSwarmArrays(unittest.TestCase):
+
+    def test_make_move_matches_robot(self):
+        rng = np.random.default_rng(3)
+        settings = [make_settings(id, (50, 50), int(rng.integers(20, 60)), int(rng.integers(10, 20)), 30)
+                    for id in range(40)]
+        robots = [Robot(setting) for setting in settings]
+        swarm = SwarmArrays([Robot(setting) for setting in settings], (100, 100))
+
+        for _ in range(300):
+            mask = rng.random(len(robots)) < 0.8
+            direction = rng.integers(-1, 2, (len(robots), 2))
+            new_load = rng.integers(-1, 2, len(robots))
+            loading_speed = rng.choice([0, 0, 3, 15], len(robots))
+            for i, robot in enumerate(robots):
+                if mask[i]:
+                    robot.make_move(np.copy(direction[i]), int(new_load[i]), int(loading_speed[i]))
+            swarm.make_move(mask, direction[:, 0] * 100 + direction[:, 1], new_load, loading_speed)
+
+            for i, robot in enumerate(robots):
+                state = robot.get_state()
+                self.assertEqual(state.battery_level, swarm.battery_level[i])
+                self.assertEqual(state.actual_load, swarm.actual_load[i])
+                self.assertEqual(state.failure, swarm.failure[i])
+                self.assertEqual(state.battery_low, swarm.battery_low[i])
+                self.assertEqual(state.is_loading, swarm.is_loading[i])
+                np.testing.assert_array_equal(state.actual_position, swarm.get_positions()[i])
+                self.assertEqual(robot.netto_gain, swarm.netto_gain[i])
+                self.assertEqual(robot.cumulative_loading_time, swarm.cumulative_loading_time[i])
+
+    def test_write_back(self):
+        settings = [make_settings(id, (1, 2), 50, 30, 10) for id in range(3)]
+        robots = [Robot(setting) for setting in settings]
+        swarm = SwarmArrays(robots, (4, 5))
+        swarm.make_move(np.array([True, False, True]), np.array([5, 5, -1]), np.array([1, 1, 0]),
+                        np.zeros(3, dtype='int64'))
+        swarm.write_back(robots)
+
+        np.testing.assert_array_equal([2, 2], robots[0].get_actual_position())
+        np.testing.assert_array_equal([1, 2], robots[1].get_actual_position())
+        np.testing.assert_array_equal([1, 1], robots[2].get_actual_position())
+        self.assertEqual([29, 30, 29], [robot.get_battery_level() for robot in robots])
+        self.assertEqual([1, 0, 0], [robot.netto_gain for robot in robots])
+
+
 class TestRobotsSwarm(unittest.TestCase):
 
     def test_init(self):
@@ -182,5 +276,151 @@ class TestTrafficMapGenerator(unittest.TestCase):
         traffic_map, loading_map, failure_map = traffic_map_generator.generate_map(10000)
         self.assertEqual(np.sum(traffic_map[allowed_positions_map == 1]), 0)
 
+    def test_default_engine(self):
+        traffic_map_generator = TrafficMapGenerator(allowed_positions_map, docking_stations_map, 3)
+        self.assertEqual('objects', traffic_map_generator._TrafficMapGenerator__engine)
+
+    def test_invalid_engine(self):
+        with self.assertRaises(ValueError):
+            TrafficMapGenerator(allowed_positions_map, docking_stations_map, 3, engine='gpu')
+
+    def test_invalid_routing(self):
+        with self.assertRaises(ValueError):
+            TrafficMapGenerator(allowed_positions_map, docking_stations_map, 3, routing='astar')
+
+    def test_table_routing_matches_bfs_length(self):
+        traffic_map_generator = TrafficMapGenerator(allowed_positions_map, docking_stations_map, 0, engine='objects')
+        table = traffic_map_generator.get_routing_table()
+        for start in np.argwhere(allowed_positions_map != 1):
+            path = traffic_map_generator._TrafficMapGenerator__bfs(start)
+            route = table.route(tuple(start))
+            self.assertEqual(len(path), len(route))
+            np.testing.assert_array_equal(start, path[0])
+            self.assertGreaterEqual(docking_stations_map[tuple(route[-1])], 1)
+
+    def test_routing_table_rebuilt_when_docks_change(self):
+        traffic_map_generator = TrafficMapGenerator(allowed_positions_map, docking_stations_map, 5,
+                                                    engine='vectorized', rng=np.random.default_rng(0))
+        traffic_map_generator.generate_map(10)
+        traffic_map_generator.generate_map(10)
+        self.assertEqual(1, traffic_map_generator.get_routing_table().get_rebuild_count())
+
+        moved_docks = np.zeros_like(docking_stations_map)
+        moved_docks[0, 0] = 1
+        traffic_map_generator.set_docking_stations_map(moved_docks)
+        traffic_map_generator.generate_map(10)
+        table = traffic_map_generator.get_routing_table()
+        self.assertEqual(2, table.get_rebuild_count())
+        self.assertEqual(0, table.distance((0, 0)))
+
+    def test_set_docking_stations_map_drops_routes(self):
+        moved_docks = np.zeros_like(docking_stations_map)
+        moved_docks[0, 0] = 1
+        for engine in ('objects', 'vectorized'):
+            traffic_map_generator = TrafficMapGenerator(allowed_positions_map, docking_stations_map, 20,
+                                                        engine=engine, rng=np.random.default_rng(0))
+            with redirect_stdout(io.StringIO()):
+                traffic_map_generator.generate_map(10)
+            for robot in traffic_map_generator._TrafficMapGenerator__robots_swarm:
+                traffic_map_generator._TrafficMapGenerator__direction_to_nearest_dock(robot.get_id(),
+                                                                                      robot.get_actual_position())
+            traffic_map_generator.busy_docks[docking_stations_map > 0] = True
+
+            traffic_map_generator.set_docking_stations_map(moved_docks)
+            self.assertFalse(np.any(traffic_map_generator.busy_docks))
+            self.assertEqual(moved_docks.shape, traffic_map_generator.busy_docks.shape)
+            for name in ('paths_to_docks', 'paths_to_work', 'dock_cursors', 'work_cursors'):
+                self.assertDictEqual({}, getattr(traffic_map_generator, '_TrafficMapGenerator__' + name))
+            if engine == 'vectorized':
+                self.assertFalse(np.any(traffic_map_generator._TrafficMapGenerator__has_dock_route))
+                self.assertFalse(np.any(traffic_map_generator._TrafficMapGenerator__has_work_route))
+            with redirect_stdout(io.StringIO()):
+                traffic_map_generator.generate_map(10)
+
+    def test_vectorized_engine_matches_objects(self):
+        for load in [0, 1]:
+            objects = TrafficMapGenerator(snake_map, snake_docks, 0, engine='objects',
+                                          robots_swarm_predefined_settings=snake_settings())
+            objects._TrafficMapGenerator__generate_allowed_move = \
+                lambda position: np.copy(snake_forward[tuple(position)])
+            with mock.patch('numpy.random.randint', return_value=load), redirect_stdout(io.StringIO()):
+                expected = objects.generate_map(400)
+
+            vectorized = TrafficMapGenerator(snake_map, snake_docks, 0, engine='vectorized',
+                                             robots_swarm_predefined_settings=snake_settings(), rng=FixedLoadRng(load))
+            vectorized._TrafficMapGenerator__random_moves = lambda position, draw: snake_forward_step[position]
+            result = vectorized.generate_map(400)
+
+            for expected_value, value in zip(expected, result):
+                np.testing.assert_array_equal(expected_value, value)
+            np.testing.assert_array_equal(objects.busy_docks, vectorized.busy_docks)
+            for expected_robot, robot in zip(objects._TrafficMapGenerator__robots_swarm,
+                                             vectorized._TrafficMapGenerator__robots_swarm):
+                self.assertEqual(expected_robot.get_battery_level(), robot.get_battery_level())
+                self.assertEqual(expected_robot.battery_low(), robot.battery_low())
+                self.assertEqual(expected_robot.is_loading(), robot.is_loading())
+                self.assertEqual(expected_robot.failure_detected(), robot.failure_detected())
+            if load == 0:
+                # scenariusz obejmuje przejazdy do stacji i oczekiwanie na zwolnienie stacji
+                self.assertGreater(result[8], 0)
+                self.assertGreater(result[6], 0)
+
+    def test_vectorized_generate_map(self):
+        traffic_map_generator = TrafficMapGenerator(allowed_positions_map, docking_stations_map, 50,
+                                                    engine='vectorized', rng=np.random.default_rng(0))
+        traffic_map, loading_map, failure_map, robot_position = traffic_map_generator.generate_map(2000)[:4]
+
+        self.assertEqual(0, np.sum(traffic_map[allowed_positions_map == 1]))
+        self.assertTrue(np.all(loading_map <= traffic_map))
+        positions = robot_position.astype('int64')
+        self.assertFalse(np.any(allowed_positions_map[positions[..., 0], positions[..., 1]] == 1))
+        steps = np.abs(np.diff(positions, axis=0))
+        self.assertTrue(np.all(steps <= 1))
+
+    def test_vectorized_generate_map_global_seed(self):
+        results = []
+        for _ in range(2):
+            np.random.seed(21)
+            traffic_map_generator = TrafficMapGenerator(allowed_positions_map, docking_stations_map, 20,
+                                                        engine='vectorized')
+            results.append(traffic_map_generator.generate_map(500)[:4])
+
+        for expected, result in zip(*results):
+            np.testing.assert_array_equal(expected, result)
+
+    def test_simulate_replications(self):
+        traffic_map_generator = TrafficMapGenerator(allowed_positions_map, docking_stations_map, 20,
+                                                    engine='vectorized')
+        summary = traffic_map_generator.simulate_replications(3, 300, seeds=[1, 2, 3], workers=1)
+
+        # pojedyncza replikacja ma średnią równą swoim mapom i zerową wariancję
+        results = [traffic_map_generator.simulate_replications(1, 300, seeds=[seed], workers=1) for seed in [1, 2, 3]]
+        for name in ('traffic', 'loading', 'failure'):
+            maps = np.stack([result[name + '_mean'] for result in results])
+            np.testing.assert_allclose(np.mean(maps, axis=0), summary[name + '_mean'], atol=1e-9)
+            np.testing.assert_allclose(np.var(maps, axis=0, ddof=1), summary[name + '_var'], atol=1e-9)
+            self.assertFalse(np.any(results[0][name + '_var']))
+        np.testing.assert_array_equal([result['netto_gain'][0] for result in results], summary['netto_gain'])
+        self.assertEqual([1, 2, 3], summary['seeds'])
+        self.assertIsNone(summary['trajectories'])
+
+    def test_simulate_replications_reproducible(self):
+        traffic_map_generator = TrafficMapGenerator(allowed_positions_map, docking_stations_map, 10, engine='objects')
+        with redirect_stdout(io.StringIO()):
+            first = traffic_map_generator.simulate_replications(2, 100, seeds=5, workers=1, keep_trajectories=True)
+            second = traffic_map_generator.simulate_replications(2, 100, seeds=5, workers=1)
+        np.testing.assert_array_equal(first['traffic_mean'], second['traffic_mean'])
+        self.assertEqual(first['seeds'], second['seeds'])
+        self.assertEqual(2, len(first['trajectories']))
+        self.assertEqual((100, 10, 2), first['trajectories'][0].shape)
+
+    def test_simulate_replications_invalid_arguments(self):
+        traffic_map_generator = TrafficMapGenerator(allowed_positions_map, docking_stations_map, 5)
+        with self.assertRaises(ValueError):
+            traffic_map_generator.simulate_replications(0, 10)
+        with self.assertRaises(ValueError):
+            traffic_map_generator.simulate_replications(3, 10, seeds=[1, 2])
+
+
 if __name__ == "__main__":
     unittest.main()
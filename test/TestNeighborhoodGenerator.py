@@ -251,5 +251,23 @@ class TestNeighborhoodGenerator(unittest.TestCase):
                 assert False, "Result have additional solution, which was not expected: \n" + str(r) + '\n'
 
 
+class TestMoveGenerator(unittest.TestCase):
+
+    def test_moves_match_neighborhood_generator(self):
+        np.random.seed(6)
+        for r in [1, 2]:
+            parcel_locker_matrix = (np.random.rand(7, 9) > 0.8).astype('int32')
+            neighbors = list(src.NeighborhoodGenerator.neighborhood_generator(parcel_locker_matrix, r))
+            moves = list(src.NeighborhoodGenerator.move_generator(parcel_locker_matrix, r))
+
+            self.assertEqual(len(neighbors), len(moves))
+            stations = np.argwhere(parcel_locker_matrix)
+            for neighbor, move in zip(neighbors, moves):
+                station, source, destination = move
+                self.assertEqual(tuple(stations[station]), source)
+                np.testing.assert_array_equal(neighbor,
+                                              src.NeighborhoodGenerator.apply_move(parcel_locker_matrix, move))
+
+
 if __name__ == '__main__':
     unittest.main()
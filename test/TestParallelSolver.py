@@ -0,0 +1,192 @@
+import unittest
+from unittest import mock
+import numpy as np
+
+import src.DataCollectorPlotter as DataCollectorPlotter
+import src.NeighborhoodEvaluator as NeighborhoodEvaluator
+import src.ParallelSolver as ParallelSolver
+import src.Solver as Solver
+from src.SettingMenager import setting_menager
+
+
+class TestMultiStartSolver(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        setting_menager.change_path_to_settings_file('settings/test_cases/case1.json')
+
+    def test_multi_start_solver(self):
+        np.random.seed(9)
+        clients_map = np.random.randint(0, 10, (12, 12))
+
+        results = []
+        for _ in range(2):
+            multi_start_solver = ParallelSolver.MultiStartSolver(runs=3,
+                                                                 n_max=3,
+                                                                 p_max=10000,
+                                                                 d_max=2,
+                                                                 r=1,
+                                                                 min_time_in_tl=3,
+                                                                 min_time_in_lt_tl=1,
+                                                                 client_map=clients_map,
+                                                                 workers=2,
+                                                                 seed=10,
+                                                                 iteration_lim=5)
+            solution = multi_start_solver.solve()
+            results.append((solution, multi_start_solver.get_statistics()))
+
+        solution, statistics = results[0]
+        self.assertEqual(3, np.sum(solution))
+        self.assertEqual(3, len(statistics['costs']))
+        self.assertEqual(min(statistics['costs']), statistics['best_cost'])
+        self.assertEqual(statistics['costs'][statistics['best_run']], statistics['best_cost'])
+
+        np.testing.assert_array_equal(solution, results[1][0])
+        self.assertEqual(statistics, results[1][1])
+
+    def test_each_run_has_own_starting_solution(self):
+        np.random.seed(9)
+        clients_map = np.random.randint(0, 10, (12, 12))
+        docks_params = {i: {'position': position, 'loading_speed': 15, 'price': 50}
+                        for i, position in enumerate([(0, 3), (11, 7), (5, 0)])}
+
+        multi_start_solver = ParallelSolver.MultiStartSolver(runs=3, n_max=3, p_max=10000, d_max=2, r=1,
+                                                             min_time_in_tl=3, min_time_in_lt_tl=1,
+                                                             client_map=clients_map, docks_params=docks_params,
+                                                             workers=1, seed=10, iteration_lim=1)
+        multi_start_solver.solve()
+        starting_solutions = multi_start_solver.get_starting_solutions()
+
+        expected = np.zeros(clients_map.shape, dtype='int32')
+        expected[[0, 11, 5], [3, 7, 0]] = 1
+        np.testing.assert_array_equal(expected, starting_solutions[0])
+        layouts = {starting_solution.tobytes() for starting_solution in starting_solutions}
+        self.assertEqual(3, len(layouts))
+        for starting_solution in starting_solutions:
+            self.assertEqual(3, np.sum(starting_solution))
+
+
+class TestIslandSolver(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        setting_menager.change_path_to_settings_file('settings/test_cases/case1.json')
+
+    def test_island_solver(self):
+        np.random.seed(11)
+        clients_map = np.random.randint(0, 10, (20, 20))
+
+        results = []
+        for _ in range(2):
+            island_solver = ParallelSolver.IslandSolver(islands=3,
+                                                        exchange_interval=2,
+                                                        n_max=4,
+                                                        p_max=10000,
+                                                        d_max=2,
+                                                        r=1,
+                                                        min_time_in_tl=3,
+                                                        min_time_in_lt_tl=1,
+                                                        client_map=clients_map,
+                                                        share_long_term_tabu=True,
+                                                        seed=12,
+                                                        iteration_lim=20)
+            solution = island_solver.solve()
+            results.append((solution, island_solver.get_statistics()))
+
+        solution, statistics = results[0]
+        self.assertEqual(4, np.sum(solution))
+        self.assertEqual(min(statistics['costs']), statistics['best_cost'])
+        # wymiana odbywa się co exchange_interval iteracji, dopóki któraś wyspa pracuje
+        self.assertGreaterEqual(statistics['exchanges'], 1)
+        self.assertLessEqual(statistics['exchanges'], 20 // 2)
+        self.assertGreater(sum(statistics['restarts']), 0)
+
+        np.testing.assert_array_equal(solution, results[1][0])
+        self.assertEqual(statistics, results[1][1])
+
+
+class TestSolverSteps(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        setting_menager.change_path_to_settings_file('settings/test_cases/case1.json')
+
+    def test_run_iterations_equals_solve(self):
+        np.random.seed(13)
+        clients_map = np.random.randint(0, 10, (12, 12))
+        pl_map = np.zeros(clients_map.shape, dtype='int32')
+        pl_map[[0, 11, 5], [3, 7, 0]] = 1
+
+        solvers = [Solver.Solver(n_max=3, p_max=10000, d_max=2, r=1, min_time_in_tl=3, min_time_in_lt_tl=1,
+                                 client_map=clients_map, iteration_lim=10, starting_solution=pl_map)
+                   for _ in range(2)]
+        solution = solvers[0]._Solver__solve()
+        for _ in range(4):
+            solvers[1].run_iterations(3)
+
+        np.testing.assert_array_equal(solution, solvers[1].get_best_solution())
+        self.assertEqual(solvers[0].get_best_cost(), solvers[1].get_best_cost())
+        self.assertEqual(10, solvers[1].get_iteration())
+        self.assertTrue(solvers[1].is_finished())
+
+    def test_open_workers_kept_between_runs(self):
+        np.random.seed(13)
+        clients_map = np.random.randint(0, 10, (12, 12))
+        pl_map = np.zeros(clients_map.shape, dtype='int32')
+        pl_map[[0, 11, 5], [3, 7, 0]] = 1
+
+        with mock.patch.object(NeighborhoodEvaluator, 'ParallelNeighborhoodEvaluator',
+                               wraps=NeighborhoodEvaluator.ParallelNeighborhoodEvaluator) as evaluator:
+            solver = Solver.Solver(n_max=3, p_max=10000, d_max=2, r=1, min_time_in_tl=3, min_time_in_lt_tl=1,
+                                   client_map=clients_map, iteration_lim=6, starting_solution=pl_map, workers=2)
+            solver.open_workers()
+            try:
+                for _ in range(3):
+                    solver.run_iterations(2)
+            finally:
+                solver.close_workers()
+            self.assertEqual(1, evaluator.call_count)
+
+            # bez open_workers pula tworzona jest na czas każdego wywołania
+            solver.run_iterations(1)
+            self.assertEqual(2, evaluator.call_count)
+
+    def test_solve_plots_collected_data(self):
+        np.random.seed(13)
+        clients_map = np.random.randint(0, 10, (12, 12))
+        pl_map = np.zeros(clients_map.shape, dtype='int32')
+        pl_map[[0, 11, 5], [3, 7, 0]] = 1
+
+        with mock.patch.object(DataCollectorPlotter.DataCollectorPlotter, 'plot_data') as plot_data:
+            for plot, calls in ((True, 1), (False, 0)):
+                plot_data.reset_mock()
+                solver = Solver.Solver(n_max=3, p_max=10000, d_max=2, r=1, min_time_in_tl=3, min_time_in_lt_tl=1,
+                                       client_map=clients_map, iteration_lim=2, starting_solution=pl_map)
+                solver.solve(plot_data=plot)
+                self.assertEqual(calls, plot_data.call_count)
+
+    def test_restart_and_share_long_term_tabu(self):
+        np.random.seed(14)
+        clients_map = np.random.randint(0, 10, (12, 12))
+        pl_map = np.zeros(clients_map.shape, dtype='int32')
+        pl_map[[0, 11, 5], [3, 7, 0]] = 1
+        elite = np.zeros(clients_map.shape, dtype='int32')
+        elite[[0, 11, 6], [4, 6, 0]] = 1
+
+        solver = Solver.Solver(n_max=3, p_max=10000, d_max=2, r=1, min_time_in_tl=3, min_time_in_lt_tl=5,
+                               client_map=clients_map, iteration_lim=10, starting_solution=pl_map)
+        solver.run_iterations(2)
+        solver.restart(elite)
+        np.testing.assert_array_equal(np.zeros(clients_map.shape), solver.get_long_term_tabu_list())
+
+        shared = np.zeros(clients_map.shape, dtype='int32')
+        shared[0, 4] = 3
+        shared[1, 1] = 3
+        solver.share_long_term_tabu(shared)
+        expected = np.zeros(clients_map.shape, dtype='int32')
+        expected[0, 4] = 3
+        np.testing.assert_array_equal(expected, solver.get_long_term_tabu_list())
+
+
+if __name__ == '__main__':
+    unittest.main()
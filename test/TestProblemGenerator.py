@@ -1,3 +1,5 @@
+import os
+import tempfile
 import unittest
 import numpy as np
 
@@ -65,6 +67,113 @@ class TestProblemGenerator(unittest.TestCase):
 
         self.assertEqual(clients_number, generated_clients_no)
 
+    def test_random_problem_gen_seeded_rng(self):
+
+        def generate(seed):
+            return src.ProblemGenerator.RandomProblemGen(map_shape=(20, 30),
+                                                         clients_number=1234,
+                                                         max_clients_number_in_cell=10,
+                                                         rng=np.random.default_rng(seed)).generate_problem()
+
+        np.testing.assert_array_equal(generate(5), generate(5))
+        self.assertFalse(np.array_equal(generate(5), generate(6)))
+
+    def test_random_problem_gen_global_seed(self):
+
+        def generate():
+            np.random.seed(11)
+            return list(src.ProblemGenerator.RandomProblemGen(map_shape=(20, 30),
+                                                              clients_number=1234,
+                                                              max_clients_number_in_cell=10).generate_batch(2)) + \
+                [src.ProblemGenerator.RandomProblemGen(map_shape=(20, 30),
+                                                       clients_number=1234,
+                                                       max_clients_number_in_cell=10).generate_problem()]
+
+        for generated_problem, repeated_problem in zip(generate(), generate()):
+            np.testing.assert_array_equal(generated_problem, repeated_problem)
+
+    def test_random_problem_gen_extreme_clients_number(self):
+
+        map_shape = (40, 50)
+        max_clients_number_in_cell = 7
+
+        for clients_number in [0, 1, 3, np.prod(map_shape) * max_clients_number_in_cell - 1,
+                               np.prod(map_shape) * max_clients_number_in_cell]:
+            random_gen = src.ProblemGenerator.RandomProblemGen(map_shape=map_shape,
+                                                               clients_number=clients_number,
+                                                               max_clients_number_in_cell=max_clients_number_in_cell,
+                                                               rng=np.random.default_rng(0))
+            generated_problem = random_gen.generate_problem()
+
+            self.assertEqual(clients_number, np.sum(generated_problem))
+            self.assertEqual(0, np.count_nonzero(generated_problem < 0))
+            self.assertEqual(0, np.count_nonzero(generated_problem > max_clients_number_in_cell))
+
+    def test_random_problem_gen_impossible_clients_number(self):
+
+        for clients_number in [-1, 20 * 30 * 10 + 1]:
+            with self.assertRaises(ValueError):
+                src.ProblemGenerator.RandomProblemGen(map_shape=(20, 30),
+                                                      clients_number=clients_number,
+                                                      max_clients_number_in_cell=10)
+
+    def test_generate_batch(self):
+
+        random_gen = src.ProblemGenerator.RandomProblemGen(map_shape=(20, 30),
+                                                           clients_number=1234,
+                                                           max_clients_number_in_cell=10)
+
+        batch = list(random_gen.generate_batch(4, seed=7))
+
+        self.assertEqual(4, len(batch))
+        for generated_problem in batch:
+            self.assertTupleEqual((20, 30), generated_problem.shape)
+            self.assertEqual(1234, np.sum(generated_problem))
+        self.assertFalse(np.array_equal(batch[0], batch[1]))
+        for generated_problem, repeated_problem in zip(batch, random_gen.generate_batch(4, seed=7)):
+            np.testing.assert_array_equal(generated_problem, repeated_problem)
+
+    def test_generate_batch_to_file(self):
+
+        random_gen = src.ProblemGenerator.RandomProblemGen(map_shape=(20, 30),
+                                                           clients_number=1234,
+                                                           max_clients_number_in_cell=10)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'batch.npy')
+            batch = list(random_gen.generate_batch(3, seed=7, path=path))
+            loaded = src.ProblemGenerator.load_batch(path)
+
+            self.assertIsInstance(loaded, np.memmap)
+            self.assertEqual(np.uint8, loaded.dtype)
+            self.assertTupleEqual((3, 20, 30), loaded.shape)
+            np.testing.assert_array_equal(np.array(batch), loaded)
+            del loaded
+
+    def test_generate_batch_to_file_stopped_early(self):
+
+        random_gen = src.ProblemGenerator.RandomProblemGen(map_shape=(20, 30),
+                                                           clients_number=1234,
+                                                           max_clients_number_in_cell=10)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'batch.npy')
+            maps = random_gen.generate_batch(5, seed=7, path=path)
+            batch = [next(maps), next(maps)]
+            maps.close()
+            loaded = src.ProblemGenerator.load_batch(path)
+
+            self.assertTupleEqual((2, 20, 30), loaded.shape)
+            np.testing.assert_array_equal(np.array(batch), loaded)
+            self.assertListEqual(['batch.npy'], os.listdir(directory))
+            del loaded
+
+    def test_batch_dtype(self):
+
+        self.assertEqual(np.uint8, src.ProblemGenerator.batch_dtype(255))
+        self.assertEqual(np.uint16, src.ProblemGenerator.batch_dtype(256))
+        self.assertEqual(np.uint32, src.ProblemGenerator.batch_dtype(70000))
+
 
 if __name__ == '__main__':
     unittest.main()
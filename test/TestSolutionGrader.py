@@ -94,6 +94,20 @@ class TestSolutionGrader(unittest.TestCase):
 
         np.testing.assert_array_equal(expected, got)
 
+    def test_map_clients_to_nearest_pl_equals_diamond_search(self):
+        np.random.seed(12)
+        for shape in [(7, 9), (15, 11), (20, 20)]:
+            clients_map = np.random.randint(0, 4, shape)
+            pl_map = np.zeros(shape, dtype='int32')
+            pl_map[np.random.randint(0, shape[0], 6), np.random.randint(0, shape[1], 6)] = 1
+
+            grader = SolutionGrader.SolutionGrader(clients_map, pl_map)
+            expected = np.zeros(shape)
+            for x, y in np.argwhere(clients_map > 0):
+                expected[grader._SolutionGrader__find_nearest_pl((x, y))] += clients_map[x, y]
+
+            np.testing.assert_array_equal(expected, grader._SolutionGrader__map_clients_to_nearest_pl())
+
     def test_grade_case_1(self):
 
         pl_map = np.array([
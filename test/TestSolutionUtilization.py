@@ -0,0 +1,117 @@
+import unittest
+import numpy as np
+
+import src.DataCollectorPlotter  # ładowany przed SolutionUtilization ze względu na import cykliczny z PlotSaver
+import src.SolutionUtilization as SolutionUtilization
+import src.DistanceFieldCache as DistanceFieldCache
+
+
+def distribute_clients_by_rings(client_map: np.array, plt_map: np.array, d_max: int) -> tuple:
+    """
+    Pierwotna (pętlowa) implementacja SolutionUtilization.__calculate - wzorzec dla testu regresyjnego.
+
+    :return: macierze plt_utilisation, plt_utilisation_without_d_max i client_within_plt_zone
+    """
+    client_map = np.copy(client_map)
+    map_shape = client_map.shape
+    plt_utilisation = np.zeros(map_shape)
+    plt_utilisation_without_d_max = np.zeros(map_shape)
+    client_within_plt_zone = np.zeros(map_shape)
+
+    radius = 0
+    while (not np.all((client_map == 0))) and (not np.all((plt_map == 0))):
+        for _ in range(0, np.max(client_map) + 1):
+            for x_plt in range(0, map_shape[0]):
+                for y_plt in range(0, map_shape[1]):
+                    if plt_map[x_plt][y_plt] != 1:
+                        continue
+                    for x in range(max(x_plt - radius, 0), min(x_plt + radius + 1, map_shape[0])):
+                        for y in range(max(y_plt - radius, 0), min(y_plt + radius + 1, map_shape[1])):
+                            if np.abs(x_plt - x) + np.abs(y_plt - y) == radius:
+                                if radius <= d_max:
+                                    client_within_plt_zone[x][y] = 1
+                                if client_map[x][y] > 0:
+                                    plt_utilisation_without_d_max[x_plt][y_plt] += 1
+                                    client_map[x][y] -= 1
+                                    if radius <= d_max:
+                                        plt_utilisation[x_plt][y_plt] = plt_utilisation_without_d_max[x_plt][y_plt]
+        radius = radius + 1
+    return plt_utilisation, plt_utilisation_without_d_max, client_within_plt_zone
+
+
+class TestSolutionUtilization(unittest.TestCase):
+
+    def test_calculate_equals_ring_distribution(self):
+        rng = np.random.default_rng(16)
+        for case, d_max in [('case1', 2), ('case2', 3), ('case4', 1), ('case5', 4)]:
+            barriers = np.load('maps/{}/barriers.npy'.format(case))
+            plt_map = (np.load('maps/{}/init_docking_stations.npy'.format(case)) > 0).astype('int32')
+            client_map = (rng.integers(0, 4, barriers.shape) * (barriers != 1) *
+                          (rng.random(barriers.shape) > 0.5)).astype('int32')
+
+            expected = distribute_clients_by_rings(client_map, plt_map, d_max)
+            utilization = SolutionUtilization.SolutionUtilization(client_map, plt_map, 100, d_max)
+
+            np.testing.assert_array_equal(expected[0], utilization.get_plt_utilization())
+            np.testing.assert_array_equal(expected[1], utilization.get_plt_utilization_without_d_max())
+            np.testing.assert_array_equal(expected[2], utilization.get_client_within_plt_zone())
+
+    def test_calculate_with_ties_and_sparse_clients(self):
+        client_map = np.zeros((7, 7), dtype='int32')
+        client_map[3, 3] = 7
+        client_map[0, 6] = 2
+        plt_map = np.zeros((7, 7), dtype='int32')
+        plt_map[[1, 3, 3, 5], [3, 1, 5, 3]] = 1
+
+        expected = distribute_clients_by_rings(client_map, plt_map, 2)
+        utilization = SolutionUtilization.SolutionUtilization(client_map, plt_map, 100, 2)
+
+        np.testing.assert_array_equal(expected[0], utilization.get_plt_utilization())
+        np.testing.assert_array_equal(expected[1], utilization.get_plt_utilization_without_d_max())
+        np.testing.assert_array_equal(expected[2], utilization.get_client_within_plt_zone())
+
+    def test_distance_matrix_and_averages(self):
+        rng = np.random.default_rng(17)
+        client_map = rng.integers(0, 6, (11, 14)).astype('int32')
+        plt_map = np.zeros((11, 14), dtype='int32')
+        plt_map[[0, 4, 9, 10], [13, 6, 2, 11]] = 1
+        utilization = SolutionUtilization.SolutionUtilization(client_map, plt_map, 100, 2)
+
+        rows, cols = np.indices(plt_map.shape)
+        expected = np.min([np.abs(rows - x) + np.abs(cols - y) for x, y in np.argwhere(plt_map)], axis=0)
+        distance_matrix = utilization.get_distance_matrix()
+        np.testing.assert_array_equal(expected, distance_matrix)
+
+        av_distances = utilization.get_av_distance_for_clients_cell()
+        for clients_no in range(int(np.max(client_map)) + 1):
+            mask = client_map == clients_no
+            self.assertAlmostEqual(np.mean(distance_matrix[mask]) if np.any(mask) else 0, av_distances[clients_no])
+
+        av_clients = utilization.get_av_clients_at_given_range()
+        self.assertEqual(int(np.max(distance_matrix)) + 1, len(av_clients))
+        for dist in range(int(np.max(distance_matrix)) + 1):
+            mask = distance_matrix == dist
+            self.assertAlmostEqual(np.mean(client_map[mask]) if np.any(mask) else 0, av_clients[dist])
+
+    def test_distance_matrix_uses_manhattan_fields_only(self):
+        rng = np.random.default_rng(19)
+        client_map = rng.integers(0, 6, (10, 12)).astype('int32')
+        plt_map = np.zeros((10, 12), dtype='int32')
+        plt_map[[1, 8], [1, 10]] = 1
+        # bariera odcinająca komórki w rogu mapy - w polach geodezyjnych są one nieosiągalne
+        barrier_map = np.zeros((10, 12), dtype='int32')
+        barrier_map[7, 0:3] = 1
+        barrier_map[7:, 3] = 1
+        expected = SolutionUtilization.SolutionUtilization(client_map, plt_map, 100, 2)
+
+        for metric in ('manhattan', 'geodesic'):
+            field_cache = DistanceFieldCache.DistanceFieldCache(plt_map.shape, metric, barrier_map)
+            utilization = SolutionUtilization.SolutionUtilization(client_map, plt_map, 100, 2, field_cache)
+            np.testing.assert_array_equal(expected.get_distance_matrix(), utilization.get_distance_matrix())
+            self.assertEqual(expected.get_av_clients_at_given_range(),
+                             utilization.get_av_clients_at_given_range())
+            self.assertEqual(metric == 'manhattan', field_cache.get_statistics()['misses'] > 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
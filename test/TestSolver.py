@@ -2,6 +2,10 @@ import unittest
 import numpy as np
 
 import src.Solver
+import src.CostFunction as CostFunction
+import src.NeighborhoodGenerator as NeighborhoodGenerator
+import src.ZobristHash as ZobristHash
+from src.SettingMenager import setting_menager
 
 
 class TestSolver(unittest.TestCase):
@@ -760,5 +764,140 @@ class TestSolver(unittest.TestCase):
         np.testing.assert_array_equal(test_solver._Solver__long_term_tabu_list, modified_tabu_list)
 
 
+class TestSolverDeltaEvaluation(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        setting_menager.change_path_to_settings_file('settings/test_cases/case1.json')
+
+    @staticmethod
+    def make_problem(seed: int, size: int, rows: list, cols: list):
+        """
+        :return: losowa mapa klientów size x size oraz mapa stacji w zadanych komórkach
+        """
+        np.random.seed(seed)
+        clients_map = np.random.randint(0, 10, (size, size))
+        pl_map = np.zeros(clients_map.shape, dtype='int32')
+        pl_map[rows, cols] = 1
+        return clients_map, pl_map
+
+    @staticmethod
+    def make_solver(clients_map: np.array, pl_map: np.array, **params) -> src.Solver.Solver:
+        """
+        :return: solwer z parametrami wspólnymi dla testów, nadpisanymi przez params
+        """
+        params = {'n_max': int(np.sum(pl_map)), 'p_max': 60, 'd_max': 2, 'r': 2, 'min_time_in_tl': 4,
+                  'min_time_in_lt_tl': 2, 'iteration_lim': 15, **params}
+        return src.Solver.Solver(client_map=clients_map, starting_solution=pl_map, **params)
+
+    def test_neighbor_cost_equals_full_cost(self):
+        clients_map, pl_map = self.make_problem(4, 15, [1, 4, 8, 12], [2, 10, 5, 13])
+        test_solver = self.make_solver(clients_map, pl_map, p_max=10000, iteration_lim=1)
+        test_solver._Solver__x_a = pl_map
+        test_solver._Solver__incremental_cost.reset(pl_map)
+
+        neighbors = list(NeighborhoodGenerator.neighborhood_generator(pl_map, 2))
+        for index in np.random.choice(len(neighbors), 50, replace=False):
+            self.assertAlmostEqual(test_solver._Solver__cost(neighbors[index]),
+                                   test_solver._Solver__neighbor_cost(neighbors[index]))
+
+    def test_move_cost_equals_full_cost(self):
+        clients_map, pl_map = self.make_problem(5, 12, [0, 0, 11, 6], [0, 11, 5, 6])
+        full_cost = CostFunction.DistanceTransformCost(2, clients_map)
+        for field_cache in [None, CostFunction.FieldCacheCost(2, clients_map)]:
+            incremental_cost = CostFunction.IncrementalCost(2, clients_map, 1, field_cache)
+            base_cost = incremental_cost.cost(pl_map)
+            self.assertAlmostEqual(full_cost.cost(pl_map), base_cost)
+
+            for station, source in enumerate(np.argwhere(pl_map == 1)):
+                for shift in np.ndindex(3, 3):
+                    destination = tuple(source + np.asarray(shift) - 1)
+                    if not (0 <= destination[0] < 12 and 0 <= destination[1] < 12) or pl_map[destination]:
+                        continue
+                    neighbor = np.copy(pl_map)
+                    neighbor[tuple(source)] = 0
+                    neighbor[destination] = 1
+                    self.assertAlmostEqual(full_cost.cost(neighbor),
+                                           base_cost + incremental_cost.move_delta(station, destination))
+
+    def test_solve_moves_and_matrix_neighborhood(self):
+        clients_map, pl_map = self.make_problem(8, 14, [0, 0, 13, 6], [0, 13, 5, 0])
+
+        for dynamic_neighborhood, visited_tenure in [(True, 0), (False, 0), (True, 6), (False, 6)]:
+            results = []
+            for neighborhood_mode, workers in [('moves', 1), ('matrix', 1), ('batched', 1), ('batched', 3)]:
+                test_solver = self.make_solver(clients_map, pl_map,
+                                               dynamic_neighborhood=dynamic_neighborhood,
+                                               neighborhood_mode=neighborhood_mode,
+                                               workers=workers,
+                                               visited_tenure=visited_tenure)
+                x_min = test_solver._Solver__solve()
+                collector = test_solver._Solver__collect_and_represent_data
+                results.append((x_min, test_solver._Solver__Q_min, test_solver._Solver__tabu_list,
+                                test_solver._Solver__long_term_tabu_list,
+                                [collector._DataCollectorPlotter__elems_in_nei_list,
+                                 collector._DataCollectorPlotter__elems_in_short_tabu,
+                                 collector._DataCollectorPlotter__elems_in_long_tabu,
+                                 collector._DataCollectorPlotter__av_cadence,
+                                 collector._DataCollectorPlotter__av_long_cadence,
+                                 collector.get_x_a_hash_list()]))
+
+            for result in results[1:]:
+                self.assertEqual(results[0][4], result[4])
+                np.testing.assert_array_equal(results[0][0], result[0])
+                self.assertEqual(results[0][1], result[1])
+                np.testing.assert_array_equal(results[0][2], result[2])
+                np.testing.assert_array_equal(results[0][3], result[3])
+
+    def test_geodesic_distance_metric(self):
+        clients_map, pl_map = self.make_problem(14, 14, [0, 0, 13, 6], [0, 13, 5, 0])
+        barrier_map = np.zeros(clients_map.shape, dtype='int32')
+        barrier_map[2:12, [4, 9]] = 1
+        clients_map[barrier_map == 1] = 0
+
+        results = []
+        for delta_evaluation, neighborhood_mode, workers in [(True, 'moves', 1), (False, 'moves', 1),
+                                                             (False, 'matrix', 1), (True, 'batched', 1),
+                                                             (True, 'batched', 2)]:
+            test_solver = self.make_solver(clients_map, pl_map,
+                                           iteration_lim=10,
+                                           delta_evaluation=delta_evaluation,
+                                           neighborhood_mode=neighborhood_mode,
+                                           workers=workers,
+                                           banned_positions=barrier_map,
+                                           distance_metric='geodesic')
+            x_min = test_solver._Solver__solve()
+            geodesic = CostFunction.GeodesicCost(2, clients_map, barrier_map)
+            self.assertAlmostEqual(geodesic.cost(x_min), test_solver.get_best_cost())
+            results.append(x_min)
+
+        for x_min in results[1:]:
+            np.testing.assert_array_equal(results[0], x_min)
+
+        with self.assertRaises(ValueError):
+            self.make_solver(clients_map, pl_map, distance_metric='euclidean')
+
+    def test_visited_solutions_memory(self):
+        clients_map, pl_map = self.make_problem(9, 14, [0, 0, 13, 6], [0, 13, 5, 0])
+
+        distinct = []
+        for visited_tenure in [0, 10]:
+            test_solver = self.make_solver(clients_map, pl_map,
+                                           r=1,
+                                           min_time_in_tl=1,
+                                           min_time_in_lt_tl=1,
+                                           iteration_lim=20,
+                                           visited_tenure=visited_tenure)
+            test_solver._Solver__solve()
+            collector = test_solver._Solver__collect_and_represent_data
+            zobrist = ZobristHash.ZobristHash(clients_map.shape)
+            self.assertEqual([zobrist.hash(x_a.T) for x_a in collector._DataCollectorPlotter__x_a_list],
+                             collector.get_x_a_hash_list())
+            self.assertEqual(zobrist.hash(test_solver._Solver__x_a), test_solver.get_solution_hash())
+            distinct.append(collector.get_number_of_distinct_solutions())
+
+        self.assertGreaterEqual(distinct[1], distinct[0])
+
+
 if __name__ == '__main__':
     unittest.main()
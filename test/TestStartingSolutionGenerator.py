@@ -4,6 +4,33 @@ import numpy as np
 import src.StartingSolutionGenerator as StartingSolutionGenerator
 
 
+def generate_by_rebuilding_masks(n_max: int, p_max: int, d_max: int, clients_map: np.array) -> np.array:
+    """
+    Pierwotny algorytm StartingSolutionGen.generate (macierz masek budowana od nowa po każdej stacji, maksimum
+    wyszukiwane przez np.argmax z oznaczaniem odrzuconych komórek wartością -1) - wzorzec dla testu.
+    """
+    rows, cols = np.indices(clients_map.shape)
+    in_range = [np.abs(rows - x) + np.abs(cols - y) <= d_max for x, y in np.ndindex(clients_map.shape)]
+    temp_clients_map = np.copy(clients_map)
+    starting_solution = np.zeros(clients_map.shape, dtype='int32')
+
+    for _ in range(n_max):
+        mask_matrix = np.array([np.count_nonzero(temp_clients_map[area] > 0) for area in in_range],
+                               dtype='float64').reshape(clients_map.shape)
+        while True:
+            if np.max(mask_matrix) == -1:
+                raise RuntimeError("Can't generate starting solution")
+            max_ind = np.unravel_index(np.argmax(mask_matrix), mask_matrix.shape)
+            area = in_range[np.ravel_multi_index(max_ind, clients_map.shape)]
+            if np.sum(clients_map[area]) > p_max or starting_solution[max_ind] == 1:
+                mask_matrix[max_ind] = -1
+            else:
+                starting_solution[max_ind] = 1
+                temp_clients_map[area] = 0
+                break
+    return starting_solution
+
+
 class TestStartingSolutionGenerator(unittest.TestCase):
 
     def test_check_client_number_in_pl_range(self):
@@ -248,6 +275,22 @@ class TestStartingSolutionGenerator(unittest.TestCase):
 
         self.assertRaises(RuntimeError, start_gen.generate)
 
+    def test_generate_equals_rebuilding_masks(self):
+        np.random.seed(17)
+        for shape, n_max, p_max, d_max in [((12, 15), 8, 40, 1), ((20, 20), 15, 60, 2), ((9, 30), 20, 25, 3),
+                                            ((10, 10), 100, 1000, 2)]:
+            clients_map = np.random.randint(0, 5, shape) * (np.random.rand(*shape) > 0.6)
+            start_gen = StartingSolutionGenerator.StartingSolutionGen(n_max, p_max, d_max, clients_map)
+
+            np.testing.assert_array_equal(generate_by_rebuilding_masks(n_max, p_max, d_max, clients_map),
+                                          start_gen.generate())
+
+        clients_map = np.full((6, 6), 9)
+        with self.assertRaises(RuntimeError):
+            generate_by_rebuilding_masks(3, 20, 1, clients_map)
+        with self.assertRaises(RuntimeError):
+            StartingSolutionGenerator.StartingSolutionGen(3, 20, 1, clients_map).generate()
+
 
 if __name__ == '__main__':
     unittest.main()
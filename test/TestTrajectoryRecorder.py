@@ -0,0 +1,90 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+import numpy as np
+
+import src.MapGenerator as MapGenerator
+import src.TrajectoryRecorder as TrajectoryRecorder
+
+
+class TestTrajectoryRecorder(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(4)
+        # losowe błądzenie 7 robotów przez 600 kroków po mapie 300 x 300
+        steps = rng.integers(-1, 2, (600, 7, 2))
+        steps[0] = rng.integers(0, 300, (7, 2))
+        self.positions = np.clip(np.cumsum(steps, axis=0), 0, 299)
+
+    def record(self, recorder: TrajectoryRecorder.TrajectoryRecorder, block_size: int = 37):
+        recorder.open(len(self.positions), self.positions.shape[1], (300, 300))
+        for start in range(0, len(self.positions), block_size):
+            recorder.record(self.positions[start:start + block_size])
+        recorder.close()
+        return recorder.get_trajectories()
+
+    def test_round_trip(self):
+        for every in (1, 3, 256):
+            for delta in (False, True):
+                trajectories = self.record(TrajectoryRecorder.TrajectoryRecorder(every=every, delta=delta))
+                expected = self.positions[::every]
+                self.assertEqual(expected.shape, trajectories.shape)
+                self.assertEqual(every, trajectories.get_every())
+                np.testing.assert_array_equal(expected, trajectories[:])
+                np.testing.assert_array_equal(expected, np.stack(list(trajectories)))
+                # odczyt klatek w dowolnej kolejności
+                for i in (len(expected) - 1, 0, len(expected) // 2, -1):
+                    np.testing.assert_array_equal(expected[i], trajectories[i])
+                np.testing.assert_array_equal(expected[-1, 3, :], trajectories[-1, 3, :])
+                np.testing.assert_array_equal(expected[:2, :, 1], trajectories[:2, :, 1])
+
+    def test_compact_storage(self):
+        trajectories = self.record(TrajectoryRecorder.TrajectoryRecorder())
+        self.assertEqual(np.int16, trajectories[:].dtype)
+        delta = TrajectoryRecorder.TrajectoryRecorder(delta=True)
+        self.record(delta)
+        self.assertEqual(np.int8, delta._TrajectoryRecorder__frames.dtype)
+
+    def test_stream_to_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'trajectories.npy')
+            for delta in (True, False):
+                self.record(TrajectoryRecorder.TrajectoryRecorder(every=2, delta=delta, path=path), block_size=100)
+                self.assertEqual(delta, os.path.exists(os.path.join(directory, 'trajectories_keyframes.npy')))
+                trajectories = TrajectoryRecorder.load_trajectories(path, every=2)
+                np.testing.assert_array_equal(self.positions[::2], trajectories[:])
+                del trajectories
+
+    def test_map_too_large(self):
+        with self.assertRaises(ValueError):
+            TrajectoryRecorder.TrajectoryRecorder().open(10, 1, (40000, 10))
+        with self.assertRaises(ValueError):
+            TrajectoryRecorder.TrajectoryRecorder(every=0)
+
+    def test_generate_map_with_recorder(self):
+        barriers = np.zeros((20, 30), dtype='int32')
+        barriers[5:15, 10] = 1
+        docks = np.zeros((20, 30), dtype='int32')
+        docks[[2, 17], [3, 25]] = 15
+        for engine in ('vectorized', 'objects'):
+            np.random.seed(0)
+            settings = list(MapGenerator.generate_random_settings(12, barriers))
+            results = []
+            for recorder in (None, TrajectoryRecorder.TrajectoryRecorder(every=5, delta=True)):
+                np.random.seed(1)
+                generator = MapGenerator.TrafficMapGenerator(barriers, docks, 12,
+                                                             robots_swarm_predefined_settings=settings,
+                                                             engine=engine, rng=np.random.default_rng(1))
+                with redirect_stdout(io.StringIO()):
+                    results.append(generator.generate_map(700, recorder))
+            dense, recorded = results
+            self.assertEqual(np.int16, dense[3].dtype)
+            self.assertEqual((700, 12, 2), dense[3].shape)
+            np.testing.assert_array_equal(dense[0], recorded[0])
+            np.testing.assert_array_equal(dense[3][::5], recorded[3][:])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+import numpy as np
+
+import src.ZobristHash as ZobristHash
+
+
+class TestZobristHash(unittest.TestCase):
+
+    def test_move_equals_full_hash(self):
+        np.random.seed(1)
+        zobrist = ZobristHash.ZobristHash((12, 15))
+        solution = np.zeros((12, 15), dtype='int32')
+        solution[np.random.randint(0, 12, 5), np.random.randint(0, 15, 5)] = 1
+        solution_hash = zobrist.hash(solution)
+
+        for _ in range(50):
+            source = tuple(np.argwhere(solution)[np.random.randint(np.count_nonzero(solution))])
+            destination = tuple(np.argwhere(solution == 0)[np.random.randint(np.count_nonzero(solution == 0))])
+            solution_hash = zobrist.move(solution_hash, source, destination)
+            solution[source], solution[destination] = 0, 1
+
+            self.assertEqual(zobrist.hash(solution), solution_hash)
+
+    def test_moves(self):
+        zobrist = ZobristHash.ZobristHash((6, 6))
+        solution = np.zeros((6, 6), dtype='int32')
+        solution[[1, 4], [2, 3]] = 1
+        solution_hash = zobrist.hash(solution)
+        destinations = np.array([[0, 0], [5, 5], [2, 2]])
+
+        expected = []
+        for destination in destinations:
+            neighbor = np.copy(solution)
+            neighbor[1, 2], neighbor[tuple(destination)] = 0, 1
+            expected.append(zobrist.hash(neighbor))
+
+        self.assertEqual(expected, [int(h) for h in zobrist.moves(solution_hash, (1, 2), destinations)])
+
+    def test_keys_depend_on_map_shape_and_seed(self):
+        solution = np.zeros((5, 5), dtype='int32')
+        solution[[0, 3], [1, 4]] = 1
+
+        self.assertEqual(ZobristHash.ZobristHash((5, 5)).hash(solution), ZobristHash.ZobristHash((5, 5)).hash(solution))
+        self.assertNotEqual(ZobristHash.ZobristHash((5, 5)).hash(solution),
+                            ZobristHash.ZobristHash((5, 5), seed=1).hash(solution))
+        self.assertEqual(0, ZobristHash.ZobristHash((5, 5)).hash(np.zeros((5, 5))))
+
+
+if __name__ == '__main__':
+    unittest.main()